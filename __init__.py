@@ -10,6 +10,13 @@ RogoAI Audio処理ノード集
 5. RogoAI Compare Three Texts 📊 - 3つのテキスト精度比較ツール
 6. RogoAI Load Text File 📄 - 自動エンコーディング検出テキスト読み込み
 7. RogoAI Words To Segments 📝 - YouTube字幕セグメント生成
+8. RogoAI Qwen3-ASR Unload 🧹 - モデルキャッシュ解放
+9. RogoAI Qwen3-ASR Batch Transcribe 📚 - フォルダ一括文字起こし
+10. RogoAI Qwen3-ASR Transcribe File 📂 - ファイルパス入力の文字起こし（WAVメモリマップ）
+11. RogoAI Qwen3-ASR Align 🎯 - 文字起こし済みチャンクのバッチタイムスタンプ付与
+12. RogoAI Extract Audio to Memory 🎧 - 動画から音声をメモリへ直接抽出（AUDIO出力）
+13. RogoAI Extract Audio Batch 🎬 - 複数動画の並列音声抽出（manifest出力）
+14. RogoAI Probe Media 🔎 - メディア情報（長さ・コーデック・サンプルレート・チャンネル数）の取得
 """
 
 # Extract Audio v1（既存）
@@ -20,10 +27,40 @@ from .nodes.extract_audio import NODE_DISPLAY_NAME_MAPPINGS as EXTRACT_DISPLAY_M
 from .nodes.extract_audio_v2 import NODE_CLASS_MAPPINGS as EXTRACT_V2_MAPPINGS
 from .nodes.extract_audio_v2 import NODE_DISPLAY_NAME_MAPPINGS as EXTRACT_V2_DISPLAY_MAPPINGS
 
+# Extract Audio to Memory（ファイルを書き出さずに AUDIO を出力）
+from .nodes.extract_audio_memory import NODE_CLASS_MAPPINGS as EXTRACT_MEMORY_MAPPINGS
+from .nodes.extract_audio_memory import NODE_DISPLAY_NAME_MAPPINGS as EXTRACT_MEMORY_DISPLAY_MAPPINGS
+
+# Extract Audio Batch（複数動画の並列抽出）
+from .nodes.extract_audio_batch import NODE_CLASS_MAPPINGS as EXTRACT_BATCH_MAPPINGS
+from .nodes.extract_audio_batch import NODE_DISPLAY_NAME_MAPPINGS as EXTRACT_BATCH_DISPLAY_MAPPINGS
+
+# Probe Media（メディア情報の取得・キャッシュ）
+from .nodes.media_probe import NODE_CLASS_MAPPINGS as PROBE_MAPPINGS
+from .nodes.media_probe import NODE_DISPLAY_NAME_MAPPINGS as PROBE_DISPLAY_MAPPINGS
+
 # Qwen3-ASRノード（オプション）
 try:
     from .nodes.qwen3_asr import NODE_CLASS_MAPPINGS as QWEN_MAPPINGS
     from .nodes.qwen3_asr import NODE_DISPLAY_NAME_MAPPINGS as QWEN_DISPLAY_MAPPINGS
+    from .nodes.qwen3_asr_batch import NODE_CLASS_MAPPINGS as QWEN_BATCH_MAPPINGS
+    from .nodes.qwen3_asr_batch import NODE_DISPLAY_NAME_MAPPINGS as QWEN_BATCH_DISPLAY_MAPPINGS
+    from .nodes.qwen3_asr_file import NODE_CLASS_MAPPINGS as QWEN_FILE_MAPPINGS
+    from .nodes.qwen3_asr_file import NODE_DISPLAY_NAME_MAPPINGS as QWEN_FILE_DISPLAY_MAPPINGS
+    from .nodes.qwen3_asr_align import NODE_CLASS_MAPPINGS as QWEN_ALIGN_MAPPINGS
+    from .nodes.qwen3_asr_align import NODE_DISPLAY_NAME_MAPPINGS as QWEN_ALIGN_DISPLAY_MAPPINGS
+    QWEN_MAPPINGS = {
+        **QWEN_MAPPINGS,
+        **QWEN_BATCH_MAPPINGS,
+        **QWEN_FILE_MAPPINGS,
+        **QWEN_ALIGN_MAPPINGS,
+    }
+    QWEN_DISPLAY_MAPPINGS = {
+        **QWEN_DISPLAY_MAPPINGS,
+        **QWEN_BATCH_DISPLAY_MAPPINGS,
+        **QWEN_FILE_DISPLAY_MAPPINGS,
+        **QWEN_ALIGN_DISPLAY_MAPPINGS,
+    }
     print("✅ [RogoAI-ASR] Qwen3-ASR Long Audio Edition loaded")
 except ImportError as e:
     print(f"⚠️  [RogoAI-ASR] Qwen3-ASRノードは利用できません: {e}")
@@ -64,6 +101,9 @@ except ImportError as e:
 NODE_CLASS_MAPPINGS = {
     **EXTRACT_MAPPINGS,
     **EXTRACT_V2_MAPPINGS,
+    **EXTRACT_MEMORY_MAPPINGS,
+    **EXTRACT_BATCH_MAPPINGS,
+    **PROBE_MAPPINGS,
     **QWEN_MAPPINGS,
     **COMPARE_MAPPINGS,
     **LOAD_TEXT_MAPPINGS,
@@ -73,6 +113,9 @@ NODE_CLASS_MAPPINGS = {
 NODE_DISPLAY_NAME_MAPPINGS = {
     **EXTRACT_DISPLAY_MAPPINGS,
     **EXTRACT_V2_DISPLAY_MAPPINGS,
+    **EXTRACT_MEMORY_DISPLAY_MAPPINGS,
+    **EXTRACT_BATCH_DISPLAY_MAPPINGS,
+    **PROBE_DISPLAY_MAPPINGS,
     **QWEN_DISPLAY_MAPPINGS,
     **COMPARE_DISPLAY_MAPPINGS,
     **LOAD_TEXT_DISPLAY_MAPPINGS,
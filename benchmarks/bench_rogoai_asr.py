@@ -0,0 +1,523 @@
+"""
+RogoAI ASR Benchmark Suite
+GPU・ネットワーク不要のオフラインベンチマーク
+
+ComfyUI本体・Qwen3-ASRモデルの代わりに決定的なスタブを使い、
+ノード側の処理（チャンク分割・結合・パース・比較・読み込み）の
+処理時間とメモリ使用量を入力サイズごとに計測する。
+
+対象ノード:
+- RogoAI_Qwen3ASRLoader / RogoAI_Qwen3ASRTranscribe  (1分〜3時間の合成音声)
+- RogoAI_WordsToSegments                              (1万〜100万単語、文字列 / WORD_TIMESTAMPS)
+- RogoAI_CompareThreeTexts                            (1KB〜のテキスト)
+- RogoAI_LoadTextFile                                 (1KB〜50MBのテキスト)
+
+使い方:
+    python benchmarks/bench_rogoai_asr.py                 # フルセット
+    python benchmarks/bench_rogoai_asr.py --quick         # 小さいサイズのみ
+    python benchmarks/bench_rogoai_asr.py --output bench.json
+
+各ケースは別プロセスで実行し、ピークRSSをケースごとに独立して計測する。
+結果はJSON（ケースごとの実測値 + log-log回帰によるスケーリング指数）で出力。
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import types
+from queue import Empty
+
+import numpy as np
+import torch
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = os.path.join(tempfile.gettempdir(), "rogoai_asr_bench")
+
+SAMPLE_RATE = 16000
+# 1ケースの制限時間（秒）。子プロセスが固まってもベンチマーク全体は止まらない
+CASE_TIMEOUT_SECONDS = 1800
+KANA = list("あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん")
+
+FULL_SIZES = {
+    "asr_none": [60, 600, 1800],
+    "asr_vad": [60, 600, 1800, 3600, 10800],
+    "words_to_segments": [10_000, 100_000, 1_000_000],
+    "words_to_segments_typed": [10_000, 100_000, 1_000_000],
+    "compare_three_texts": [1_000, 10_000, 50_000],
+    "load_text_file": [1_000, 1_000_000, 10_000_000, 50_000_000],
+}
+
+QUICK_SIZES = {
+    "asr_none": [60, 600],
+    "asr_vad": [60, 600],
+    "words_to_segments": [10_000, 100_000],
+    "words_to_segments_typed": [10_000, 100_000],
+    "compare_three_texts": [1_000, 10_000],
+    "load_text_file": [1_000, 1_000_000],
+}
+
+
+# ----------------------------------------------------------------------------
+# スタブ（ComfyUI / qwen_asr / transformers）
+# ----------------------------------------------------------------------------
+
+class StubGenerationConfig:
+    def __init__(self, max_new_tokens):
+        self.max_new_tokens = max_new_tokens
+        self.pad_token_id = 0
+
+
+class StubASRModule(torch.nn.Module):
+    """
+    HF生成モデルの代わり
+    音声長に比例した決定的なトークン列を返す（1秒あたり5トークン）
+    """
+
+    def __init__(self, max_new_tokens):
+        super().__init__()
+        self.proj = torch.nn.Linear(16, 16)
+        self.generation_config = StubGenerationConfig(max_new_tokens)
+
+    def generate(self, input_ids=None, target_tokens=None, max_new_tokens=None,
+                 stopping_criteria=None, **kwargs):
+        max_new_tokens = max_new_tokens or self.generation_config.max_new_tokens
+        lengths = [min(max_new_tokens, n) for n in target_tokens]
+        width = max(lengths) if lengths else 0
+        out = torch.zeros((input_ids.shape[0], input_ids.shape[1] + width), dtype=torch.long)
+        out[:, :input_ids.shape[1]] = input_ids
+        for row, n in enumerate(lengths):
+            # 行ごと・長さごとに固定シードの乱数列（繰り返しループにならない）
+            generator = torch.Generator().manual_seed(n * 1000 + row)
+            out[row, input_ids.shape[1]:input_ids.shape[1] + n] = torch.randint(
+                1, len(KANA) + 1, (n,), generator=generator
+            )
+        return out
+
+
+class StubQwen3ForcedAligner:
+    """qwen_asr.Qwen3ForcedAligner のスタブ（2文字ごとに等間隔のタイムスタンプ）"""
+
+    def __init__(self):
+        self.model = torch.nn.Linear(16, 16)
+
+    @classmethod
+    def from_pretrained(cls, model_path, **kwargs):
+        return cls()
+
+    def align(self, audio, text, language):
+        results = []
+        for (wav, sr), t in zip(audio, text):
+            duration = len(wav) / sr
+            step = duration / max(1, len(t) // 2)
+            results.append([
+                types.SimpleNamespace(
+                    text=t[i:i + 2],
+                    start_time=(i // 2) * step,
+                    end_time=(i // 2 + 1) * step,
+                )
+                for i in range(0, len(t), 2)
+            ])
+        return results
+
+
+class StubQwen3ASRModel:
+    """qwen_asr.Qwen3ASRModel の決定的なCPUスタブ"""
+
+    def __init__(self, max_new_tokens=8192, max_inference_batch_size=32, forced_aligner=None):
+        self.model = StubASRModule(max_new_tokens)
+        self.max_new_tokens = max_new_tokens
+        self.max_inference_batch_size = max_inference_batch_size
+        self.forced_aligner = forced_aligner
+
+    @classmethod
+    def from_pretrained(cls, model_path, **kwargs):
+        return cls(
+            max_new_tokens=kwargs.get("max_new_tokens", 8192),
+            max_inference_batch_size=kwargs.get("max_inference_batch_size", 32),
+        )
+
+    def transcribe(self, audio, language=None, context=None, return_time_stamps=False):
+        if return_time_stamps and self.forced_aligner is None:
+            raise ValueError("return_time_stamps=True requires `forced_aligner`")
+        audios = audio if isinstance(audio, list) else [audio]
+        languages = language if isinstance(language, list) else [language] * len(audios)
+
+        results = []
+        for start in range(0, len(audios), self.max_inference_batch_size):
+            batch = audios[start:start + self.max_inference_batch_size]
+
+            # 特徴量抽出の代わり: 10msフレームの対数エネルギー
+            durations = []
+            for wav, sr in batch:
+                hop = max(1, sr // 100)
+                frames = np.asarray(wav[:len(wav) // hop * hop], dtype=np.float32).reshape(-1, hop)
+                np.log(np.einsum("ij,ij->i", frames, frames) + 1e-8)
+                durations.append(len(wav) / sr)
+
+            input_ids = torch.ones((len(batch), 8), dtype=torch.long)
+            output = self.model.generate(
+                input_ids=input_ids,
+                target_tokens=[int(d * 5) for d in durations],
+            )
+
+            for row, duration in enumerate(durations):
+                tokens = output[row, input_ids.shape[1]:]
+                tokens = tokens[tokens != 0].tolist()
+                text = "".join(KANA[(t - 1) % len(KANA)] for t in tokens)
+                time_stamps = []
+                if return_time_stamps and text:
+                    time_stamps = self.forced_aligner.align(
+                        audio=[batch[row]], text=[text], language=[languages[start + row]]
+                    )[0]
+                results.append(types.SimpleNamespace(
+                    text=text,
+                    language=languages[start + row] or "Japanese",
+                    time_stamps=time_stamps,
+                ))
+        return results
+
+
+def _install_stubs():
+    """ComfyUI・qwen_asr のスタブモジュールを sys.modules に登録"""
+    os.makedirs(os.path.join(WORK_DIR, "output"), exist_ok=True)
+
+    folder_paths = types.ModuleType("folder_paths")
+    folder_paths.models_dir = os.path.join(WORK_DIR, "models")
+    folder_paths.get_temp_directory = lambda: os.path.join(WORK_DIR, "temp")
+    folder_paths.get_output_directory = lambda: os.path.join(WORK_DIR, "output")
+    folder_paths.add_model_folder_path = lambda *args, **kwargs: None
+    sys.modules["folder_paths"] = folder_paths
+
+    comfy = types.ModuleType("comfy")
+    mm = types.ModuleType("comfy.model_management")
+    mm.get_torch_device = lambda: torch.device("cpu")
+    mm.unet_offload_device = lambda: torch.device("cpu")
+    mm.module_size = lambda module: sum(
+        t.numel() * t.element_size() for t in list(module.parameters()) + list(module.buffers())
+    )
+    mm.load_models_gpu = lambda models, **kwargs: None
+    mm.soft_empty_cache = lambda *args, **kwargs: None
+    mm.get_free_memory = lambda *args, **kwargs: 8 * 1024**3
+    mm.current_loaded_models = []
+    model_patcher = types.ModuleType("comfy.model_patcher")
+
+    class ModelPatcher:
+        def __init__(self, model, load_device=None, offload_device=None, size=0, **kwargs):
+            self.model = model
+            self.load_device = load_device
+            self.offload_device = offload_device
+            self.size = size
+
+    model_patcher.ModelPatcher = ModelPatcher
+    comfy.model_management = mm
+    comfy.model_patcher = model_patcher
+    sys.modules["comfy"] = comfy
+    sys.modules["comfy.model_management"] = mm
+    sys.modules["comfy.model_patcher"] = model_patcher
+
+    qwen_asr = types.ModuleType("qwen_asr")
+    qwen_asr.Qwen3ASRModel = StubQwen3ASRModel
+    qwen_asr.Qwen3ForcedAligner = StubQwen3ForcedAligner
+    sys.modules["qwen_asr"] = qwen_asr
+
+    try:
+        import transformers  # noqa: F401
+    except ImportError:
+        transformers = types.ModuleType("transformers")
+
+        class StoppingCriteria:
+            pass
+
+        class StoppingCriteriaList(list):
+            pass
+
+        transformers.StoppingCriteria = StoppingCriteria
+        transformers.StoppingCriteriaList = StoppingCriteriaList
+        sys.modules["transformers"] = transformers
+
+    try:
+        import torchaudio  # noqa: F401
+    except ImportError:
+        sys.modules["torchaudio"] = types.ModuleType("torchaudio")
+
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+
+# ----------------------------------------------------------------------------
+# 合成入力
+# ----------------------------------------------------------------------------
+
+def synthetic_speech(seconds: float, sr: int = SAMPLE_RATE, seed: int = 0) -> torch.Tensor:
+    """発話(変調ノイズ)と無音が交互に続く合成音声 [1, 1, N]"""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    wav = np.empty(n, dtype=np.float32)
+    pos = 0
+    while pos < n:
+        speech = int(rng.uniform(2.0, 12.0) * sr)
+        silence = int(rng.uniform(0.2, 1.5) * sr)
+        end = min(n, pos + speech)
+        wav[pos:end] = rng.standard_normal(end - pos, dtype=np.float32) * 0.1
+        pos = end
+        end = min(n, pos + silence)
+        wav[pos:end] = rng.standard_normal(end - pos, dtype=np.float32) * 0.001
+        pos = end
+    return torch.from_numpy(wav).view(1, 1, -1)
+
+
+def synthetic_words(n_words: int) -> list:
+    """(start, end, text) の単語タイムスタンプ列"""
+    words = []
+    t = 0.0
+    for i in range(n_words):
+        word = KANA[i % len(KANA)] + KANA[(i * 7) % len(KANA)]
+        if i % 17 == 16:
+            word += "。"
+        words.append((round(t, 2), round(t + 0.3, 2), word))
+        t += 0.32
+    return words
+
+
+def synthetic_words_timestamps(n_words: int) -> str:
+    """Qwen3-ASR形式のタイムスタンプ文字列 ("start-end: text")"""
+    return "\n".join(f"{s:.2f}-{e:.2f}: {w}" for s, e, w in synthetic_words(n_words))
+
+
+def synthetic_text(n_chars: int, seed: int = 0) -> str:
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(KANA), n_chars)
+    return "".join(KANA[i] for i in idx)
+
+
+def _mutate(text: str, rate: float, seed: int) -> str:
+    """一部の文字を置換・削除したテキスト（比較用）"""
+    rng = np.random.default_rng(seed)
+    chars = list(text)
+    for i in rng.choice(len(chars), int(len(chars) * rate), replace=False):
+        chars[i] = "" if rng.random() < 0.5 else KANA[int(rng.integers(0, len(KANA)))]
+    return "".join(chars)
+
+
+# ----------------------------------------------------------------------------
+# ベンチマークケース（子プロセスで実行）
+# ----------------------------------------------------------------------------
+
+def _peak_rss_mb():
+    from nodes.asr_metrics import peak_rss_mb
+    return peak_rss_mb()
+
+
+def case_asr(seconds, chunk_mode):
+    from nodes.qwen3_asr import RogoAI_Qwen3ASRLoader, RogoAI_Qwen3ASRTranscribe
+
+    audio = {"waveform": synthetic_speech(seconds), "sample_rate": SAMPLE_RATE}
+    model_dir = os.path.join(WORK_DIR, "stub_model")
+    os.makedirs(model_dir, exist_ok=True)
+    # Forced Aligner はモデルフォルダが空でなければダウンロードせずに読み込まれる
+    aligner_dir = os.path.join(WORK_DIR, "models", "Qwen3-ASR", "Qwen3-ForcedAligner-0.6B")
+    os.makedirs(aligner_dir, exist_ok=True)
+    open(os.path.join(aligner_dir, "config.json"), "a").close()
+
+    start = time.perf_counter()
+    (model,) = RogoAI_Qwen3ASRLoader().load_model(
+        "Qwen/Qwen3-ASR-0.6B", "HuggingFace", "fp32", "auto",
+        max_new_tokens=32768, forced_aligner="Qwen/Qwen3-ForcedAligner-0.6B",
+        local_model_path=model_dir, model_cache_gb=0,
+    )
+    outputs = RogoAI_Qwen3ASRTranscribe().transcribe(
+        model, audio,
+        language="Japanese",
+        return_timestamps=True,
+        chunk_mode=chunk_mode,
+        use_cache=False,
+    )
+    text, timestamps, metrics_json = outputs[0], outputs[2], outputs[3]
+    wall = time.perf_counter() - start
+    return {
+        "wall_seconds": wall,
+        "chars": len(text),
+        "timestamp_lines": timestamps.count("\n") + 1 if timestamps else 0,
+        "realtime_factor": seconds / wall if wall > 0 else None,
+        "stages": json.loads(metrics_json).get("stages", {}),
+    }
+
+
+def case_words_to_segments(n_words):
+    from nodes.words_to_segments import RogoAI_WordsToSegments
+
+    timestamps = synthetic_words_timestamps(n_words)
+    start = time.perf_counter()
+    _, _, srt, count = RogoAI_WordsToSegments().generate_segments(timestamps, mode="youtube")
+    wall = time.perf_counter() - start
+    return {"wall_seconds": wall, "segments": count, "srt_bytes": len(srt.encode("utf-8"))}
+
+
+def case_words_to_segments_typed(n_words):
+    from nodes.word_timestamps import WordTimestamps
+    from nodes.words_to_segments import RogoAI_WordsToSegments
+
+    words = WordTimestamps.from_tuples(synthetic_words(n_words))
+    start = time.perf_counter()
+    _, _, srt, count = RogoAI_WordsToSegments().generate_segments(
+        "", mode="youtube", word_timestamps=words
+    )
+    wall = time.perf_counter() - start
+    return {"wall_seconds": wall, "segments": count, "srt_bytes": len(srt.encode("utf-8"))}
+
+
+def case_compare_three_texts(n_chars):
+    from nodes.compare_three_texts import RogoAI_CompareThreeTexts
+
+    base = synthetic_text(n_chars)
+    start = time.perf_counter()
+    _, _, acc_a, acc_b, acc_c = RogoAI_CompareThreeTexts().compare_texts(
+        base, "Reference",
+        _mutate(base, 0.05, 1), "ASR 1",
+        _mutate(base, 0.15, 2), "ASR 2",
+        "text_a", f"bench_compare_{n_chars}.html",
+    )
+    wall = time.perf_counter() - start
+    return {"wall_seconds": wall, "accuracy_b": acc_b, "accuracy_c": acc_c}
+
+
+def case_load_text_file(n_bytes):
+    from nodes.load_text_file import RogoAI_LoadTextFile
+
+    path = os.path.join(WORK_DIR, f"bench_text_{n_bytes}.txt")
+    # Shift-JIS で保存し、UTF-8 → UTF-8(BOM) → Shift-JIS の順に試行させる
+    text = synthetic_text(n_bytes // 2)
+    with open(path, "w", encoding="shift-jis") as f:
+        f.write(text)
+
+    start = time.perf_counter()
+    _, encoding, char_count = RogoAI_LoadTextFile().load_text(path)
+    wall = time.perf_counter() - start
+    os.remove(path)
+    return {"wall_seconds": wall, "encoding": encoding, "chars": char_count}
+
+
+CASES = {
+    "asr_none": lambda size: case_asr(size, "none"),
+    "asr_vad": lambda size: case_asr(size, "vad"),
+    "words_to_segments": case_words_to_segments,
+    "words_to_segments_typed": case_words_to_segments_typed,
+    "compare_three_texts": case_compare_three_texts,
+    "load_text_file": case_load_text_file,
+}
+
+
+def _run_case(name, size, queue):
+    _install_stubs()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = CASES[name](size)
+        result["peak_rss_mb"] = _peak_rss_mb()
+        queue.put(result)
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_isolated(name, size, timeout=CASE_TIMEOUT_SECONDS):
+    """
+    ケースを新しいプロセスで実行（ピークRSSをケースごとに分離）
+
+    子プロセスが結果を返さずに終了（クラッシュ）した場合や timeout 秒を超えた場合は
+    {"error": ...} を返す。
+    """
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_case, args=(name, size, queue))
+    proc.start()
+    deadline = time.monotonic() + timeout
+
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1.0)
+        except Empty:
+            if not proc.is_alive():
+                # 終了直前に書き込まれた結果がまだ届いていない場合に備えてもう一度だけ待つ
+                try:
+                    result = queue.get(timeout=1.0)
+                except Empty:
+                    result = {"error": f"process exited with code {proc.exitcode}"}
+            elif time.monotonic() > deadline:
+                proc.terminate()
+                result = {"error": f"timeout after {timeout:.0f}s"}
+
+    proc.join(timeout=10)
+    if proc.is_alive():
+        proc.kill()
+        proc.join()
+    return result
+
+
+def scaling_exponent(points):
+    """log(時間) = k・log(サイズ) + c の k（1.0 = 線形）"""
+    xs = [math.log(p["size"]) for p in points if p.get("wall_seconds")]
+    ys = [math.log(p["wall_seconds"]) for p in points if p.get("wall_seconds")]
+    if len(xs) < 2:
+        return None
+    k = np.polyfit(xs, ys, 1)[0]
+    return round(float(k), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RogoAI ASR offline benchmark")
+    parser.add_argument("--quick", action="store_true", help="小さいサイズのみ実行")
+    parser.add_argument("--only", default="", help="実行するベンチマーク名（カンマ区切り）")
+    parser.add_argument("--output", default="", help="結果JSONの保存先（省略時は標準出力）")
+    parser.add_argument("--timeout", type=float, default=CASE_TIMEOUT_SECONDS,
+                        help="1ケースの制限時間（秒）")
+    args = parser.parse_args()
+
+    sizes = QUICK_SIZES if args.quick else FULL_SIZES
+    names = [n.strip() for n in args.only.split(",") if n.strip()] or list(sizes)
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "torch": torch.__version__,
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+        },
+        "results": {},
+        "scaling": {},
+    }
+
+    for name in names:
+        points = []
+        for size in sizes[name]:
+            print(f"▶ {name} size={size:,}", file=sys.stderr, flush=True)
+            result = {"size": size, **run_isolated(name, size, args.timeout)}
+            points.append(result)
+            if "error" in result:
+                print(f"  ❌ {result['error']}", file=sys.stderr)
+            else:
+                print(f"  ⏱️  {result['wall_seconds']:.3f}s  💾 {result['peak_rss_mb']:.0f} MB",
+                      file=sys.stderr)
+        report["results"][name] = points
+        report["scaling"][name] = scaling_exponent(points)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"📄 Saved: {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
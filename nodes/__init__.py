@@ -8,11 +8,24 @@ from .extract_audio import RogoAI_ExtractAudioFromVideo
 # Extract Audio v2 (保存先選択機能付き)
 from .extract_audio_v2 import RogoAI_ExtractAudioFromVideo_v2
 
+# Extract Audio to Memory (ファイルを書き出さずに AUDIO を出力)
+from .extract_audio_memory import RogoAI_ExtractAudioToMemory
+
+# Extract Audio Batch (複数動画の並列抽出)
+from .extract_audio_batch import RogoAI_ExtractAudioBatch
+
+# Probe Media (メディア情報の取得・キャッシュ)
+from .media_probe import RogoAI_ProbeMedia
+
 # Qwen3-ASR
 from .qwen3_asr import (
     RogoAI_Qwen3ASRLoader,
-    RogoAI_Qwen3ASRTranscribe
+    RogoAI_Qwen3ASRTranscribe,
+    RogoAI_Qwen3ASRUnload
 )
+from .qwen3_asr_batch import RogoAI_Qwen3ASRBatchTranscribe
+from .qwen3_asr_file import RogoAI_Qwen3ASRTranscribeFile
+from .qwen3_asr_align import RogoAI_Qwen3ASRAlign
 
 # Compare Three Texts (精度比較ツール)
 from .compare_three_texts import RogoAI_CompareThreeTexts
@@ -28,10 +41,17 @@ NODE_CLASS_MAPPINGS = {
     # Extract Audio
     "RogoAI_ExtractAudioFromVideo": RogoAI_ExtractAudioFromVideo,
     "RogoAI_ExtractAudioFromVideo_v2": RogoAI_ExtractAudioFromVideo_v2,
+    "RogoAI_ExtractAudioToMemory": RogoAI_ExtractAudioToMemory,
+    "RogoAI_ExtractAudioBatch": RogoAI_ExtractAudioBatch,
+    "RogoAI_ProbeMedia": RogoAI_ProbeMedia,
     
     # Qwen3-ASR
     "RogoAI_Qwen3ASRLoader": RogoAI_Qwen3ASRLoader,
     "RogoAI_Qwen3ASRTranscribe": RogoAI_Qwen3ASRTranscribe,
+    "RogoAI_Qwen3ASRUnload": RogoAI_Qwen3ASRUnload,
+    "RogoAI_Qwen3ASRBatchTranscribe": RogoAI_Qwen3ASRBatchTranscribe,
+    "RogoAI_Qwen3ASRTranscribeFile": RogoAI_Qwen3ASRTranscribeFile,
+    "RogoAI_Qwen3ASRAlign": RogoAI_Qwen3ASRAlign,
     
     # Analysis
     "RogoAI_CompareThreeTexts": RogoAI_CompareThreeTexts,
@@ -48,10 +68,17 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     # Extract Audio
     "RogoAI_ExtractAudioFromVideo": "RogoAI Extract Audio from Video",
     "RogoAI_ExtractAudioFromVideo_v2": "RogoAI Extract Audio v2 📁",
+    "RogoAI_ExtractAudioToMemory": "RogoAI Extract Audio to Memory 🎧",
+    "RogoAI_ExtractAudioBatch": "RogoAI Extract Audio Batch 🎬",
+    "RogoAI_ProbeMedia": "RogoAI Probe Media 🔎",
     
     # Qwen3-ASR
     "RogoAI_Qwen3ASRLoader": "RogoAI Qwen3-ASR Loader (Long Audio)",
     "RogoAI_Qwen3ASRTranscribe": "RogoAI Qwen3-ASR Transcribe (Long Audio)",
+    "RogoAI_Qwen3ASRUnload": "RogoAI Qwen3-ASR Unload 🧹",
+    "RogoAI_Qwen3ASRBatchTranscribe": "RogoAI Qwen3-ASR Batch Transcribe 📚",
+    "RogoAI_Qwen3ASRTranscribeFile": "RogoAI Qwen3-ASR Transcribe File 📂",
+    "RogoAI_Qwen3ASRAlign": "RogoAI Qwen3-ASR Align 🎯",
     
     # Analysis
     "RogoAI_CompareThreeTexts": "RogoAI Compare Three Texts 📊",
@@ -0,0 +1,198 @@
+"""
+RogoAI ASR Cache
+文字起こし結果のディスクキャッシュ（コンテンツアドレス方式）
+
+キー: 音声波形のハッシュ + モデルID・精度・言語・コンテキスト・タイムスタンプ有無など
+値  : text / language / time_stamps を含むJSON
+
+同じ録音を同じ設定で再実行した場合、ASRを丸ごとスキップできる。
+容量を超えた場合は最終アクセスが古いものから削除（LRU）。
+
+JobCheckpoint: 処理中のジョブのチャンク結果を JSON Lines で逐次保存し、
+クラッシュ・OOM 後の再実行では完了済みチャンクをスキップして再開する。
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import folder_paths
+
+
+DEFAULT_TRANSCRIPT_CACHE_MB = 512
+
+
+def hash_waveform(wav: np.ndarray, sr: int, block_samples: int = 1 << 22) -> str:
+    """
+    波形データのハッシュを計算（ブロック単位で処理し、コピーを作らない）
+    """
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{sr}:{wav.dtype.str}:{len(wav)}".encode())
+    wav = np.ascontiguousarray(wav)
+    for start in range(0, len(wav), block_samples):
+        h.update(memoryview(wav[start:start + block_samples]).cast("B"))
+    return h.hexdigest()
+
+
+def hash_file_identity(path: str) -> str:
+    """
+    ファイルの同一性ハッシュ（絶対パス・サイズ・更新日時）
+
+    ファイル全体を読まずにキーを作るため、巨大な録音ファイルでも即座に計算できる。
+    """
+    stat = os.stat(path)
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+def hash_file_content(path: str, block_size: int = 1 << 22) -> str:
+    """
+    ファイル内容のハッシュ（ブロック単位で読み込み）
+
+    パスや更新日時が変わっても（移動・コピー）同じ内容なら同じ値になる。
+    """
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class TranscriptCache:
+    """
+    文字起こし結果のLRUディスクキャッシュ
+
+    1エントリ = 1 JSONファイル。ヒット時にファイルの更新日時を更新し、
+    容量超過時は更新日時が古い順に削除する。
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = DEFAULT_TRANSCRIPT_CACHE_MB * 1024 * 1024):
+        if cache_dir is None:
+            cache_dir = os.path.join(folder_paths.get_output_directory(), "rogoai_cache", "transcripts")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(wav_hash: str, **params) -> str:
+        """波形ハッシュと推論パラメータからキャッシュキーを生成"""
+        payload = json.dumps({"wav": wav_hash, **params}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        # LRU: アクセス日時を更新
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key: str, value: dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+class JobCheckpoint:
+    """
+    長尺ジョブのチャンク単位チェックポイント（1ジョブ = 1 JSON Lines ファイル）
+
+    キーは TranscriptCache と同じ（音声ハッシュ + 推論パラメータ）。
+    1行 = 1レコードで、チャンク完了ごとに追記する:
+        {"type": "language", "language": "Japanese"}
+        {"type": "chunk", "span": [start_sample, end_sample], "text": ..., ...}
+    書き込み途中で落ちた最終行は読み込み時に無視する。ジョブ完了後は discard() で削除。
+    """
+
+    def __init__(self, key: str, job_dir: str = None):
+        if job_dir is None:
+            job_dir = os.path.join(folder_paths.get_output_directory(), "rogoai_cache", "jobs")
+        self.path = os.path.join(job_dir, f"{key}.jsonl")
+        self._needs_newline = False
+
+    def load(self):
+        """
+        保存済みの状態を読み込む
+
+        戻り値: (language, chunks)
+            chunks は (start_sample, end_sample) → チャンク dict（time_stamps はタプル列）
+        """
+        language = None
+        chunks = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    # 改行のない最終行 = 書き込み途中で中断（次の追記の前に改行を補う）
+                    self._needs_newline = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if record.get("type") == "language":
+                        language = record.get("language") or None
+                    elif record.get("type") == "chunk":
+                        span = tuple(record.pop("span"))
+                        record.pop("type")
+                        record["time_stamps"] = [tuple(ts) for ts in record.get("time_stamps", [])]
+                        chunks[span] = record
+        except OSError:
+            pass
+        return language, chunks
+
+    def _append(self, record: dict):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            if self._needs_newline:
+                f.write("\n")
+                self._needs_newline = False
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+
+    def save_language(self, language: str):
+        self._append({"type": "language", "language": language})
+
+    def save_chunk(self, span, chunk: dict):
+        self._append({"type": "chunk", "span": [int(span[0]), int(span[1])], **chunk})
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,146 @@
+"""
+RogoAI ASR Metrics
+文字起こしパイプラインのステージ別計測
+
+計測項目:
+- ステージ別処理時間（音声変換・リサンプリング・生成・アライメント・後処理、
+  model.transcribe 内のそれ以外の時間は preprocess_overhead）
+- 生成トークン数・トークン/秒
+- ピークRSS（この計測中の最大値。ステージの開始・終了ごとに現在のRSSを測定）
+  ※ process_peak_rss_mb はプロセス起動以降の最大値（常駐サーバーでは過去の最大ジョブの値）
+- ピークデバイスメモリ（CUDA使用時）
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+import torch
+
+
+def current_rss_mb():
+    """プロセスの現在のRSS（MB）。取得できない環境では None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+
+    try:
+        # Linux: /proc/self/statm の2番目 = 常駐ページ数
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def peak_rss_mb():
+    """
+    プロセスのピークRSS（MB）。取得できない環境では None
+
+    プロセス起動以降の最大値で、途中でリセットできない（1ジョブ1プロセスのベンチマーク向け）。
+    """
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        peak = getattr(info, "peak_wset", None)  # Windows
+        if peak is not None:
+            return peak / (1024 * 1024)
+    except ImportError:
+        pass
+
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux は KB、macOS は byte 単位
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
+
+
+class ASRMetrics:
+    """
+    ステージ別の処理時間とカウンタを集計するクラス
+
+    reset_peak=True はノード単位の計測の開始時だけに使う（CUDAのピーク値はプロセス全体で1つのため、
+    ヘルパー内で作る一時的なインスタンスがリセットすると外側の計測値が壊れる）。
+
+    使用例:
+        metrics = ASRMetrics(reset_peak=True)
+        with metrics.stage("audio_conversion"):
+            ...
+        metrics.add("generated_tokens", 123)
+        print(metrics.to_json(audio_duration=60.0))
+    """
+
+    def __init__(self, reset_peak: bool = False):
+        self.stages = {}
+        self.counters = {}
+        self.start_time = time.perf_counter()
+        self.rss_start_mb = current_rss_mb()
+        self.rss_peak_mb = self.rss_start_mb
+        self.cuda = torch.cuda.is_available()
+        if self.cuda and reset_peak:
+            torch.cuda.reset_peak_memory_stats()
+
+    def sample_rss(self):
+        """現在のRSSを測定し、この計測中のピークを更新"""
+        rss = current_rss_mb()
+        if rss is not None and (self.rss_peak_mb is None or rss > self.rss_peak_mb):
+            self.rss_peak_mb = rss
+
+    @contextmanager
+    def stage(self, name: str):
+        self.sample_rss()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        # 計測区間の終了時点（生成直後など）のRSSもピークに反映
+        self.sample_rss()
+
+    def add(self, name: str, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self, audio_duration: float = 0.0, **extra) -> dict:
+        total = time.perf_counter() - self.start_time
+        self.sample_rss()
+        tokens = self.counters.get("generated_tokens", 0)
+        generation = self.stages.get("generation", 0.0)
+
+        result = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "audio_seconds": round(audio_duration, 3),
+            "total_seconds": round(total, 3),
+            "realtime_factor": round(audio_duration / total, 2) if total > 0 else None,
+            "stages": {name: round(seconds, 3) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            "tokens_per_second": round(tokens / generation, 1) if generation > 0 else None,
+            "peak_rss_mb": self.rss_peak_mb,
+            "start_rss_mb": self.rss_start_mb,
+            "process_peak_rss_mb": peak_rss_mb(),
+            "peak_device_mb": (
+                torch.cuda.max_memory_allocated() / (1024 * 1024) if self.cuda else None
+            ),
+        }
+        result.update(extra)
+        return result
+
+    def to_json(self, audio_duration: float = 0.0, **extra) -> str:
+        return json.dumps(self.to_dict(audio_duration, **extra), ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def append_to_file(path: str, metrics: dict):
+        """JSON Lines 形式でメトリクスファイルに追記"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(metrics, ensure_ascii=False) + "\n")
@@ -0,0 +1,517 @@
+"""
+RogoAI Audio Utilities
+長尺音声処理用のヘルパー関数群（NumPyによるベクトル化処理）
+
+機能:
+- ComfyUI AUDIO → モノラルNumPy配列への変換（可能な限りコピーなし）
+- ポリフェーズFIRリサンプラー（フィルタ係数をレート組ごとにキャッシュ）
+- WAVファイルのメモリマップ読み込み + 16kHz への遅延リサンプリング
+- フレーム単位のエネルギー計算（ブロック処理でメモリ節約）
+- フレーム単位のスペクトル平坦度計算・非音声区間の検出
+- 無音位置での音声分割（VADチャンク分割）
+- 重なり付きの固定長ウィンドウ分割
+"""
+
+import os
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+import torch
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+INT16_SCALE = 1.0 / 32768.0
+
+# Qwen3-ASR のネイティブサンプルレート
+MODEL_SAMPLE_RATE = 16000
+
+
+def as_float32(wav: np.ndarray) -> np.ndarray:
+    """
+    float32 に変換（既に float32 ならそのまま返す）
+    int16 は [-1, 1) に正規化する
+    """
+    if wav.dtype == np.float32:
+        return wav
+    if wav.dtype == np.int16:
+        out = wav.astype(np.float32)
+        out *= INT16_SCALE
+        return out
+    return wav.astype(np.float32)
+
+
+def waveform_to_mono(waveform, keep_int16: bool = False,
+                     block_samples: int = 1 << 20) -> np.ndarray:
+    """
+    [channels, samples] の波形をモノラルの1次元配列に変換
+
+    - モノラル float32（CPU）の場合はコピーせずビューを返す
+    - keep_int16=True の場合、int16 はモデルに渡す直前まで int16 のまま保持
+    - 複数チャンネルは事前確保したバッファにブロック単位でダウンミックス
+      （全長の一時配列を作らない）
+    """
+    if isinstance(waveform, torch.Tensor):
+        if waveform.device.type != "cpu":
+            waveform = waveform.cpu()
+        if waveform.requires_grad:
+            waveform = waveform.detach()
+        if waveform.dtype not in (torch.float32, torch.float64, torch.int16):
+            waveform = waveform.float()
+        data = waveform.numpy()
+    else:
+        data = np.asarray(waveform)
+
+    if data.ndim == 1:
+        data = data[np.newaxis, :]
+
+    if data.shape[0] == 1:
+        mono = data[0]
+        if keep_int16 and mono.dtype == np.int16:
+            return mono
+        return as_float32(mono)
+
+    scale = INT16_SCALE if data.dtype == np.int16 else 1.0
+    channels, total = data.shape
+    if keep_int16 and data.dtype == np.int16:
+        out = np.empty(total, dtype=np.int16)
+        for start in range(0, total, block_samples):
+            block = data[:, start:start + block_samples]
+            out[start:start + block.shape[1]] = block.mean(axis=0, dtype=np.float32)
+        return out
+
+    out = np.empty(total, dtype=np.float32)
+    for start in range(0, total, block_samples):
+        block = data[:, start:start + block_samples]
+        view = out[start:start + block.shape[1]]
+        np.mean(block, axis=0, dtype=np.float32, out=view)
+        if scale != 1.0:
+            view *= scale
+    return out
+
+
+def frame_energy_db(wav: np.ndarray, sr: int, frame_ms: float = 20.0,
+                    block_frames: int = 65536) -> np.ndarray:
+    """
+    フレームごとのエネルギー(dB)を計算
+
+    全長の二乗配列を作らないよう、ブロック単位で einsum を使って計算する。
+    末尾の端数サンプルは最後のフレームとして扱う。
+    """
+    frame_len = max(1, int(sr * frame_ms / 1000))
+    n_full = len(wav) // frame_len
+    has_tail = len(wav) % frame_len != 0
+    energy = np.empty(n_full + (1 if has_tail else 0), dtype=np.float32)
+
+    for start in range(0, n_full, block_frames):
+        stop = min(n_full, start + block_frames)
+        frames = np.asarray(
+            wav[start * frame_len:stop * frame_len], dtype=np.float32
+        ).reshape(stop - start, frame_len)
+        energy[start:stop] = np.einsum("ij,ij->i", frames, frames) / frame_len
+
+    if has_tail:
+        tail = np.asarray(wav[n_full * frame_len:], dtype=np.float32)
+        energy[-1] = float(np.dot(tail, tail)) / len(tail)
+
+    return 10.0 * np.log10(energy + 1e-10)
+
+
+def frame_spectral_flatness(wav: np.ndarray, sr: int, frame_ms: float = 20.0,
+                            block_frames: int = 16384) -> np.ndarray:
+    """
+    フレームごとのスペクトル平坦度（0〜1）を計算
+
+    平坦度 = パワースペクトルの幾何平均 / 算術平均。
+    ホワイトノイズに近いほど 1、音声・楽音のような調波成分が強いほど 0 に近い。
+    末尾の端数サンプルは最後のフレームとして扱う（frame_energy_db と同じフレーム数）。
+    """
+    frame_len = max(1, int(sr * frame_ms / 1000))
+    n_frames = -(-len(wav) // frame_len)
+    n_fft = 1 << max(1, (frame_len - 1).bit_length())
+    window = np.hanning(frame_len).astype(np.float32)
+    flatness = np.empty(n_frames, dtype=np.float32)
+
+    for start in range(0, n_frames, block_frames):
+        stop = min(n_frames, start + block_frames)
+        block = np.asarray(wav[start * frame_len:stop * frame_len], dtype=np.float32)
+        if len(block) < (stop - start) * frame_len:
+            block = np.pad(block, (0, (stop - start) * frame_len - len(block)))
+        frames = block.reshape(stop - start, frame_len) * window
+        power = np.abs(np.fft.rfft(frames, n=n_fft, axis=1)) ** 2 + 1e-12
+        flatness[start:stop] = np.exp(np.log(power).mean(axis=1)) / power.mean(axis=1)
+
+    return flatness
+
+
+def speech_regions(wav: np.ndarray, sr: int, threshold_db: float = -45.0,
+                   flatness_threshold: float = 0.45, frame_ms: float = 20.0,
+                   min_silence_ms: float = 1000.0, pad_ms: float = 250.0) -> list:
+    """
+    非音声区間を除いた音声区間 (start_sample, end_sample) のリストを返す
+
+    エネルギーが threshold_db 未満、またはスペクトル平坦度が flatness_threshold 以上
+    （ノイズ的）のフレームを非音声とみなし、min_silence_ms 以上続く非音声区間だけを除く。
+    ホワイトノイズの平坦度は約 0.56、音声は通常 0.3 未満。
+    残す区間の前後には pad_ms の余白を付ける（語頭・語尾の切れ防止）。
+    返す区間は元音声のサンプル位置なので、そのままオフセットとして使える。
+    """
+    total = len(wav)
+    if total == 0:
+        return []
+
+    frame_len = max(1, int(sr * frame_ms / 1000))
+    energy = frame_energy_db(wav, sr, frame_ms)
+    flatness = frame_spectral_flatness(wav, sr, frame_ms)
+    # 平坦度はフレームごとのばらつきが大きいため 100ms の移動平均で平滑化
+    smooth_frames = max(1, int(100.0 / frame_ms))
+    if smooth_frames > 1 and len(flatness) > smooth_frames:
+        kernel = np.ones(smooth_frames, dtype=np.float32) / smooth_frames
+        flatness = np.convolve(flatness, kernel, mode="same")
+    non_speech = (energy < threshold_db) | (flatness >= flatness_threshold)
+
+    # 非音声フレームの連続区間 [starts, ends) を求める
+    edges = np.diff(np.concatenate(([0], non_speech.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    min_frames = max(1, int(min_silence_ms / frame_ms))
+    pad = int(sr * pad_ms / 1000)
+    regions = []
+    cursor = 0
+    for start, end in zip(starts, ends):
+        if end - start < min_frames:
+            continue
+        # 先頭・末尾の非音声区間には余白を付けない
+        cut_start = max(cursor, start * frame_len + (pad if start > 0 else 0))
+        cut_end = min(total, end * frame_len - (pad if end < len(non_speech) else 0))
+        if cut_end <= cut_start:
+            continue
+        if cut_start > cursor:
+            regions.append((int(cursor), int(cut_start)))
+        cursor = cut_end
+    if cursor < total:
+        regions.append((int(cursor), total))
+
+    return regions
+
+
+def split_on_silence(wav: np.ndarray, sr: int, max_chunk_seconds: float = 30.0,
+                     min_chunk_seconds: float = None, frame_ms: float = 20.0,
+                     smooth_ms: float = 300.0, regions: list = None) -> list:
+    """
+    無音位置で音声をチャンク分割し、(start_sample, end_sample) のリストを返す
+
+    各チャンクは [min_chunk_seconds, max_chunk_seconds] の範囲内で、
+    平滑化したエネルギーが最も低いフレーム（=最も静かな位置）で区切る。
+    発話の途中で切れることを避けつつ、チャンク長の上限を保証する。
+    regions（speech_regions の戻り値など）を指定すると、その区間の中だけを分割する。
+    """
+    total = len(wav)
+    if regions is None:
+        regions = [(0, total)] if total > 0 else []
+    max_chunk = int(max_chunk_seconds * sr)
+    if all(end - start <= max_chunk for start, end in regions):
+        return [(start, end) for start, end in regions if end > start]
+
+    if min_chunk_seconds is None:
+        min_chunk_seconds = max_chunk_seconds * 0.5
+    min_chunk = int(min(min_chunk_seconds, max_chunk_seconds) * sr)
+
+    frame_len = max(1, int(sr * frame_ms / 1000))
+    energy = frame_energy_db(wav, sr, frame_ms)
+
+    # 移動平均で平滑化（単発のクリック音などで区切らないように）
+    smooth_frames = max(1, int(smooth_ms / frame_ms))
+    if smooth_frames > 1 and len(energy) > smooth_frames:
+        kernel = np.ones(smooth_frames, dtype=np.float32) / smooth_frames
+        energy = np.convolve(energy, kernel, mode="same")
+
+    spans = []
+    for start, end in regions:
+        while end - start > max_chunk:
+            lo = (start + min_chunk) // frame_len
+            hi = max(lo + 1, (start + max_chunk) // frame_len)
+            cut_frame = lo + int(np.argmin(energy[lo:hi]))
+            cut = min(end, max(start + 1, cut_frame * frame_len + frame_len // 2))
+            spans.append((start, cut))
+            start = cut
+
+        if start < end:
+            spans.append((start, end))
+
+    return spans
+
+
+def fixed_windows(total: int, sr: int, window_seconds: float = 30.0,
+                  overlap_seconds: float = 2.0, regions: list = None) -> list:
+    """
+    固定長・重なり付きのウィンドウ (start_sample, end_sample) のリストを返す
+
+    ウィンドウは window_seconds ごとに (window_seconds - overlap_seconds) ずつ進める。
+    最後のウィンドウは末尾に揃えて前にずらし、全ウィンドウをほぼ同じ長さに保つ
+    （1ウィンドウあたりの推論コスト・メモリが音声長によらず一定になる）。
+    regions を指定すると、その区間ごとにウィンドウを作る。
+    """
+    if regions is None:
+        regions = [(0, total)] if total > 0 else []
+    window = max(1, int(window_seconds * sr))
+    overlap = min(int(overlap_seconds * sr), window // 2)
+    step = window - overlap
+
+    spans = []
+    for start, end in regions:
+        pos = start
+        while pos < end:
+            if pos + window >= end:
+                spans.append((max(start, end - window), end))
+                break
+            spans.append((pos, pos + window))
+            pos += step
+    return spans
+
+
+@lru_cache(maxsize=16)
+def polyphase_kernel(sr_in: int, sr_out: int, kaiser_beta: float = 5.0):
+    """
+    (sr_in, sr_out) の組ごとにポリフェーズ分解したFIRフィルタを作成（キャッシュ）
+
+    フィルタ設計は scipy.signal.resample_poly と同等:
+    カットオフ 1/max(up, down)、長さ 2*10*max(up, down)+1 の Kaiser 窓付き sinc。
+
+    戻り値: (up, down, half_len, taps, kernels)
+        kernels[p] は位相 p の係数を時間反転したもの（shape: [up, taps]）
+    """
+    g = gcd(sr_in, sr_out)
+    up, down = sr_out // g, sr_in // g
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+
+    n = np.arange(-half_len, half_len + 1, dtype=np.float64)
+    h = np.sinc(n / max_rate) * np.kaiser(2 * half_len + 1, kaiser_beta)
+    h *= up / h.sum()
+
+    taps = -(-len(h) // up)
+    padded = np.zeros(taps * up, dtype=np.float64)
+    padded[:len(h)] = h
+    # kernels[p, j] = h[p + j*up] を時間反転
+    kernels = padded.reshape(taps, up).T[:, ::-1]
+    return up, down, half_len, taps, np.ascontiguousarray(kernels, dtype=np.float32)
+
+
+def resampled_length(n_in: int, sr_in: int, sr_out: int = MODEL_SAMPLE_RATE) -> int:
+    """リサンプリング後のサンプル数（resample_poly と同じく切り上げ）"""
+    if sr_in == sr_out:
+        return n_in
+    up, down = polyphase_kernel(int(sr_in), int(sr_out))[:2]
+    return -(-n_in * up // down)
+
+
+def _resample_range(read, n_in: int, sr_in: int, sr_out: int, m_start: int, m_stop: int,
+                    block_outputs: int = 1 << 16) -> np.ndarray:
+    """
+    出力サンプル範囲 [m_start, m_stop) だけをリサンプリング
+
+    read(lo, hi) は入力範囲 [lo, hi) のモノラル float32 を返す関数（0 <= lo < hi <= n_in）。
+    範囲外はゼロ埋めとして扱うため、全体を一括変換した結果と同じ値になる。
+
+    同じ位相の出力は入力上で down サンプル間隔に並ぶため、位相ごとに
+    スライディングウィンドウ × 係数ベクトルの行列積1回で計算する。
+    """
+    up, down, half_len, taps, kernels = polyphase_kernel(int(sr_in), int(sr_out))
+    out = np.empty(max(0, m_stop - m_start), dtype=np.float32)
+
+    # ブロック長を up の倍数にして、ブロック内の位相パターンを固定
+    block = max(up, block_outputs // up * up)
+    for m0 in range(m_start, m_stop, block):
+        m1 = min(m_stop, m0 + block)
+
+        # このブロックが参照する入力範囲 [lo, hi)（範囲外はゼロ）
+        lo = (m0 * down + half_len) // up - taps + 1
+        hi = ((m1 - 1) * down + half_len) // up + 1
+        local = np.zeros(hi - lo, dtype=np.float32)
+        src_lo, src_hi = max(0, lo), min(n_in, hi)
+        if src_hi > src_lo:
+            local[src_lo - lo:src_hi - lo] = read(src_lo, src_hi)
+        windows = sliding_window_view(local, taps)
+
+        for r in range(min(up, m1 - m0)):
+            k = (m0 + r) * down + half_len
+            phase, n0 = k % up, k // up
+            count = len(range(m0 + r, m1, up))
+            start = n0 - taps + 1 - lo
+            out[m0 - m_start + r:m1 - m_start:up] = (
+                windows[start:start + (count - 1) * down + 1:down] @ kernels[phase]
+            )
+
+    return out
+
+
+def resample_audio(wav: np.ndarray, sr_in: int, sr_out: int = MODEL_SAMPLE_RATE,
+                   block_outputs: int = 1 << 16) -> np.ndarray:
+    """
+    ポリフェーズFIRでリサンプリング（出力ブロック単位で処理し、メモリ使用量を一定に保つ）
+    """
+    if sr_in == sr_out:
+        return as_float32(wav)
+
+    return _resample_range(
+        lambda lo, hi: as_float32(wav[lo:hi]),
+        len(wav), sr_in, sr_out,
+        0, resampled_length(len(wav), sr_in, sr_out),
+        block_outputs,
+    )
+
+
+# WAVE フォーマットタグ
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavMemmapReader:
+    """
+    PCM / float WAV ファイルをメモリマップで読むリーダー
+
+    ファイル全体をデコードせず、要求された範囲だけをモノラル float32 に変換する。
+    対応形式: 8/16/24/32bit 整数PCM、32/64bit float（WAVE_FORMAT_EXTENSIBLE 含む）
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(12)
+            if len(header) < 12 or header[:4] not in (b"RIFF", b"RF64") or header[8:12] != b"WAVE":
+                raise ValueError(f"Not a RIFF/WAVE file: {path}")
+
+            fmt = None
+            data_offset = data_size = None
+            while True:
+                chunk = f.read(8)
+                if len(chunk) < 8:
+                    break
+                chunk_id = chunk[:4]
+                chunk_size = int.from_bytes(chunk[4:8], "little")
+                if chunk_id == b"fmt ":
+                    fmt = f.read(chunk_size)
+                elif chunk_id == b"data":
+                    data_offset = f.tell()
+                    data_size = chunk_size
+                    break
+                else:
+                    f.seek(chunk_size, os.SEEK_CUR)
+                if chunk_size % 2:
+                    f.seek(1, os.SEEK_CUR)
+
+        if fmt is None or data_offset is None:
+            raise ValueError(f"WAV file has no fmt/data chunk: {path}")
+
+        format_tag = int.from_bytes(fmt[0:2], "little")
+        self.channels = int.from_bytes(fmt[2:4], "little")
+        self.sample_rate = int.from_bytes(fmt[4:8], "little")
+        block_align = int.from_bytes(fmt[12:14], "little")
+        self.bits_per_sample = int.from_bytes(fmt[14:16], "little")
+        if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+            format_tag = int.from_bytes(fmt[24:26], "little")
+
+        # ストリーミング書き出しで data サイズが未確定（0 / 0xFFFFFFFF）の場合はファイル末尾まで
+        file_size = os.path.getsize(path)
+        if data_size in (0, 0xFFFFFFFF) or data_offset + data_size > file_size:
+            data_size = file_size - data_offset
+
+        width = self.bits_per_sample // 8
+        if format_tag == WAVE_FORMAT_PCM and self.bits_per_sample in (8, 16, 24, 32):
+            self._kind = "int"
+        elif format_tag == WAVE_FORMAT_IEEE_FLOAT and self.bits_per_sample in (32, 64):
+            self._kind = "float"
+        else:
+            raise ValueError(
+                f"Unsupported WAV format (tag=0x{format_tag:04x}, bits={self.bits_per_sample}): {path}"
+            )
+        if block_align != width * self.channels or self.channels < 1:
+            raise ValueError(f"Unsupported WAV block alignment: {path}")
+
+        self.num_frames = data_size // block_align
+        if width == 3:
+            dtype = np.uint8
+            shape = (self.num_frames, self.channels, 3)
+        else:
+            dtype = {
+                ("int", 1): np.uint8, ("int", 2): "<i2", ("int", 4): "<i4",
+                ("float", 4): "<f4", ("float", 8): "<f8",
+            }[(self._kind, width)]
+            shape = (self.num_frames, self.channels)
+        self._data = np.memmap(path, dtype=dtype, mode="r", offset=data_offset, shape=shape) \
+            if self.num_frames > 0 else np.zeros(shape, dtype=dtype)
+
+    @property
+    def duration(self) -> float:
+        return self.num_frames / self.sample_rate if self.sample_rate else 0.0
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        """フレーム範囲 [start, stop) をモノラル float32 で返す"""
+        start = max(0, start)
+        stop = min(self.num_frames, stop)
+        if stop <= start:
+            return np.zeros(0, dtype=np.float32)
+
+        block = self._data[start:stop]
+        width = self.bits_per_sample // 8
+        if width == 3:
+            # 24bit: 3バイトを符号付き32bitの上位に詰めてから正規化
+            raw = block.astype(np.int32)
+            block = (raw[..., 0] << 8) | (raw[..., 1] << 16) | (raw[..., 2] << 24)
+            scale = 1.0 / 2147483648.0
+        elif self._kind == "float":
+            scale = 1.0
+        elif width == 1:
+            block = block.astype(np.float32) - 128.0
+            scale = 1.0 / 128.0
+        else:
+            scale = 1.0 / float(1 << (self.bits_per_sample - 1))
+
+        # メモリマップへのビューを外に出さないよう、必ず新しい配列を返す
+        out = np.mean(block, axis=1, dtype=np.float32) if self.channels > 1 \
+            else np.array(block[:, 0], dtype=np.float32)
+        if scale != 1.0:
+            out *= scale
+        return out
+
+    def close(self):
+        """メモリマップへの参照を解放（実際のアンマップは参照がなくなった時点）"""
+        self._data = np.zeros((0,) + self._data.shape[1:], dtype=self._data.dtype)
+
+
+class LazyResampledAudio:
+    """
+    WavMemmapReader を 16kHz モノラルの1次元配列のように扱うビュー
+
+    len() とスライス（wav[s:e]）だけをサポートし、スライスされた範囲だけを
+    読み込み・リサンプリングする。VAD分割・チャンク推論にそのまま渡せるため、
+    メモリ使用量は録音長ではなくチャンク長で決まる。
+    """
+
+    dtype = np.dtype(np.float32)
+    ndim = 1
+
+    def __init__(self, reader: WavMemmapReader, sr_out: int = MODEL_SAMPLE_RATE):
+        self.reader = reader
+        self.sample_rate = sr_out
+        self._length = resampled_length(reader.num_frames, reader.sample_rate, sr_out)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("LazyResampledAudio supports slicing only")
+        start, stop, step = index.indices(self._length)
+        if step != 1:
+            raise ValueError("LazyResampledAudio does not support slice steps")
+        if self.reader.sample_rate == self.sample_rate:
+            return self.reader.read(start, stop)
+        return _resample_range(
+            self.reader.read, self.reader.num_frames,
+            self.reader.sample_rate, self.sample_rate,
+            start, max(start, stop),
+        )
@@ -1,13 +1,30 @@
 """
 RogoAI Extract Audio From Video
 動画ファイルから音声を抽出するノード（外部プロセスで実行）
+
+抽出結果は ExtractionCache に保存し、同じ動画（パス・サイズ・更新日時）・同じ設定なら再利用する。
+返すのは ComfyUI/temp 内のファイル（キャッシュからハードリンク、不可ならコピー）で、
+キャッシュの整理（LRU削除）の影響を受けない。
+ソースが既に目的の形式ならコピー、コーデック等が一致すればストリームコピーで取り出す（再エンコードなし）。
 """
 
+import hashlib
 import os
 import subprocess
-import folder_paths
 from pathlib import Path
 
+import folder_paths
+
+from .ffmpeg_utils import (
+    ExtractionCache,
+    build_extract_command,
+    fast_path,
+    find_ffmpeg,
+    link_or_copy,
+    probe_media,
+    run_extract,
+)
+
 class RogoAI_ExtractAudioFromVideo:
     """
     動画から音声を抽出（外部プロセスで実行、ComfyUIに負担をかけない）
@@ -52,19 +69,12 @@ class RogoAI_ExtractAudioFromVideo:
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"動画ファイルが見つかりません: {video_path}")
         
-        # 出力先を決定
-        temp_dir = folder_paths.get_temp_directory()
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        video_name = Path(video_path).stem
-        # ファイル名にハッシュを追加して一意性を確保
-        import hashlib
-        path_hash = hashlib.md5(video_path.encode()).hexdigest()[:8]
-        audio_filename = f"{video_name}_{path_hash}.{output_format}"
-        audio_path = os.path.join(temp_dir, audio_filename)
-        
-        # 既存ファイルがあればスキップ
-        if os.path.exists(audio_path):
+        # 抽出キャッシュ（動画のパス・サイズ・更新日時 + 形式・サンプルレート）
+        cache = ExtractionCache()
+        cache_key = ExtractionCache.make_key(video_path, output_format, sample_rate)
+        cached_path = cache.get(cache_key, output_format)
+        if cached_path is not None:
+            audio_path = self._link_to_temp(cached_path, video_path, output_format)
             file_size = os.path.getsize(audio_path) / (1024 * 1024)
             print(f"[RogoAI ExtractAudio] 既存の音声ファイルを使用: {audio_path} ({file_size:.2f} MB)")
             return (audio_path,)
@@ -73,31 +83,20 @@ class RogoAI_ExtractAudioFromVideo:
         ffmpeg_cmd = self._find_ffmpeg()
         print(f"[RogoAI ExtractAudio] ffmpeg: {ffmpeg_cmd}")
         
-        # コーデックパラメータ
-        if output_format == "wav":
-            codec_params = ['-acodec', 'pcm_s16le']
-        elif output_format == "mp3":
-            codec_params = ['-acodec', 'libmp3lame', '-b:a', '128k']
-        else:
-            codec_params = ['-acodec', 'pcm_s16le']
-        
-        # ffmpegコマンド構築
-        cmd = [
-            ffmpeg_cmd,
-            '-i', video_path,
-            '-vn',  # 動画ストリームを無効化
-            *codec_params,
-            '-ar', sample_rate,  # サンプルレート
-            '-ac', '1',  # モノラル
-            '-loglevel', 'error',
-            '-y',  # 上書き
-            audio_path
-        ]
-        
-        print(f"[RogoAI ExtractAudio] 音声抽出中...")
-        print(f"[RogoAI ExtractAudio] 出力: {audio_path}")
-        
-        try:
+        info = probe_media(video_path, ffmpeg_cmd)
+        mode = fast_path(info, output_format, sample_rate)
+        
+        def run_ffmpeg(output_path):
+            if mode == "copy":
+                print(f"[RogoAI ExtractAudio] 既に目的の形式のためコピーします")
+                run_extract(ffmpeg_cmd, video_path, output_path, output_format, sample_rate, info=info)
+                return
+            if mode == "remux":
+                print(f"[RogoAI ExtractAudio] ストリームコピーで取り出します（再エンコードなし）")
+            cmd = build_extract_command(
+                ffmpeg_cmd, video_path, output_path, output_format, sample_rate,
+                stream_copy=mode == "remux"
+            )
             # 外部プロセスで実行
             result = subprocess.run(
                 cmd,
@@ -109,12 +108,15 @@ class RogoAI_ExtractAudioFromVideo:
             if result.returncode != 0:
                 error_msg = result.stderr if result.stderr else "不明なエラー"
                 raise RuntimeError(f"ffmpegエラー:\n{error_msg}")
-            
-            # 出力ファイルの確認
-            if not os.path.exists(audio_path):
-                raise FileNotFoundError("音声ファイルが生成されませんでした")
+        
+        print(f"[RogoAI ExtractAudio] 音声抽出中...")
+        
+        try:
+            cached_path, _ = cache.get_or_extract(cache_key, output_format, run_ffmpeg)
+            audio_path = self._link_to_temp(cached_path, video_path, output_format)
             
             file_size = os.path.getsize(audio_path) / (1024 * 1024)
+            print(f"[RogoAI ExtractAudio] 出力: {audio_path}")
             print(f"[RogoAI ExtractAudio] 抽出完了: {file_size:.2f} MB")
             
             return (audio_path,)
@@ -125,39 +127,31 @@ class RogoAI_ExtractAudioFromVideo:
             print(f"[RogoAI ExtractAudio] エラー: {str(e)}")
             raise
     
-    def _find_ffmpeg(self):
+    def _link_to_temp(self, cached_path, video_path, output_format):
         """
-        ffmpegの実行ファイルを探す
+        キャッシュのファイルを temp フォルダへリンク（またはコピー）してそのパスを返す
         """
-        import shutil
-        
-        # まずシステムPATHから探す
-        ffmpeg = shutil.which('ffmpeg')
-        if ffmpeg:
-            return ffmpeg
-        
-        # 既知の場所を直接チェック
-        known_paths = [
-            r'C:\Users\fareg\AppData\Local\FFmpeg\bin\ffmpeg.exe',
-            r'C:\ffmpeg\bin\ffmpeg.exe',
-            r'C:\Program Files\ffmpeg\bin\ffmpeg.exe',
-            r'D:\ffmpeg\bin\ffmpeg.exe',
-            '/usr/bin/ffmpeg',  # Linux
-            '/usr/local/bin/ffmpeg',  # macOS
-        ]
+        temp_dir = folder_paths.get_temp_directory()
+        os.makedirs(temp_dir, exist_ok=True)
         
-        for path in known_paths:
-            if os.path.exists(path):
-                return path
+        # ファイル名にハッシュを追加して一意性を確保
+        path_hash = hashlib.md5(video_path.encode()).hexdigest()[:8]
+        audio_filename = f"{Path(video_path).stem}_{path_hash}.{output_format}"
+        audio_path = os.path.join(temp_dir, audio_filename)
         
-        raise FileNotFoundError(
-            "ffmpegが見つかりません。\n\n"
-            "解決方法:\n"
-            "1. ffmpegをダウンロード: https://ffmpeg.org/download.html\n"
-            "2. 解凍してC:\\ffmpeg\\ に配置\n"
-            "3. システム環境変数PATHに C:\\ffmpeg\\bin を追加\n"
-            "4. ComfyUIを再起動"
-        )
+        if os.path.exists(audio_path):
+            if os.path.samefile(audio_path, cached_path):
+                return audio_path
+            # 前回の実行結果（別の内容）を置き換える
+            os.remove(audio_path)
+        link_or_copy(cached_path, audio_path)
+        return audio_path
+    
+    def _find_ffmpeg(self):
+        """
+        ffmpegの実行ファイルを探す
+        """
+        return find_ffmpeg()
     
     @classmethod
     def IS_CHANGED(cls, video_path, output_format, sample_rate):
@@ -169,8 +163,9 @@ class RogoAI_ExtractAudioFromVideo:
         if not video_path or not os.path.exists(video_path):
             return float("nan")
         
-        # ファイルの更新日時を返す
-        return f"{os.path.getmtime(video_path)}_{output_format}_{sample_rate}"
+        # ファイルのサイズ・更新日時を返す
+        stat = os.stat(video_path)
+        return f"{stat.st_mtime_ns}_{stat.st_size}_{output_format}_{sample_rate}"
 
 
 # ノード登録
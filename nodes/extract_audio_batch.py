@@ -0,0 +1,248 @@
+"""
+RogoAI Extract Audio Batch
+複数の動画から音声を並列抽出するノード
+
+機能:
+- フォルダ・globパターン・改行区切りのファイルリストを入力として受付
+- ffmpeg プロセスを最大 workers 個まで同時実行（デフォルト: CPUコア数）
+- 抽出結果は ExtractionCache を共有（v1 / v2 と同じキャッシュ）
+- メディア情報（ffprobe）で高速パスを判定（コピー / ストリームコピー）
+- 出力フォルダに <動画名>.<形式> を配置し、manifest.json を生成
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import folder_paths
+
+from .ffmpeg_utils import (
+    ExtractionCache,
+    ProbeIndex,
+    collect_media_files,
+    find_ffmpeg,
+    link_or_copy,
+    probe_media,
+    run_extract,
+)
+
+
+DEFAULT_VIDEO_EXTENSIONS = "mp4,mkv,mov,avi,webm,m4v,flv,wmv,ts,mts"
+
+
+class RogoAI_ExtractAudioBatch:
+    """
+    動画フォルダの一括音声抽出（ffmpeg 並列実行）
+
+    【特徴】
+    ・1回のプロンプトで数百本の動画を処理
+    ・ffmpeg は外部プロセスのため、コア数ぶん並列に実行してもComfyUIをブロックしない
+    ・抽出済み（同じ動画・同じ設定）のファイルはキャッシュから即座にリンク
+    ・失敗したファイルはスキップして manifest に記録
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "input_paths": ("STRING", {
+                    "default": "",
+                    "multiline": True,
+                    "placeholder": "フォルダ / globパターン / ファイルパス（1行に1つ）"
+                }),
+                "output_format": (["wav", "mp3", "flac"], {
+                    "default": "wav"
+                }),
+                "sample_rate": ([8000, 16000, 22050, 44100, 48000], {
+                    "default": 16000
+                }),
+            },
+            "optional": {
+                "workers": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 256,
+                    "tooltip": "同時に実行する ffmpeg の数（0 = CPUコア数）"
+                }),
+                "extensions": ("STRING", {
+                    "default": DEFAULT_VIDEO_EXTENSIONS,
+                    "multiline": False,
+                    "tooltip": "フォルダ・globで対象とする拡張子（カンマ区切り）"
+                }),
+                "recursive": ("BOOLEAN", {"default": False}),
+                "output_dir": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "tooltip": "空欄の場合は ComfyUI/output/audio_batch に保存"
+                }),
+                "use_cache": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "同じ動画・同じ設定の抽出結果を再利用（Extract Audio / v2 とキャッシュを共有）"
+                }),
+                "hash_content": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "キャッシュキーにファイル内容のハッシュを使う（移動・コピーした動画でもヒット、初回は全体を読み込み）"
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "INT")
+    RETURN_NAMES = ("manifest_path", "audio_file_paths", "summary", "file_count")
+    FUNCTION = "extract_batch"
+    CATEGORY = "RogoAI/Audio"
+
+    def _extract_one(self, ffmpeg_path, entry, output_format, sample_rate, cache, hash_content,
+                     probe_index=None):
+        """1ファイルを抽出して entry を更新（ワーカースレッドで実行）"""
+        start = time.time()
+        video_path = entry["file"]
+        audio_file_path = entry["output"]
+        info = probe_media(video_path, ffmpeg_path, index=probe_index)
+
+        def run(path):
+            # mode: copy / remux（高速パス）または encode
+            entry["mode"] = run_extract(
+                ffmpeg_path, video_path, path, output_format, sample_rate, info=info
+            )
+
+        if cache is None:
+            # キャッシュへのハードリンクを上書きしないよう、先に削除してから書き込む
+            if os.path.exists(audio_file_path):
+                os.remove(audio_file_path)
+            run(audio_file_path)
+            entry["cache_hit"] = False
+        else:
+            key = ExtractionCache.make_key(
+                video_path, output_format, sample_rate, content_hash=hash_content
+            )
+            cached_path, hit = cache.get_or_extract(key, output_format, run)
+            entry["cache_hit"] = hit
+            if os.path.exists(audio_file_path):
+                if not os.path.samefile(audio_file_path, cached_path):
+                    # 前回の実行結果（別の内容）を置き換える
+                    os.remove(audio_file_path)
+                    link_or_copy(cached_path, audio_file_path)
+            else:
+                link_or_copy(cached_path, audio_file_path)
+
+        entry["status"] = "done"
+        if info and info.get("duration"):
+            entry["duration"] = info["duration"]
+        entry["size_bytes"] = os.path.getsize(audio_file_path)
+        entry["elapsed_seconds"] = time.time() - start
+        return entry
+
+    def extract_batch(self, input_paths, output_format="wav", sample_rate=16000, workers=0,
+                      extensions=DEFAULT_VIDEO_EXTENSIONS, recursive=False, output_dir="",
+                      use_cache=True, hash_content=False):
+        print("\n" + "="*80)
+        print("🎬 RogoAI Extract Audio Batch")
+        print("="*80)
+        start_time = time.time()
+
+        files = collect_media_files(input_paths, extensions.split(","), recursive)
+        if not files:
+            raise FileNotFoundError(f"❌ No video files found: {input_paths.strip()}")
+
+        if not output_dir.strip():
+            output_dir = os.path.join(folder_paths.get_output_directory(), "audio_batch")
+        output_dir = output_dir.strip().strip('"').strip("'").strip()
+        os.makedirs(output_dir, exist_ok=True)
+
+        ffmpeg_path = find_ffmpeg()
+        workers = min(workers or os.cpu_count() or 1, len(files))
+        cache = ExtractionCache() if use_cache else None
+        # メディア情報のインデックスは最後に1回だけ書き出す
+        probe_index = ProbeIndex(autoflush=False)
+
+        print(f"✅ ffmpeg found: {ffmpeg_path}")
+        print(f"🎬 Files: {len(files)}")
+        print(f"💾 Output: {output_dir}")
+        print(f"⚙️  Workers: {workers}")
+
+        # 出力ファイル名を先に決める（同名の動画は連番で区別）
+        entries = []
+        used_names = set()
+        for path in files:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            filename = f"{stem}.{output_format}"
+            counter = 1
+            while filename.lower() in used_names:
+                filename = f"{stem}_{counter:03d}.{output_format}"
+                counter += 1
+            used_names.add(filename.lower())
+            entries.append({
+                "file": path,
+                "output": os.path.join(output_dir, filename),
+                "status": "pending",
+            })
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    self._extract_one, ffmpeg_path, entry, output_format,
+                    sample_rate, cache, hash_content, probe_index
+                ): entry
+                for entry in entries
+            }
+            for future in as_completed(futures):
+                entry = futures[future]
+                done += 1
+                try:
+                    future.result()
+                    mark = "♻️ " if entry.get("cache_hit") else "✅"
+                    print(f"   {mark} [{done}/{len(entries)}] {os.path.basename(entry['file'])}")
+                except Exception as e:
+                    entry["status"] = "error"
+                    entry["error"] = str(e)
+                    entry.pop("output", None)
+                    print(f"   ❌ [{done}/{len(entries)}] {os.path.basename(entry['file'])} ({e})")
+
+        probe_index.flush()
+
+        elapsed = time.time() - start_time
+
+        manifest = {
+            "input_paths": input_paths,
+            "output_dir": output_dir,
+            "output_format": output_format,
+            "sample_rate": int(sample_rate),
+            "workers": workers,
+            "elapsed_seconds": elapsed,
+            "files": entries,
+        }
+        manifest_path = os.path.join(output_dir, "manifest.json")
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        done_entries = [e for e in entries if e["status"] == "done"]
+        hits = sum(1 for e in done_entries if e.get("cache_hit"))
+        errors = len(entries) - len(done_entries)
+        total_mb = sum(e["size_bytes"] for e in done_entries) / (1024 * 1024)
+
+        summary = (
+            f"🎬 Files: {len(entries)}\n"
+            f"✅ Done: {len(done_entries)} (cache hit: {hits})\n"
+            f"❌ Errors: {errors}\n"
+            f"📦 Size: {total_mb:.1f} MB\n"
+            f"⚙️  Workers: {workers}\n"
+            f"⏱️  Elapsed: {elapsed:.1f}s\n"
+            f"📄 Manifest: {manifest_path}"
+        )
+        print("\n" + summary)
+        print("="*80 + "\n")
+
+        audio_file_paths = "\n".join(e["output"] for e in done_entries)
+        return (manifest_path, audio_file_paths, summary, len(done_entries))
+
+
+# ノード登録
+NODE_CLASS_MAPPINGS = {
+    "RogoAI_ExtractAudioBatch": RogoAI_ExtractAudioBatch,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "RogoAI_ExtractAudioBatch": "RogoAI Extract Audio Batch 🎬",
+}
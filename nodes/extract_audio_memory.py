@@ -0,0 +1,94 @@
+"""
+RogoAI Extract Audio to Memory
+動画・音声ファイルを ffmpeg でデコードし、AUDIO として直接出力するノード
+
+ffmpeg の標準出力（-f f32le -ac 1 -ar 16000 pipe:1）を事前確保したバッファへ読み込むため、
+WAV/MP3 の書き出し → 別ノードでの再読み込み・再デコードが不要になる。
+デフォルトの 16kHz モノラルは Qwen3-ASR のネイティブ形式なので、Transcribe ノードでの変換も不要。
+"""
+
+import os
+import time
+
+import torch
+
+from .ffmpeg_utils import find_ffmpeg, probe_media, read_pcm
+
+
+class RogoAI_ExtractAudioToMemory:
+    """
+    動画から音声をメモリへ直接抽出（ファイルを書き出さない）
+
+    【特徴】
+    ・ffmpeg の出力をパイプで受け取り、float32 の AUDIO テンソルとして返す
+    ・ディスクへの書き込み・読み込みと二重デコードを省略
+    ・16kHz モノラル（デフォルト）はそのまま Qwen3-ASR Transcribe に接続可能
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "video_path": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "placeholder": "動画・音声ファイルのフルパスを入力"
+                }),
+                "sample_rate": ([8000, 16000, 22050, 44100, 48000], {
+                    "default": 16000
+                }),
+            },
+        }
+
+    RETURN_TYPES = ("AUDIO",)
+    RETURN_NAMES = ("audio",)
+    FUNCTION = "extract_audio"
+    CATEGORY = "RogoAI/Audio"
+
+    def extract_audio(self, video_path, sample_rate=16000):
+        print("\n" + "="*80)
+        print("🎧 RogoAI Extract Audio to Memory")
+        print("="*80)
+        start_time = time.time()
+
+        video_path = video_path.strip().strip('"').strip("'").strip()
+        if not video_path or not os.path.exists(video_path):
+            raise FileNotFoundError(f"❌ Video file not found: {video_path}")
+
+        print(f"📹 Input video: {video_path}")
+        ffmpeg_path = find_ffmpeg()
+        print(f"✅ ffmpeg found: {ffmpeg_path}")
+
+        # 長さが分かればバッファを一度で確保できる
+        info = probe_media(video_path, ffmpeg_path)
+        wav = read_pcm(
+            video_path, sample_rate=int(sample_rate), ffmpeg_path=ffmpeg_path,
+            expected_seconds=info.get("duration") if info else None,
+        )
+        duration = len(wav) / int(sample_rate)
+        elapsed = time.time() - start_time
+
+        print(f"🎵 {int(sample_rate)} Hz / mono / {duration:.1f}秒 ({wav.nbytes / (1024 * 1024):.1f} MB)")
+        print(f"⏱️  処理時間: {elapsed:.1f}秒")
+        print("="*80 + "\n")
+
+        waveform = torch.from_numpy(wav).view(1, 1, -1)
+        return ({"waveform": waveform, "sample_rate": int(sample_rate)},)
+
+    @classmethod
+    def IS_CHANGED(cls, video_path, sample_rate=16000):
+        video_path = video_path.strip().strip('"').strip("'").strip()
+        if not video_path or not os.path.exists(video_path):
+            return float("nan")
+        stat = os.stat(video_path)
+        return f"{stat.st_mtime_ns}_{stat.st_size}_{sample_rate}"
+
+
+# ノード登録
+NODE_CLASS_MAPPINGS = {
+    "RogoAI_ExtractAudioToMemory": RogoAI_ExtractAudioToMemory,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "RogoAI_ExtractAudioToMemory": "RogoAI Extract Audio to Memory 🎧",
+}
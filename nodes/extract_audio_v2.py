@@ -9,15 +9,36 @@ RogoAI Extract Audio from Video - 改良版
 
 これにより、デフォルトでは:
 ComfyUI/temp/audio/[uuid].wav に保存されます
+
+use_cache=True（デフォルト）の場合は抽出結果を ExtractionCache に保存し、
+同じ動画・同じ設定なら ffmpeg を実行せずに再利用します。
+保存先にはキャッシュのファイルをハードリンク（不可ならコピー）するため、容量は増えません。
+
+parallel_shards を 2 以上にすると、長尺動画を時間で分割して複数の ffmpeg で並列に抽出し、
+サンプル単位で連結します（1プロセスではデコード・リサンプリングが1コアに律速されるため）。
+
+抽出前にメディア情報を取得し（ffprobe、結果はインデックスに保存）、
+既に目的の形式ならコピーのみ、コーデック等が一致すればストリームコピーで取り出します。
 """
 
 import os
 import subprocess
-import shutil
+import time
 import uuid
-from pathlib import Path
 import folder_paths
 
+from .ffmpeg_utils import (
+    ExtractionCache,
+    build_extract_command,
+    extract_sharded,
+    fast_path,
+    find_ffmpeg,
+    link_or_copy,
+    probe_media,
+    run_extract,
+    shard_ranges,
+)
+
 class RogoAI_ExtractAudioFromVideo_v2:
     """
     動画から音声を抽出（改良版）
@@ -66,6 +87,24 @@ class RogoAI_ExtractAudioFromVideo_v2:
                     "default": "audio",
                     "multiline": False
                 }),
+                "use_cache": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "同じ動画・同じ設定の抽出結果を再利用（ComfyUI/output/rogoai_cache/audio、容量上限あり）"
+                }),
+                "hash_content": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "キャッシュキーにファイル内容のハッシュを使う（移動・コピーした動画でもヒット、初回は全体を読み込み）"
+                }),
+                "parallel_shards": ("INT", {
+                    "default": 1,
+                    "min": 0,
+                    "max": 64,
+                    "tooltip": "1 = 通常（ffmpeg 1プロセス）、2以上 = 長尺動画を時間で分割して並列抽出、0 = CPUコア数"
+                }),
+                "keep_shards": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "分割抽出したシャードを <ファイル名>_shards/ に WAV で残し、オフセットを shards.json に記録（キャッシュは使わない）"
+                }),
             }
         }
     
@@ -112,38 +151,27 @@ RogoAI Extract Audio v2 - 保存先選択機能付き
   → 例: temp/audio/, output/audio/
 
 ・空文字にすると直下に保存
+
+【キャッシュ (use_cache)】
+・デフォルト: 有効
+  → 同じ動画（パス・サイズ・更新日時）・同じ形式/サンプルレートなら再抽出しない
+  → キャッシュから保存先へリンク（またはコピー）
+  → 返すのは常に保存先のパス（キャッシュの削除・LRU整理の影響を受けない）
+
+【並列分割抽出 (parallel_shards)】
+・デフォルト: 1（通常の抽出）
+・2以上: 長さを調べて区間に分割し、その数の ffmpeg で同時に抽出
+  → 各区間をサンプル数ちょうどに揃えて連結（1本の音声ファイルとして出力）
+  → 1区間は最低60秒（短い動画では分割数を減らす）
+・0: CPUコア数で分割
+・keep_shards: 各区間を WAV で残し、shards.json に開始サンプル・オフセット秒を記録
     """
     
     def _find_ffmpeg(self):
         """
         ffmpegを検索
         """
-        # システムPATHから検索
-        ffmpeg = shutil.which('ffmpeg')
-        if ffmpeg:
-            return ffmpeg
-        
-        # 既知の場所を検索
-        known_paths = [
-            os.path.join(os.path.expanduser("~"), "AppData", "Local", "FFmpeg", "bin", "ffmpeg.exe"),
-            r"C:\ffmpeg\bin\ffmpeg.exe",
-            r"C:\Program Files\ffmpeg\bin\ffmpeg.exe",
-            "/usr/bin/ffmpeg",
-            "/usr/local/bin/ffmpeg",
-            "/opt/homebrew/bin/ffmpeg",
-        ]
-        
-        for path in known_paths:
-            if os.path.exists(path):
-                return path
-        
-        raise FileNotFoundError(
-            "❌ ffmpeg not found\n\n"
-            "Please install ffmpeg:\n"
-            "・Windows: https://www.gyan.dev/ffmpeg/builds/\n"
-            "・Linux: sudo apt install ffmpeg\n"
-            "・Mac: brew install ffmpeg"
-        )
+        return find_ffmpeg()
     
     def _get_save_directory(self, save_location, custom_path, subfolder):
         """
@@ -208,8 +236,71 @@ RogoAI Extract Audio v2 - 保存先選択機能付き
         
         return filename
     
+    def _run_ffmpeg(self, video_path, audio_file_path, output_format, sample_rate,
+                    parallel_shards=1, shard_dir=None):
+        """
+        ffmpeg で音声を抽出
+        """
+        ffmpeg_path = self._find_ffmpeg()
+        print(f"✅ ffmpeg found: {ffmpeg_path}")
+        
+        info = probe_media(video_path, ffmpeg_path)
+        if info:
+            print(f"🔎 Source: {info['audio_codec']} / {info['sample_rate']} Hz / "
+                  f"{info['channels']}ch / {info['duration'] or 0:.1f}s")
+        
+        # 高速パス（シャードを残す場合は通常の分割抽出を行う）
+        mode = None if shard_dir else fast_path(info, output_format, sample_rate)
+        if mode == "copy":
+            print("⚡ 既に目的の形式 → コピーのみ（ffmpeg 不要）")
+            run_extract(ffmpeg_path, video_path, audio_file_path, output_format, sample_rate,
+                        info=info)
+            return
+        
+        if mode is None and parallel_shards != 1:
+            shards = parallel_shards or os.cpu_count() or 1
+            duration = info.get("duration") if info else None
+            ranges = shard_ranges(duration, sample_rate, shards) if duration else []
+            if len(ranges) > 1:
+                start = time.time()
+                print(f"\n🔧 Running ffmpeg x{len(ranges)} (time-sharded, {duration:.1f}s)...")
+                extract_sharded(
+                    ffmpeg_path, video_path, audio_file_path, output_format, sample_rate,
+                    shards=shards, duration=duration, shard_dir=shard_dir,
+                )
+                print(f"⏱️  Sharded extraction: {time.time() - start:.1f}s")
+                if shard_dir:
+                    print(f"🧩 Shards: {shard_dir}")
+                return
+            print("ℹ️  分割不要（短い動画または長さ不明）→ 1プロセスで抽出")
+        
+        cmd = build_extract_command(
+            ffmpeg_path, video_path, audio_file_path, output_format, sample_rate,
+            stream_copy=mode == "remux"
+        )
+        
+        if mode == "remux":
+            print("⚡ コーデック・サンプルレート・チャンネル数が一致 → ストリームコピー（再エンコードなし）")
+        print("\n🔧 Running ffmpeg...")
+        try:
+            subprocess.run(
+                cmd,
+                check=True,
+                capture_output=True,
+                text=True
+            )
+        except subprocess.CalledProcessError as e:
+            error_msg = (
+                f"❌ FFmpeg error:\n"
+                f"Command: {' '.join(cmd)}\n"
+                f"Error: {e.stderr}"
+            )
+            print(error_msg)
+            raise RuntimeError(error_msg)
+    
     def extract_audio(self, video_path, output_format, sample_rate, save_location, 
-                     filename_mode, custom_path="", custom_filename="", subfolder="audio"):
+                     filename_mode, custom_path="", custom_filename="", subfolder="audio",
+                     use_cache=True, hash_content=False, parallel_shards=1, keep_shards=False):
         """
         動画から音声を抽出
         """
@@ -223,9 +314,25 @@ RogoAI Extract Audio v2 - 保存先選択機能付き
         
         print(f"📹 Input video: {video_path}")
         
-        # ffmpeg検索
-        ffmpeg_path = self._find_ffmpeg()
-        print(f"✅ ffmpeg found: {ffmpeg_path}")
+        # シャードを残す場合は毎回抽出する
+        keep_shards = keep_shards and parallel_shards != 1
+        if keep_shards and use_cache:
+            print("ℹ️  keep_shards: キャッシュを使わずに抽出します")
+        
+        # キャッシュから取得（なければ抽出してキャッシュに登録）
+        cached_path = None
+        if use_cache and not keep_shards:
+            cache = ExtractionCache()
+            cache_key = ExtractionCache.make_key(
+                video_path, output_format, sample_rate, content_hash=hash_content
+            )
+            cached_path, hit = cache.get_or_extract(
+                cache_key, output_format,
+                lambda temp_path: self._run_ffmpeg(
+                    video_path, temp_path, output_format, sample_rate, parallel_shards
+                ),
+            )
+            print(f"{'♻️  Cache hit' if hit else '💾 Cached'}: {cached_path}")
         
         # 保存先ディレクトリ決定
         save_dir, location_name, base_dir = self._get_save_directory(
@@ -240,8 +347,13 @@ RogoAI Extract Audio v2 - 保存先選択機能付き
         # 完全なファイルパス
         audio_file_path = os.path.join(save_dir, filename)
         
+        # キャッシュと同一のファイル（リンク済み）ならそのまま使う
+        if (cached_path is not None and os.path.exists(audio_file_path)
+                and os.path.samefile(audio_file_path, cached_path)):
+            print(f"♻️  Already linked: {filename}")
+        
         # 既に同名ファイルが存在する場合の処理
-        if os.path.exists(audio_file_path):
+        elif os.path.exists(audio_file_path):
             print(f"⚠️  File already exists: {filename}")
             # ファイル名に連番を追加
             base, ext = os.path.splitext(filename)
@@ -267,46 +379,25 @@ RogoAI Extract Audio v2 - 保存先選択機能付き
         
         print("\n" + save_info)
         
-        # ffmpegコマンド構築
-        cmd = [
-            ffmpeg_path,
-            "-i", video_path,
-            "-vn",  # 映像を無視
-            "-acodec", "pcm_s16le" if output_format == "wav" else "libmp3lame",
-            "-ar", str(sample_rate),
-            "-ac", "1",  # モノラル
-            "-y",  # 上書き確認なし
-            audio_file_path
-        ]
-        
-        # 実行
-        print("\n🔧 Running ffmpeg...")
-        try:
-            result = subprocess.run(
-                cmd,
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            
-            # ファイルサイズ確認
-            file_size = os.path.getsize(audio_file_path)
-            file_size_mb = file_size / (1024 * 1024)
-            
-            print(f"✅ Extraction completed")
-            print(f"📦 File size: {file_size_mb:.2f} MB")
-            print("="*80 + "\n")
-            
-            return (audio_file_path, save_info, filename)
-            
-        except subprocess.CalledProcessError as e:
-            error_msg = (
-                f"❌ FFmpeg error:\n"
-                f"Command: {' '.join(cmd)}\n"
-                f"Error: {e.stderr}"
+        if cached_path is not None:
+            if not os.path.exists(audio_file_path):
+                link_or_copy(cached_path, audio_file_path)
+        else:
+            shard_dir = os.path.splitext(audio_file_path)[0] + "_shards" if keep_shards else None
+            self._run_ffmpeg(
+                video_path, audio_file_path, output_format, sample_rate,
+                parallel_shards, shard_dir
             )
-            print(error_msg)
-            raise RuntimeError(error_msg)
+        
+        # ファイルサイズ確認
+        file_size = os.path.getsize(audio_file_path)
+        file_size_mb = file_size / (1024 * 1024)
+        
+        print(f"✅ Extraction completed")
+        print(f"📦 File size: {file_size_mb:.2f} MB")
+        print("="*80 + "\n")
+        
+        return (audio_file_path, save_info, filename)
 
 
 # ノード登録
@@ -0,0 +1,762 @@
+"""
+RogoAI FFmpeg Utilities
+Extract Audio ノード共通の ffmpeg ヘルパー
+
+機能:
+- ffmpeg 実行ファイルの検索
+- 出力形式ごとの抽出コマンド構築・実行
+- ffprobe によるメディア情報の取得（長さ・コーデック・チャンネル数・サンプルレート）
+  （パス・サイズ・更新日時ごとにディスクのインデックスへ保存し、2回目以降は ffprobe を実行しない）
+- 抽出の高速パス: 既に目的の形式ならファイルをコピー、コーデックが一致すればストリームコピー（再エンコードなし）
+- フォルダ / globパターン / 改行区切りリストからの入力ファイル収集
+- 長尺動画の時間分割並列抽出（N 個の ffmpeg で別区間をデコードし、サンプル単位で連結）
+- ffmpeg の標準出力（f32le）からメモリへ直接読み込み（ディスク書き込み・再デコードなし）
+- 抽出結果のディスクキャッシュ（ExtractionCache）
+  キー: ソースの同一性（パス・サイズ・更新日時、または内容ハッシュ）+ 形式・サンプルレート・チャンネル数
+  容量を超えた場合は最終アクセスが古いものから削除（LRU）
+
+下流ノードのウィジェットを変えただけで数GBの動画を再抽出することがなくなり、
+temp フォルダに抽出ファイルが際限なく溜まることもない。
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import folder_paths
+
+from .asr_cache import hash_file_content, hash_file_identity
+
+
+DEFAULT_EXTRACT_CACHE_GB = 8.0
+
+# メモリ読み込みで長さが分からない場合の初期確保（秒）。足りなければ倍々に拡張
+PCM_INITIAL_SECONDS = 600.0
+PCM_READ_BYTES = 1 << 20
+# パイプ実行の ffmpeg が失敗したとき、エラーに含める stderr の末尾（バイト）
+STDERR_TAIL_BYTES = 4096
+
+# 時間分割抽出: 1シャードの最小長（秒）と、境界の取りこぼしを防ぐための余分なデコード長（秒）
+MIN_SHARD_SECONDS = 60.0
+SHARD_PAD_SECONDS = 0.5
+# シーク直後はデコーダ（AAC の窓の重なりなど）とリサンプラが未収束のため、手前から読んで捨てる長さ（秒）
+SHARD_PREROLL_SECONDS = 0.5
+
+# メディア情報インデックスの最大件数（超えたら古い順に削除）
+MAX_PROBE_ENTRIES = 10000
+
+# 出力形式ごとのコーデック引数
+CODEC_ARGS = {
+    "wav": ["-acodec", "pcm_s16le"],
+    "mp3": ["-acodec", "libmp3lame", "-b:a", "128k"],
+    "flac": ["-acodec", "flac"],
+}
+
+# 高速パスの判定用: 出力形式ごとのコーデック名（ffprobe の codec_name）とコンテナ名
+FORMAT_CODECS = {"wav": "pcm_s16le", "mp3": "mp3", "flac": "flac"}
+FORMAT_CONTAINERS = {"wav": "wav", "mp3": "mp3", "flac": "flac"}
+
+# ffmpeg -i の出力のチャンネルレイアウト表記 → チャンネル数
+CHANNEL_LAYOUTS = {"mono": 1, "stereo": 2, "2.1": 3, "quad": 4, "5.0": 5, "5.1": 6, "6.1": 7, "7.1": 8}
+
+_PROBE_LOCK = threading.Lock()
+
+
+def find_ffmpeg(name: str = "ffmpeg") -> str:
+    """
+    ffmpeg（または ffprobe など同梱ツール）の実行ファイルを探す
+    """
+    # まずシステムPATHから探す
+    found = shutil.which(name)
+    if found:
+        return found
+
+    # 既知の場所を直接チェック
+    known_dirs = [
+        os.path.join(os.path.expanduser("~"), "AppData", "Local", "FFmpeg", "bin"),
+        r"C:\ffmpeg\bin",
+        r"C:\Program Files\ffmpeg\bin",
+        r"D:\ffmpeg\bin",
+        "/usr/bin",  # Linux
+        "/usr/local/bin",  # macOS
+        "/opt/homebrew/bin",
+    ]
+    for directory in known_dirs:
+        for filename in (f"{name}.exe", name):
+            path = os.path.join(directory, filename)
+            if os.path.exists(path):
+                return path
+
+    raise FileNotFoundError(
+        f"❌ {name} not found\n\n"
+        "Please install ffmpeg:\n"
+        "・Windows: https://www.gyan.dev/ffmpeg/builds/\n"
+        "・Linux: sudo apt install ffmpeg\n"
+        "・Mac: brew install ffmpeg"
+    )
+
+
+def build_extract_command(ffmpeg_path: str, video_path: str, output_path: str,
+                          output_format: str = "wav", sample_rate=16000,
+                          channels: int = 1, stream_copy: bool = False) -> list:
+    """動画から音声を抽出する ffmpeg コマンドを構築（stream_copy=True は再エンコードなしの取り出し）"""
+    if stream_copy:
+        return [
+            ffmpeg_path,
+            "-i", video_path,
+            # 判定に使ったのは先頭の音声ストリームの情報なので、それを明示的に選ぶ
+            # （ffmpeg の既定はチャンネル数の多いストリームを選ぶ）
+            "-map", "0:a:0",
+            "-vn",
+            "-acodec", "copy",
+            "-loglevel", "error",
+            "-y",
+            output_path,
+        ]
+    return [
+        ffmpeg_path,
+        "-i", video_path,
+        "-vn",  # 動画ストリームを無効化
+        *CODEC_ARGS.get(output_format, CODEC_ARGS["wav"]),
+        "-ar", str(sample_rate),
+        "-ac", str(channels),
+        "-loglevel", "error",
+        "-y",  # 上書き
+        output_path,
+    ]
+
+
+def fast_path(info, output_format: str, sample_rate, channels: int = 1):
+    """
+    抽出の高速パスを判定
+
+    戻り値:
+        "copy"  : ソースが既に目的の形式（例: 16kHz モノラル 16bit PCM の WAV）→ ファイルをコピーするだけ
+        "remux" : 音声のコーデック・サンプルレート・チャンネル数が一致 → ストリームコピーで取り出し
+        None    : デコード・変換が必要
+
+    判定は先頭の音声ストリームのみが対象（remux でも先頭のストリームを取り出す）。
+    """
+    if not info or not info.get("audio_streams"):
+        return None
+    if (info.get("audio_codec") != FORMAT_CODECS.get(output_format)
+            or info.get("sample_rate") != int(sample_rate)
+            or info.get("channels") != int(channels)):
+        return None
+    if (info.get("format_name") == FORMAT_CONTAINERS.get(output_format)
+            and not info.get("has_video") and info.get("audio_streams") == 1):
+        return "copy"
+    return "remux"
+
+
+def run_extract(ffmpeg_path: str, video_path: str, output_path: str,
+                output_format: str = "wav", sample_rate=16000, channels: int = 1,
+                info: dict = None) -> str:
+    """
+    ffmpeg で音声を抽出（失敗時は stderr を含めて RuntimeError）
+
+    info（probe_media の結果）を渡すと高速パスを使う。戻り値: "copy" / "remux" / "encode"
+    """
+    mode = fast_path(info, output_format, sample_rate, channels)
+    if mode == "copy":
+        # ハードリンクにしない（キャッシュ側の utime がソースの更新日時を変えてしまうため）
+        shutil.copyfile(video_path, output_path)
+        return mode
+
+    cmd = build_extract_command(
+        ffmpeg_path, video_path, output_path, output_format, sample_rate, channels,
+        stream_copy=mode == "remux",
+    )
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        error = result.stderr.strip() if result.stderr else "不明なエラー"
+        raise RuntimeError(f"❌ FFmpeg error:\n{error}")
+    return mode or "encode"
+
+
+def collect_media_files(input_paths: str, extensions, recursive: bool = False) -> list:
+    """
+    改行区切りの入力（各行がファイル / フォルダ / globパターン）からファイル一覧を取得
+
+    フォルダ・globの場合は extensions に一致するものだけを対象とする。
+    明示的に指定したファイルは拡張子に関わらず含める。重複は除き、入力順を保つ。
+    """
+    exts = {"." + e.strip().lower().lstrip(".") for e in extensions if e.strip()}
+    files = []
+    for line in input_paths.splitlines():
+        line = line.strip().strip('"').strip("'").strip()
+        if not line:
+            continue
+        if os.path.isfile(line):
+            files.append(line)
+            continue
+        if os.path.isdir(line):
+            pattern = os.path.join(line, "**", "*") if recursive else os.path.join(line, "*")
+        else:
+            pattern = line
+        files.extend(sorted(
+            path for path in glob.glob(pattern, recursive=recursive)
+            if os.path.isfile(path) and os.path.splitext(path)[1].lower() in exts
+        ))
+
+    seen = set()
+    unique = []
+    for path in files:
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+
+def _probe_with_ffprobe(ffprobe_path: str, source_path: str):
+    result = subprocess.run(
+        [ffprobe_path, "-v", "error",
+         "-show_entries", "format=format_name,duration:"
+                          "stream=codec_type,codec_name,sample_rate,channels,sample_fmt",
+         "-of", "json", source_path],
+        capture_output=True, text=True, errors="replace",
+    )
+    if result.returncode != 0:
+        return None
+    try:
+        data = json.loads(result.stdout)
+    except json.JSONDecodeError:
+        return None
+
+    streams = data.get("streams", [])
+    audio = [st for st in streams if st.get("codec_type") == "audio"]
+    first = audio[0] if audio else {}
+    try:
+        duration = float(data.get("format", {}).get("duration"))
+    except (TypeError, ValueError):
+        duration = None
+    return {
+        "duration": duration,
+        "format_name": data.get("format", {}).get("format_name"),
+        "has_video": any(st.get("codec_type") == "video" for st in streams),
+        "audio_streams": len(audio),
+        "audio_codec": first.get("codec_name"),
+        "sample_rate": int(first["sample_rate"]) if first.get("sample_rate") else None,
+        "channels": first.get("channels"),
+        "sample_fmt": first.get("sample_fmt"),
+    }
+
+
+def _probe_with_ffmpeg(ffmpeg_path: str, source_path: str):
+    """ffprobe がない場合: ffmpeg -i の出力（stderr）から情報を読み取る"""
+    result = subprocess.run(
+        [ffmpeg_path, "-hide_banner", "-i", source_path],
+        capture_output=True, text=True, errors="replace",
+    )
+    log = result.stderr
+    container = re.search(r"Input #0, (.+?), from ", log)
+    if not container:
+        return None
+
+    duration = None
+    match = re.search(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)", log)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    audio = re.findall(r"Stream #\S+: Audio: (\w+).*?, (\d+) Hz, ([^,]+), (\w+)", log)
+    codec, sample_rate, layout, sample_fmt = audio[0] if audio else (None, None, None, None)
+    channels = None
+    if layout:
+        layout = layout.strip().split("(")[0]
+        match = re.match(r"(\d+) channels", layout)
+        channels = int(match.group(1)) if match else CHANNEL_LAYOUTS.get(layout)
+
+    return {
+        "duration": duration,
+        "format_name": container.group(1),
+        "has_video": re.search(r"Stream #\S+: Video:", log) is not None,
+        "audio_streams": len(audio),
+        "audio_codec": codec,
+        "sample_rate": int(sample_rate) if sample_rate else None,
+        "channels": channels,
+        "sample_fmt": sample_fmt,
+    }
+
+
+class ProbeIndex:
+    """
+    メディア情報のディスクインデックス（1 JSON ファイル）
+
+    キーはファイルの同一性ハッシュ（パス・サイズ・更新日時）なので、ファイルが変わると自動的に再取得する。
+    件数が MAX_PROBE_ENTRIES を超えたら古く登録されたものから削除。
+    ファイルはインスタンスごとに1回だけ読み込む。autoflush=False の場合、put() はメモリ上に溜め、
+    flush() でまとめて書き出す（バッチ処理で1件ごとにファイル全体を書き直さないため）。
+    """
+
+    def __init__(self, index_path: str = None, max_entries: int = MAX_PROBE_ENTRIES,
+                 autoflush: bool = True):
+        if index_path is None:
+            index_path = os.path.join(
+                folder_paths.get_output_directory(), "rogoai_cache", "probe_index.json"
+            )
+        self.index_path = index_path
+        self.max_entries = max_entries
+        self.autoflush = autoflush
+        self._entries = None
+        self._pending = {}
+
+    def _load(self) -> dict:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def get(self, key: str):
+        with _PROBE_LOCK:
+            if self._entries is None:
+                self._entries = self._load()
+            return self._pending.get(key) or self._entries.get(key)
+
+    def put(self, key: str, info: dict):
+        with _PROBE_LOCK:
+            self._pending[key] = info
+            if self.autoflush:
+                self._write()
+
+    def flush(self):
+        """溜めた登録をインデックスファイルへ書き出す"""
+        with _PROBE_LOCK:
+            self._write()
+
+    def _write(self):
+        # 他のインスタンス・プロセスの登録を消さないよう、読み直してから統合する
+        if not self._pending:
+            return
+        entries = self._load()
+        for key, info in self._pending.items():
+            entries.pop(key, None)
+            entries[key] = info
+        for old in list(entries)[:max(0, len(entries) - self.max_entries)]:
+            del entries[old]
+
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = f"{self.index_path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+        self._entries = entries
+        self._pending = {}
+
+
+def probe_media(source_path: str, ffmpeg_path: str = None, index: ProbeIndex = None):
+    """
+    メディア情報を取得（取得できない場合は None）
+
+    戻り値: {"duration", "format_name", "has_video", "audio_streams",
+             "audio_codec", "sample_rate", "channels", "sample_fmt"}
+    同じファイル（パス・サイズ・更新日時）の2回目以降はインデックスから返す。
+    ffprobe があれば使い、なければ ffmpeg -i の出力から読み取る。
+    """
+    index = index or ProbeIndex()
+    key = hash_file_identity(source_path)
+    info = index.get(key)
+    if info is not None:
+        return info
+
+    try:
+        info = _probe_with_ffprobe(find_ffmpeg("ffprobe"), source_path)
+    except FileNotFoundError:
+        info = None
+    if info is None:
+        info = _probe_with_ffmpeg(ffmpeg_path or find_ffmpeg(), source_path)
+
+    if info is not None:
+        index.put(key, info)
+    return info
+
+
+def probe_duration(source_path: str, ffmpeg_path: str = None):
+    """メディアの長さ（秒）を取得（取得できない場合は None）"""
+    info = probe_media(source_path, ffmpeg_path)
+    return info.get("duration") if info else None
+
+
+def shard_ranges(duration: float, sample_rate, shards: int) -> list:
+    """
+    0〜duration 秒を最大 shards 個の連続区間に分割（サンプル単位）
+
+    各区間は MIN_SHARD_SECONDS 以上。戻り値: [(start_sample, end_sample), ...]
+    """
+    total = int(round(duration * int(sample_rate)))
+    shards = max(1, min(int(shards), int(duration // MIN_SHARD_SECONDS) or 1))
+    bounds = [total * i // shards for i in range(shards + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(shards) if bounds[i + 1] > bounds[i]]
+
+
+def _decode_shard(ffmpeg_path, source_path, raw_path, start, end, sample_rate, channels, last):
+    """
+    区間 [start, end) を s16le の生PCMとして raw_path に書き出し、ちょうど end - start サンプルに揃える
+
+    最後の区間は長さを制限しない（長さ情報の誤差で末尾を落とさないため）。
+    """
+    sr = int(sample_rate)
+    preroll = min(int(SHARD_PREROLL_SECONDS * sr), start)
+    cmd = [ffmpeg_path, "-ss", f"{(start - preroll) / sr:.6f}", "-i", source_path]
+    if not last:
+        cmd += ["-t", f"{(end - start + preroll) / sr + SHARD_PAD_SECONDS:.6f}"]
+    cmd += [
+        "-vn",
+        "-af", f"aresample={sr},atrim=start_sample={preroll}",
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "-ac", str(channels),
+        "-ar", str(sr),
+        "-loglevel", "error",
+        "-y",
+        raw_path,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        error = result.stderr.strip() if result.stderr else "不明なエラー"
+        raise RuntimeError(f"❌ FFmpeg error (shard {start}-{end}):\n{error}")
+
+    if last:
+        return
+    # デコード誤差で長短が出た分を切り詰め / 無音で埋めて、後続シャードのオフセットを正確に保つ
+    frame_bytes = 2 * channels
+    size = (end - start) * frame_bytes
+    with open(raw_path, "r+b") as f:
+        f.seek(0, os.SEEK_END)
+        actual = f.tell()
+        if actual > size:
+            f.truncate(size)
+        elif actual < size:
+            f.write(b"\0" * (size - actual))
+
+
+def _copy_raw(raw_paths, write):
+    for raw_path in raw_paths:
+        with open(raw_path, "rb") as f:
+            for block in iter(lambda: f.read(PCM_READ_BYTES), b""):
+                write(block)
+
+
+def _write_wav(path, raw_paths, sample_rate, channels):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(int(sample_rate))
+        _copy_raw(raw_paths, w.writeframesraw)
+
+
+def extract_sharded(ffmpeg_path: str, video_path: str, output_path: str,
+                    output_format: str = "wav", sample_rate=16000, shards: int = 4,
+                    duration: float = None, channels: int = 1, shard_dir: str = None) -> list:
+    """
+    長尺動画を時間で分割し、shards 個の ffmpeg で並列に抽出して output_path に連結
+
+    各シャードは -ss（入力側シーク）で開始位置の少し手前へ移動してデコード・リサンプリングし、
+    手前の分（SHARD_PREROLL_SECONDS）を捨て、サンプル数を区間長にちょうど揃えてから順に連結する（WAV はヘッダを付けるだけ、
+    mp3 / flac は連結した PCM を1回だけエンコード）。
+    shard_dir を指定すると、各シャードを WAV として残し、オフセットを shards.json に記録する
+    （チャンク単位の ASR にそのまま使える）。
+
+    戻り値: シャード情報のリスト [{"start_sample", "num_samples", "offset_seconds", ("path")}]
+    """
+    if duration is None:
+        duration = probe_duration(video_path, ffmpeg_path)
+    if not duration:
+        raise RuntimeError(f"❌ 長さを取得できません: {video_path}")
+
+    sr = int(sample_rate)
+    ranges = shard_ranges(duration, sr, shards)
+    work_dir = os.path.dirname(os.path.abspath(output_path))
+    tag = uuid.uuid4().hex[:8]
+    raw_paths = [
+        os.path.join(work_dir, f".{tag}.shard{i:03d}.partial.raw") for i in range(len(ranges))
+    ]
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [
+                executor.submit(
+                    _decode_shard, ffmpeg_path, video_path, raw_path, start, end,
+                    sr, channels, i == len(ranges) - 1
+                )
+                for i, (raw_path, (start, end)) in enumerate(zip(raw_paths, ranges))
+            ]
+            for future in futures:
+                future.result()
+
+        if output_format == "wav":
+            _write_wav(output_path, raw_paths, sr, channels)
+        else:
+            cmd = [
+                ffmpeg_path,
+                "-f", "s16le", "-ar", str(sr), "-ac", str(channels), "-i", "pipe:0",
+                *CODEC_ARGS.get(output_format, CODEC_ARGS["wav"]),
+                "-loglevel", "error",
+                "-y",
+                output_path,
+            ]
+            with tempfile.TemporaryFile() as stderr_file:
+                proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=stderr_file)
+                try:
+                    _copy_raw(raw_paths, proc.stdin.write)
+                except BrokenPipeError:
+                    # ffmpeg が先に終了した（原因は終了コードと stderr で報告）
+                    pass
+                finally:
+                    try:
+                        proc.stdin.close()
+                    except BrokenPipeError:
+                        pass
+                _check_pipe_exit(proc, stderr_file)
+
+        frame_bytes = 2 * channels
+        shard_info = []
+        offset = 0
+        for raw_path, (start, _) in zip(raw_paths, ranges):
+            num_samples = os.path.getsize(raw_path) // frame_bytes
+            shard_info.append({
+                "start_sample": offset,
+                "num_samples": num_samples,
+                "offset_seconds": offset / sr,
+            })
+            offset += num_samples
+
+        if shard_dir:
+            os.makedirs(shard_dir, exist_ok=True)
+            for i, (raw_path, info) in enumerate(zip(raw_paths, shard_info)):
+                info["path"] = os.path.join(shard_dir, f"shard_{i:03d}.wav")
+                _write_wav(info["path"], [raw_path], sr, channels)
+            with open(os.path.join(shard_dir, "shards.json"), "w", encoding="utf-8") as f:
+                json.dump({
+                    "source": video_path,
+                    "sample_rate": sr,
+                    "channels": channels,
+                    "shards": shard_info,
+                }, f, ensure_ascii=False, indent=2)
+
+        return shard_info
+    finally:
+        for raw_path in raw_paths:
+            try:
+                os.remove(raw_path)
+            except OSError:
+                pass
+
+
+def build_pcm_command(ffmpeg_path: str, source_path: str, sample_rate=16000,
+                      channels: int = 1) -> list:
+    """音声を 32bit float リトルエンディアンの生PCMとして標準出力へ書き出すコマンド"""
+    return [
+        ffmpeg_path,
+        "-i", source_path,
+        "-vn",
+        "-f", "f32le",
+        "-acodec", "pcm_f32le",
+        "-ac", str(channels),
+        "-ar", str(sample_rate),
+        "-loglevel", "error",
+        "pipe:1",
+    ]
+
+
+def _check_pipe_exit(proc, stderr_file):
+    """
+    パイプで実行した ffmpeg の終了を待ち、失敗時は stderr の末尾を含めて RuntimeError
+
+    stderr をパイプにすると、stdin/stdout の読み書き中に stderr のバッファが埋まった時点で
+    ffmpeg が停止してデッドロックするため、一時ファイルに書き出させてから読む。
+    """
+    if proc.wait() == 0:
+        return
+    stderr_file.seek(0, os.SEEK_END)
+    stderr_file.seek(max(0, stderr_file.tell() - STDERR_TAIL_BYTES))
+    error = stderr_file.read().decode("utf-8", errors="replace").strip()
+    raise RuntimeError(
+        f"❌ FFmpeg error (exit code {proc.returncode}):\n{error or '不明なエラー'}"
+    )
+
+
+def _open_pcm_pipe(source_path, sample_rate, channels, ffmpeg_path, stderr_file):
+    cmd = build_pcm_command(ffmpeg_path or find_ffmpeg(), source_path, sample_rate, channels)
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file, bufsize=0)
+
+
+def _fill(stream, raw: memoryview) -> int:
+    """raw がいっぱいになるか EOF まで readinto し、読み込んだバイト数を返す"""
+    filled = 0
+    while filled < len(raw):
+        n = stream.readinto(raw[filled:filled + PCM_READ_BYTES])
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+def read_pcm(source_path: str, sample_rate=16000, channels: int = 1,
+             expected_seconds: float = None, ffmpeg_path: str = None) -> np.ndarray:
+    """
+    ffmpeg でデコードした音声を float32 配列として直接読み込む
+
+    事前確保したバッファに readinto で書き込むため、中間の bytes オブジェクトを作らない。
+    expected_seconds（既知の長さ）を渡すとバッファを一度で確保できる。
+    不明な場合は PCM_INITIAL_SECONDS から倍々に拡張する。
+    戻り値: shape [samples] (mono) または [samples, channels] の float32 配列
+    """
+    frame = int(sample_rate) * channels
+    capacity = int((expected_seconds or PCM_INITIAL_SECONDS) * frame) + frame
+    buf = np.empty(capacity, dtype=np.float32)
+    filled = 0
+
+    with tempfile.TemporaryFile() as stderr_file:
+        proc = _open_pcm_pipe(source_path, sample_rate, channels, ffmpeg_path, stderr_file)
+        try:
+            while True:
+                raw = memoryview(buf).cast("B")
+                filled += _fill(proc.stdout, raw[filled:])
+                if filled < len(raw):
+                    break
+                grown = np.empty(len(buf) * 2, dtype=np.float32)
+                grown[:len(buf)] = buf
+                buf = grown
+        finally:
+            # 途中で例外が出た場合も、パイプを閉じれば ffmpeg は終了する
+            proc.stdout.close()
+            proc.wait()
+        _check_pipe_exit(proc, stderr_file)
+
+    samples = filled // 4 // channels * channels
+    wav = buf[:samples]
+    # 確保しすぎた場合は余りを解放
+    if len(buf) > samples * 1.25:
+        wav = wav.copy()
+    return wav.reshape(-1, channels) if channels > 1 else wav
+
+
+def link_or_copy(src: str, dst: str):
+    """src を dst にハードリンク（別ドライブなどで不可ならコピー）"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class ExtractionCache:
+    """
+    抽出済み音声ファイルのLRUディスクキャッシュ
+
+    1エントリ = 1 音声ファイル（<key>.<format>）。抽出は一時ファイルに書き込み、
+    完了後に os.replace で確定するため、途中で失敗したファイルがヒットすることはない。
+    ヒット時にファイルの更新日時を更新し、容量超過時は更新日時が古い順に削除する。
+    """
+
+    def __init__(self, cache_dir: str = None,
+                 max_bytes: int = int(DEFAULT_EXTRACT_CACHE_GB * 1024 ** 3)):
+        if cache_dir is None:
+            cache_dir = os.path.join(folder_paths.get_output_directory(), "rogoai_cache", "audio")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(source_path: str, output_format: str, sample_rate, channels: int = 1,
+                 content_hash: bool = False, **params) -> str:
+        """
+        ソースの同一性と抽出パラメータからキャッシュキーを生成
+
+        content_hash=True の場合はファイル内容のハッシュを使う（移動・コピーしたファイルでもヒット）。
+        """
+        source = hash_file_content(source_path) if content_hash else hash_file_identity(source_path)
+        payload = json.dumps({
+            "source": source,
+            "format": output_format,
+            "sample_rate": int(sample_rate),
+            "channels": int(channels),
+            **params,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key: str, output_format: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{output_format}")
+
+    def get(self, key: str, output_format: str):
+        """キャッシュ済みファイルのパス（なければ None）"""
+        path = self.path(key, output_format)
+        if not os.path.isfile(path):
+            return None
+        # LRU: アクセス日時を更新
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return path
+
+    def temp_path(self, key: str, output_format: str) -> str:
+        """抽出先の一時ファイルパス（拡張子は ffmpeg の形式判定のため残す）"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return os.path.join(self.cache_dir, f"{key}.{uuid.uuid4().hex[:8]}.partial.{output_format}")
+
+    def put(self, key: str, output_format: str, temp_path: str) -> str:
+        """一時ファイルをキャッシュに確定し、確定後のパスを返す"""
+        path = self.path(key, output_format)
+        os.replace(temp_path, path)
+        self._evict(keep=path)
+        return path
+
+    def get_or_extract(self, key: str, output_format: str, extract):
+        """
+        キャッシュにあればそのパス、なければ extract(temp_path) で抽出して登録
+
+        戻り値: (path, hit)
+        """
+        path = self.get(key, output_format)
+        if path is not None:
+            return path, True
+
+        temp_path = self.temp_path(key, output_format)
+        try:
+            extract(temp_path)
+            if not os.path.isfile(temp_path):
+                raise FileNotFoundError("音声ファイルが生成されませんでした")
+            return self.put(key, output_format, temp_path), False
+        finally:
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def _evict(self, keep: str = None):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if ".partial." in name:
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            # 登録直後のファイルは（単独で上限を超えていても）残す
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,88 @@
+"""
+RogoAI Probe Media
+動画・音声ファイルのメディア情報（長さ・コーデック・サンプルレート・チャンネル数）を取得するノード
+
+ffprobe の結果は ComfyUI/output/rogoai_cache/probe_index.json に
+ファイルのパス・サイズ・更新日時ごとに保存されるため、2回目以降は ffprobe を実行しない。
+"""
+
+import json
+import os
+import time
+
+from .ffmpeg_utils import fast_path, find_ffmpeg, probe_media
+
+
+class RogoAI_ProbeMedia:
+    """
+    メディア情報の取得（抽出前の確認用）
+
+    【出力】
+    ・duration / audio_codec / sample_rate / channels / has_video
+    ・info: 全情報の JSON（抽出の高速パス判定を含む）
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "media_path": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "placeholder": "動画・音声ファイルのフルパスを入力"
+                }),
+            },
+        }
+
+    RETURN_TYPES = ("FLOAT", "STRING", "INT", "INT", "BOOLEAN", "STRING")
+    RETURN_NAMES = ("duration", "audio_codec", "sample_rate", "channels", "has_video", "info")
+    FUNCTION = "probe"
+    CATEGORY = "RogoAI/Audio"
+
+    def probe(self, media_path):
+        media_path = media_path.strip().strip('"').strip("'").strip()
+        if not media_path or not os.path.exists(media_path):
+            raise FileNotFoundError(f"❌ Media file not found: {media_path}")
+
+        start_time = time.time()
+        info = probe_media(media_path, find_ffmpeg())
+        if info is None:
+            raise RuntimeError(f"❌ メディア情報を取得できません: {media_path}")
+        elapsed_ms = (time.time() - start_time) * 1000
+
+        info = dict(info)
+        # Extract Audio ノードのデフォルト設定（16kHz モノラル）で使われる高速パス
+        info["fast_path"] = {
+            fmt: fast_path(info, fmt, 16000) or "encode" for fmt in ("wav", "mp3", "flac")
+        }
+
+        print(f"🔎 [RogoAI Probe] {os.path.basename(media_path)}: "
+              f"{info['audio_codec']} / {info['sample_rate']} Hz / {info['channels']}ch / "
+              f"{info['duration'] or 0:.1f}s ({elapsed_ms:.0f} ms)")
+
+        return (
+            float(info["duration"] or 0.0),
+            info["audio_codec"] or "",
+            int(info["sample_rate"] or 0),
+            int(info["channels"] or 0),
+            bool(info["has_video"]),
+            json.dumps(info, ensure_ascii=False, indent=2),
+        )
+
+    @classmethod
+    def IS_CHANGED(cls, media_path):
+        media_path = media_path.strip().strip('"').strip("'").strip()
+        if not media_path or not os.path.exists(media_path):
+            return float("nan")
+        stat = os.stat(media_path)
+        return f"{stat.st_mtime_ns}_{stat.st_size}"
+
+
+# ノード登録
+NODE_CLASS_MAPPINGS = {
+    "RogoAI_ProbeMedia": RogoAI_ProbeMedia,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "RogoAI_ProbeMedia": "RogoAI Probe Media 🔎",
+}
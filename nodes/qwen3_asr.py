@@ -8,16 +8,55 @@ RogoAI Qwen3-ASR Long Audio Edition
 - プログレスバー表示 (処理状況を可視化)
 - デバッグモード (トークン消費量などの詳細情報)
 - エラーハンドリング強化
+- VADチャンク分割 + バッチ推論 (長尺音声の切り捨て防止・高速化)
+- ストリーミングAPI (stream_transcribe: チャンク完了ごとに結果を返す)
+- プロセス内LRUモデルキャッシュ (モデル切り替え時の再読み込みを回避)
+- comfy.model_management 連携 (アイドル時のオフロード・メモリ不足時の解放)
+- 文字起こし結果のディスクキャッシュ (同じ音声・設定の再実行をスキップ)
+- チャンクごとの max_new_tokens 自動調整 (モデル再読み込み不要)
+- 繰り返しループ検出による生成の早期停止 + 再試行
+- ステージ別の処理時間・トークン数・メモリ計測 (metrics_json 出力)
+- 省メモリな音声受け渡し (モノラルfloat32はコピーなし・int16はそのまま保持)
+- 16kHz へのリサンプリングをノード側で実施 (フィルタ係数・変換結果をキャッシュ)
+- Forced Aligner の遅延読み込み・個別解放 + 独立したバッチアライメント (Align ノード)
+- 単語タイムスタンプを並列配列のまま出力 (WORD_TIMESTAMPS 型、文字列の再パース不要)
+- 言語自動判定は先頭の短い区間だけで行い、以降はその言語に固定 (language_probe_seconds)
+- 無音・非音声区間を推論前に除外 (skip_non_speech、タイムスタンプは元音声の時間軸のまま)
+- 重なり付き固定長ウィンドウ分割 (chunk_mode="window") + 重なり部分のテキスト突き合わせで重複除去
+- チャンク単位のチェックポイント保存と中断ジョブの再開 (resume)
+- バッチサイズの自動決定（空きメモリ・チャンク長から推定、OOM時は半減して再試行、CPUはスループットで調整）
 """
 
+import difflib
+import gc
+import json
 import os
 import shutil
+import string
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
 import torch
-import numpy as np
 import folder_paths
 import comfy.model_management as mm
+import comfy.model_patcher
 # from comfy.utils import ProgressBar  # 一時的に無効化 - ComfyUI 0.11.1バグ対策
-from qwen_asr import Qwen3ASRModel
+from qwen_asr import Qwen3ASRModel, Qwen3ForcedAligner
+from transformers import StoppingCriteria, StoppingCriteriaList
+
+from .asr_cache import JobCheckpoint, TranscriptCache, hash_waveform
+from .asr_metrics import ASRMetrics
+from .audio_utils import (
+    MODEL_SAMPLE_RATE,
+    as_float32,
+    fixed_windows,
+    resample_audio,
+    speech_regions,
+    split_on_silence,
+    waveform_to_mono,
+)
+from .word_timestamps import WordTimestamps
 
 
 # Register Qwen3-ASR models folder with ComfyUI
@@ -46,6 +85,49 @@ SUPPORTED_LANGUAGES = [
     "Hungarian", "Macedonian", "Romanian"
 ]
 
+# 単語間にスペースを入れない言語（チャンク結合時に使用）
+NO_SPACE_LANGUAGES = {"Chinese", "Japanese", "Cantonese", "Thai"}
+
+# チャンク分割モード
+CHUNK_MODES = ["none", "vad", "window"]
+
+# window モードでの隣接ウィンドウの重なり（秒）
+WINDOW_OVERLAP_SECONDS = 2.0
+
+# 繰り返しループ対策
+LOOP_MAX_NGRAM = 12          # 検出するn-gramの最大長（トークン）
+LOOP_MIN_REPEATS = 4         # 最低繰り返し回数
+LOOP_MIN_SPAN_TOKENS = 24    # 繰り返し部分の最小トークン数（短いn-gramほど多くの繰り返しを要求）
+LOOP_RETRY_KWARGS = {"repetition_penalty": 1.2}
+
+# Qwen3-ForcedAligner の1入力あたりの上限（秒）
+MAX_ALIGN_SECONDS = 180.0
+
+# 言語自動判定（language="auto"）に使う先頭区間の長さと試行回数
+LANGUAGE_PROBE_SECONDS = 15.0
+LANGUAGE_PROBE_ATTEMPTS = 3
+
+# 非音声スキップのデフォルト閾値（dBFS）
+SILENCE_THRESHOLD_DB = -45.0
+
+# バッチサイズ自動決定
+AUDIO_TOKENS_PER_SECOND = 12.5   # 音声エンコーダ出力のトークンレート（概算）
+BATCH_MEMORY_MARGIN = 2.0        # KVキャッシュ以外（活性化・エンコーダ出力）の見込み倍率
+DEFAULT_BATCH_SIZE = 8           # メモリから推定できない場合の初期値
+MAX_AUTO_BATCH_SIZE = 64
+
+# バッチサイズの学習結果（プロセス内で保持）
+# key: (model_path, precision, device)
+# value: {"ok_seconds", "ok_size", "oom_seconds", "cpu_size", "cpu_best"}
+#   *_seconds はバッチ内の最長チャンク長 × バッチサイズ（成功した最大値 / OOMした最小値）
+_BATCH_STATE = {}
+
+# プロセス内モデルキャッシュ
+# key: (model_path, dtype, attention, forced_aligner, max_new_tokens)
+# value: (model, 推定バイト数)  ※ 末尾が最近使用したもの
+DEFAULT_MODEL_CACHE_GB = 8.0
+_MODEL_CACHE = OrderedDict()
+
 
 def get_local_model_path(repo_id: str) -> str:
     folder_name = QWEN3_ASR_MODELS.get(repo_id) or QWEN3_FORCED_ALIGNERS.get(repo_id) or repo_id.replace("/", "_")
@@ -99,7 +181,13 @@ def download_model_to_comfyui(repo_id: str, source: str) -> str:
     return target_path
 
 
-def load_audio_input(audio_input):
+def load_audio_input(audio_input, keep_int16=False):
+    """
+    ComfyUI AUDIO → (モノラル波形, サンプルレート)
+    
+    モノラル float32 の場合は AUDIO テンソルとメモリを共有し、コピーしない。
+    keep_int16=True の場合、int16 の波形はモデルに渡す直前まで int16 のまま保持。
+    """
     if audio_input is None:
         return None
         
@@ -107,13 +195,66 @@ def load_audio_input(audio_input):
     sr = audio_input["sample_rate"]
     
     wav = waveform[0]
-    
-    if wav.shape[0] > 1:
-        wav = torch.mean(wav, dim=0)
-    else:
-        wav = wav.squeeze(0)
         
-    return (wav.numpy().astype(np.float32), sr)
+    return (waveform_to_mono(wav, keep_int16=keep_int16), sr)
+
+
+# リサンプル済み音声の再利用キャッシュ（id(waveform) → (weakref, wav_16k)）
+# 同じ AUDIO を複数の Transcribe ノードに繋いだ場合や再実行時に変換を省略する
+_RESAMPLED_AUDIO = OrderedDict()
+RESAMPLED_AUDIO_CACHE_SIZE = 4
+
+
+def prepare_model_audio(audio_input, metrics=None):
+    """
+    ComfyUI AUDIO → (モノラル波形, 16000)
+
+    モデルのネイティブレート (16kHz) 以外の場合はノード側で一度だけリサンプリングする。
+    変換結果は元の波形テンソルが生きている間キャッシュされ、次回以降は再利用される。
+    16kHz の入力は load_audio_input と同様にコピーなし（int16 はそのまま保持）。
+    """
+    if audio_input is None:
+        return None
+
+    waveform = audio_input["waveform"]
+    sr = int(audio_input["sample_rate"])
+    if sr == MODEL_SAMPLE_RATE:
+        if metrics is None:
+            return load_audio_input(audio_input, keep_int16=True)
+        with metrics.stage("audio_conversion"):
+            return load_audio_input(audio_input, keep_int16=True)
+
+    key = (id(waveform), sr)
+    entry = _RESAMPLED_AUDIO.get(key)
+    if entry is not None and entry[0]() is waveform:
+        _RESAMPLED_AUDIO.move_to_end(key)
+        if metrics is not None:
+            metrics.add("resample_cache_hits", 1)
+        return (entry[1], MODEL_SAMPLE_RATE)
+
+    if metrics is None:
+        wav, _ = load_audio_input(audio_input)
+        resampled = resample_audio(wav, sr, MODEL_SAMPLE_RATE)
+    else:
+        with metrics.stage("audio_conversion"):
+            wav, _ = load_audio_input(audio_input)
+        with metrics.stage("resampling"):
+            resampled = resample_audio(wav, sr, MODEL_SAMPLE_RATE)
+    print(f"🔁 Resampled: {sr} Hz → {MODEL_SAMPLE_RATE} Hz")
+
+    try:
+        ref = weakref.ref(waveform)
+    except TypeError:
+        return (resampled, MODEL_SAMPLE_RATE)
+
+    # 解放済みテンソルのエントリを掃除してから追加
+    for stale in [k for k, (r, _) in _RESAMPLED_AUDIO.items() if r() is None]:
+        del _RESAMPLED_AUDIO[stale]
+    _RESAMPLED_AUDIO[key] = (ref, resampled)
+    while len(_RESAMPLED_AUDIO) > RESAMPLED_AUDIO_CACHE_SIZE:
+        _RESAMPLED_AUDIO.popitem(last=False)
+
+    return (resampled, MODEL_SAMPLE_RATE)
 
 
 def calculate_recommended_tokens(audio_duration_seconds: float, language: str = "Japanese") -> int:
@@ -146,6 +287,1036 @@ def calculate_recommended_tokens(audio_duration_seconds: float, language: str =
     return recommended
 
 
+def _model_modules(model):
+    """Qwen3ASRModel 内の torch モジュール（ASR本体 + Forced Aligner）を返す"""
+    modules = []
+    asr = getattr(model, "model", None)
+    if isinstance(asr, torch.nn.Module):
+        modules.append(asr)
+    aligner = getattr(model, "forced_aligner", None)
+    if aligner is not None:
+        aligner_module = getattr(aligner, "model", aligner)
+        if isinstance(aligner_module, torch.nn.Module):
+            modules.append(aligner_module)
+    return modules
+
+
+def estimate_model_bytes(model) -> int:
+    """
+    Qwen3ASRModel（+ Forced Aligner）のパラメータ・バッファの合計バイト数を推定
+    """
+    return sum(mm.module_size(module) for module in _model_modules(model))
+
+
+class _PatcherModule(torch.nn.Module):
+    """
+    ModelPatcher に渡す入れ物（HFモジュールを子として持つだけの nn.Module）
+
+    ModelPatcher は初期化・読み込み・退避のたびに model.device / model_lowvram /
+    model_loaded_weight_memory / current_weight_patches_uuid などを model に書き込むが、
+    transformers の PreTrainedModel では device が setter のないプロパティのため
+    直接包むと最初の load で AttributeError になる。
+    属性の書き込み先をこの入れ物にし、HFモデル本体には触れさせない。
+    パラメータ・バッファは子モジュールとして辿れるため、module_size / named_modules / to()
+    （ModelPatcher の全体読み込みで使われるもの）はそのまま HF モデルに作用する。
+    """
+
+    def __init__(self, module):
+        super().__init__()
+        self.inner = module
+        # current_loaded_device() は load 前にも model.device を参照する
+        param = next(module.parameters(), None)
+        self.device = param.device if param is not None else torch.device("cpu")
+
+
+def _make_patcher(module):
+    return comfy.model_patcher.ModelPatcher(
+        _PatcherModule(module),
+        load_device=mm.get_torch_device(),
+        offload_device=mm.unet_offload_device(),
+        size=mm.module_size(module),
+    )
+
+
+def register_model_management(model):
+    """
+    ASRモデルを ModelPatcher で包み、comfy.model_management から見えるようにする
+
+    モデルはオフロードデバイス（通常CPU）に読み込んでおき、文字起こし時に
+    load_model_to_device() で mm.load_models_gpu 経由でGPUへ移動する。
+    これによりComfyUIが他のモデルのためにVRAMを空ける際、ASRモデルも
+    オフロード対象になる。
+    """
+    model.rogoai_patchers = [_make_patcher(module) for module in _model_modules(model)]
+
+
+def _update_cached_size(model):
+    """Forced Aligner の読み込み・解放後にキャッシュ上のモデルサイズを更新"""
+    size = estimate_model_bytes(model)
+    for key, (cached, _) in list(_MODEL_CACHE.items()):
+        if cached is model:
+            _MODEL_CACHE[key] = (cached, size)
+
+
+def ensure_forced_aligner(model) -> bool:
+    """
+    タイムスタンプが必要になった時点で Forced Aligner を読み込む
+
+    Loader では設定（rogoai_aligner_spec）だけを保持しておき、最初のタイムスタンプ要求で
+    Qwen3ForcedAligner を読み込んでモデルに取り付ける。新たに読み込んだ場合は True。
+    """
+    if getattr(model, "forced_aligner", None) is not None:
+        return False
+
+    spec = getattr(model, "rogoai_aligner_spec", None)
+    if not spec:
+        raise ValueError(
+            "❌ return_timestamps には Forced Aligner が必要です。"
+            "Loaderノードで forced_aligner を選択してください"
+        )
+
+    aligner_path = get_local_model_path(spec["repo_id"])
+    if not (os.path.exists(aligner_path) and os.listdir(aligner_path)):
+        aligner_path = download_model_to_comfyui(spec["repo_id"], spec["source"])
+
+    print(f"[RogoAI Qwen3-ASR] ⏳ Forced Aligner を読み込み中: {aligner_path}")
+    model.forced_aligner = Qwen3ForcedAligner.from_pretrained(aligner_path, **spec["kwargs"])
+
+    aligner_module = getattr(model.forced_aligner, "model", model.forced_aligner)
+    if isinstance(aligner_module, torch.nn.Module):
+        patchers = getattr(model, "rogoai_patchers", None)
+        if patchers is not None:
+            patchers.append(_make_patcher(aligner_module))
+    _update_cached_size(model)
+    return True
+
+
+def unload_forced_aligner(model) -> bool:
+    """Forced Aligner だけを解放（ASR本体は残す）。解放した場合は True"""
+    aligner = getattr(model, "forced_aligner", None)
+    if aligner is None:
+        return False
+
+    aligner_module = getattr(aligner, "model", aligner)
+    patchers = getattr(model, "rogoai_patchers", None) or []
+    aligner_patchers = [
+        p for p in patchers if getattr(getattr(p, "model", None), "inner", None) is aligner_module
+    ]
+    for i in range(len(mm.current_loaded_models) - 1, -1, -1):
+        loaded = mm.current_loaded_models[i]
+        if any(loaded.model is patcher for patcher in aligner_patchers):
+            loaded.model_unload()
+            mm.current_loaded_models.pop(i)
+    model.rogoai_patchers = [p for p in patchers if p not in aligner_patchers]
+
+    model.forced_aligner = None
+    del aligner, aligner_module, aligner_patchers
+    _update_cached_size(model)
+    _release_memory()
+    return True
+
+
+def load_model_to_device(model):
+    """文字起こし前にモデルを推論デバイスへ読み込む（必要なら他モデルを退避）"""
+    patchers = getattr(model, "rogoai_patchers", None)
+    if patchers:
+        # HFモデルは部分読み込み(lowvram)に対応しないため全体を読み込む
+        mm.load_models_gpu(patchers, force_full_load=True)
+
+
+def offload_model(model):
+    """モデルをオフロードデバイスへ退避し、ComfyUIの読み込み済みリストから外す"""
+    patchers = getattr(model, "rogoai_patchers", None) or []
+    for i in range(len(mm.current_loaded_models) - 1, -1, -1):
+        loaded = mm.current_loaded_models[i]
+        if any(loaded.model is patcher for patcher in patchers):
+            loaded.model_unload()
+            mm.current_loaded_models.pop(i)
+
+
+def _release_memory():
+    gc.collect()
+    mm.soft_empty_cache()
+
+
+def get_cached_model(key):
+    """キャッシュからモデルを取得（ヒット時はLRU順序を更新）"""
+    entry = _MODEL_CACHE.get(key)
+    if entry is None:
+        return None
+    _MODEL_CACHE.move_to_end(key)
+    return entry[0]
+
+
+def cache_model(key, model, budget_bytes: int):
+    """
+    モデルをキャッシュに登録し、予算を超えた分を古い順に破棄
+    モデル単体で予算を超える場合はキャッシュしない
+    """
+    size = estimate_model_bytes(model)
+    if budget_bytes <= 0 or size > budget_bytes:
+        return
+
+    _MODEL_CACHE[key] = (model, size)
+    _MODEL_CACHE.move_to_end(key)
+
+    evicted = False
+    while sum(entry[1] for entry in _MODEL_CACHE.values()) > budget_bytes:
+        old_key, (old_model, old_size) = _MODEL_CACHE.popitem(last=False)
+        offload_model(old_model)
+        print(f"[RogoAI Qwen3-ASR] 🧹 キャッシュから破棄: {old_key[0]} ({old_size / 1024**3:.2f} GB)")
+        evicted = True
+    if evicted:
+        _release_memory()
+
+
+def unload_cached_model(key) -> bool:
+    """指定したモデルをキャッシュから破棄"""
+    entry = _MODEL_CACHE.pop(key, None)
+    if entry is None:
+        return False
+    offload_model(entry[0])
+    del entry
+    _release_memory()
+    return True
+
+
+def clear_model_cache() -> int:
+    """キャッシュ内の全モデルを破棄し、破棄した件数を返す"""
+    count = len(_MODEL_CACHE)
+    for cached, _ in _MODEL_CACHE.values():
+        offload_model(cached)
+    _MODEL_CACHE.clear()
+    _release_memory()
+    return count
+
+
+def join_chunk_texts(texts, language: str = "") -> str:
+    """
+    チャンクごとのテキストを結合
+    日本語・中国語などはそのまま連結、それ以外はスペース区切り
+    """
+    sep = "" if language in NO_SPACE_LANGUAGES else " "
+    return sep.join(t.strip() for t in texts if t and t.strip())
+
+
+_MATCH_STRIP = string.punctuation + "、。，．！？「」『』（）・…　"
+
+
+def _split_tokens(text: str, language: str = ""):
+    """突き合わせ用にテキストを分割（日本語・中国語などは文字単位、それ以外は単語単位）"""
+    if language in NO_SPACE_LANGUAGES:
+        return list(text.strip()), ""
+    return text.split(), " "
+
+
+def merge_overlap_texts(prev_text: str, text: str, prev_duration: float, duration: float,
+                        overlap: float, language: str = ""):
+    """
+    重なり付きウィンドウの隣接テキストから重複部分を除去
+
+    前ウィンドウの末尾と次ウィンドウの先頭（それぞれ重なり相当の範囲）を
+    difflib で突き合わせ、最長一致部分の中央で切り替える。
+    一致の外側（ウィンドウ境界で途中から／途中までしか聞こえていない単語）は捨てる。
+    一致が見つからない場合は、文字数を時間比で按分して重なりの中央で切る。
+    戻り値: (prev_text, text) の整形後テキスト
+    """
+    if overlap <= 0 or not prev_text.strip() or not text.strip():
+        return prev_text, text
+
+    a, sep = _split_tokens(prev_text, language)
+    b, _ = _split_tokens(text, language)
+    # 発話速度のばらつきを見込んで、重なり時間の 1.5 倍 + 数トークンを探索範囲にする
+    ka = min(len(a), int(len(a) * overlap / max(prev_duration, 1e-6) * 1.5) + 4)
+    kb = min(len(b), int(len(b) * overlap / max(duration, 1e-6) * 1.5) + 4)
+    tail = [t.casefold().strip(_MATCH_STRIP) for t in a[len(a) - ka:]]
+    head = [t.casefold().strip(_MATCH_STRIP) for t in b[:kb]]
+
+    match = difflib.SequenceMatcher(None, tail, head, autojunk=False).find_longest_match(
+        0, len(tail), 0, len(head)
+    )
+    min_match = 4 if language in NO_SPACE_LANGUAGES else 2
+    if match.size >= min_match:
+        cut_a = len(a) - ka + match.a + match.size // 2
+        cut_b = match.b + match.size // 2
+    else:
+        cut_a = len(a) - round(len(a) * overlap / 2 / max(prev_duration, 1e-6))
+        cut_b = round(len(b) * overlap / 2 / max(duration, 1e-6))
+    return sep.join(a[:max(0, cut_a)]), sep.join(b[cut_b:])
+
+
+def merge_window_chunks(chunks, language: str = ""):
+    """
+    window モードのチャンク結果（index 順）の重なりを解消（in-place）
+
+    テキストは merge_overlap_texts で重複を除去し、start / end とタイムスタンプは
+    重なりの中央で区切る。結果のチャンクは元音声を重なりなく覆う。
+    戻り値: 重なりを解消した境界の数
+    """
+    merged = 0
+    for prev, chunk in zip(chunks, chunks[1:]):
+        overlap = prev["end"] - chunk["start"]
+        if overlap <= 0:
+            continue
+        lang = chunk["language"] or prev["language"] or language
+        prev["text"], chunk["text"] = merge_overlap_texts(
+            prev["text"], chunk["text"],
+            prev["end"] - prev["start"], chunk["end"] - chunk["start"],
+            overlap, lang,
+        )
+        mid = (prev["end"] + chunk["start"]) / 2
+        prev["time_stamps"] = [ts for ts in prev["time_stamps"] if (ts[0] + ts[1]) / 2 < mid]
+        chunk["time_stamps"] = [ts for ts in chunk["time_stamps"] if (ts[0] + ts[1]) / 2 >= mid]
+        prev["end"] = chunk["start"] = mid
+        merged += 1
+    return merged
+
+
+def get_model_max_tokens(model) -> int:
+    """Loaderで設定された max_new_tokens（生成トークン数の上限）を取得"""
+    config = getattr(model, "rogoai_config", None)
+    if config and config.get("max_new_tokens"):
+        return config["max_new_tokens"]
+    try:
+        return model.model.generation_config.max_new_tokens
+    except AttributeError:
+        return getattr(model, "max_new_tokens", None) or 8192
+
+
+def adaptive_max_tokens(model, duration_seconds: float, language=None) -> int:
+    """
+    音声長と言語から max_new_tokens を決定（Loaderの上限を超えない）
+    """
+    recommended = calculate_recommended_tokens(duration_seconds, language or "auto")
+    return min(get_model_max_tokens(model), recommended)
+
+
+def _count_generated_tokens(output, input_ids, pad_token_id):
+    """generate の出力から新規生成トークン数（パディング除く）を数える"""
+    sequences = getattr(output, "sequences", output)
+    if not isinstance(sequences, torch.Tensor) or sequences.dim() != 2:
+        return 0
+    prompt_length = input_ids.shape[1] if isinstance(input_ids, torch.Tensor) else 0
+    generated = sequences[:, prompt_length:]
+    if pad_token_id is None:
+        return generated.numel()
+    return int((generated != pad_token_id).sum())
+
+
+@contextmanager
+def generation_overrides(model, metrics=None, **generate_kwargs):
+    """
+    model.transcribe 内部の generate 呼び出しに引数を上書きで渡すコンテキストマネージャ
+
+    Qwen3ASRModel はモデル読み込み時の max_new_tokens を使って generate を呼ぶため、
+    インスタンスの generate を一時的に差し替えて、リクエストごとの設定を注入する。
+    metrics を渡すと生成時間・生成トークン数・アライメント時間も計測する。
+    """
+    hf_model = getattr(model, "model", None)
+    original_generate = getattr(hf_model, "generate", None)
+    original_max_tokens = getattr(model, "max_new_tokens", None)
+    aligner = getattr(model, "forced_aligner", None)
+    original_align = getattr(aligner, "align", None) if metrics is not None else None
+
+    if original_generate is None:
+        yield
+        return
+
+    def generate(*args, **kwargs):
+        kwargs.update(generate_kwargs)
+        if metrics is None:
+            return original_generate(*args, **kwargs)
+
+        start = time.perf_counter()
+        output = original_generate(*args, **kwargs)
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        metrics.add_time("generation", time.perf_counter() - start)
+
+        input_ids = kwargs.get("input_ids", args[0] if args else None)
+        pad_token_id = getattr(getattr(hf_model, "generation_config", None), "pad_token_id", None)
+        metrics.add("generated_tokens", _count_generated_tokens(output, input_ids, pad_token_id))
+        metrics.add("generate_calls", 1)
+        return output
+
+    def align(*args, **kwargs):
+        with metrics.stage("forced_alignment"):
+            return original_align(*args, **kwargs)
+
+    hf_model.generate = generate
+    if original_align is not None:
+        aligner.align = align
+    if original_max_tokens is not None and "max_new_tokens" in generate_kwargs:
+        model.max_new_tokens = generate_kwargs["max_new_tokens"]
+    try:
+        yield
+    finally:
+        # インスタンス属性を消してクラスのメソッドに戻す
+        del hf_model.generate
+        if original_align is not None:
+            del aligner.align
+        if original_max_tokens is not None:
+            model.max_new_tokens = original_max_tokens
+
+
+def is_oom_error(error: Exception) -> bool:
+    """CUDA / MPS のメモリ不足エラーかどうか"""
+    return isinstance(error, torch.cuda.OutOfMemoryError) or "out of memory" in str(error).lower()
+
+
+def _kv_bytes_per_token(model):
+    """テキストデコーダの1トークンあたりのKVキャッシュのバイト数（取得できなければ None）"""
+    try:
+        text_config = model.model.config.thinker_config.text_config
+        dtype = next(model.model.parameters()).dtype
+        head_dim = getattr(text_config, "head_dim", None) or (
+            text_config.hidden_size // text_config.num_attention_heads
+        )
+        element_size = torch.tensor([], dtype=dtype).element_size()
+        return (2 * text_config.num_hidden_layers * text_config.num_key_value_heads
+                * head_dim * element_size)
+    except (AttributeError, StopIteration, TypeError):
+        return None
+
+
+class BatchSizer:
+    """
+    チャンク推論のバッチサイズを決める
+
+    - 固定値 (batch_size > 0): そのまま使い、OOM 時のみ縮小
+    - GPU: 空きメモリとチャンク長・生成トークン数から KV キャッシュ量を見積もって決定。
+      過去に成功したバッチ（最長チャンク長 × サイズ）まではメモリ見積もりより優先し、
+      OOM したバッチ以上には増やさない
+    - CPU: 1 から倍々に増やしてスループット（音声秒/秒）を測り、伸びなくなった時点で固定
+    学習結果はモデル・精度・デバイスごとにプロセス内で保持する。
+    """
+
+    def __init__(self, model, batch_size=None):
+        config = getattr(model, "rogoai_config", {})
+        self.model = model
+        self.fixed = batch_size or None
+        self.device = mm.get_torch_device()
+        self.on_cpu = self.device.type == "cpu"
+        self.state = _BATCH_STATE.setdefault(
+            (config.get("model_path", ""), config.get("precision", ""), str(self.device)),
+            {"ok_seconds": 0.0, "ok_size": 0, "oom_seconds": None,
+             "cpu_size": None, "cpu_best": (0, 0.0)},
+        )
+        self.cpu_probe = 1
+
+    def suggest(self, longest_seconds: float, expected_tokens: int) -> int:
+        """最長チャンク長 longest_seconds・生成トークン数 expected_tokens のバッチサイズ"""
+        longest_seconds = max(longest_seconds, 1e-3)
+        if self.fixed:
+            size = self.fixed
+        elif self.on_cpu:
+            size = self.state["cpu_size"] or self.cpu_probe
+        else:
+            size = self._memory_size(longest_seconds, expected_tokens)
+            size = max(size, int(self.state["ok_seconds"] / longest_seconds))
+            size = min(size, MAX_AUTO_BATCH_SIZE)
+
+        oom_seconds = self.state["oom_seconds"]
+        if oom_seconds is not None:
+            size = min(size, -(-oom_seconds // longest_seconds) - 1)
+        return max(1, int(size))
+
+    def _memory_size(self, longest_seconds, expected_tokens):
+        kv_bytes = _kv_bytes_per_token(self.model)
+        if kv_bytes is None:
+            return self.state["ok_size"] or DEFAULT_BATCH_SIZE
+        tokens = AUDIO_TOKENS_PER_SECOND * longest_seconds + expected_tokens
+        per_item = kv_bytes * tokens * BATCH_MEMORY_MARGIN
+        return int(mm.get_free_memory(self.device) * 0.9 // per_item)
+
+    def record_success(self, size, longest_seconds, audio_seconds, elapsed):
+        batch_seconds = size * longest_seconds
+        if batch_seconds > self.state["ok_seconds"]:
+            self.state["ok_seconds"] = batch_seconds
+        self.state["ok_size"] = max(self.state["ok_size"], size)
+
+        # CPU: 探索中のサイズで満杯のバッチだけを比較
+        if not (self.on_cpu and not self.fixed and self.state["cpu_size"] is None):
+            return
+        if size != self.cpu_probe or elapsed <= 0:
+            return
+        throughput = audio_seconds / elapsed
+        best_size, best_throughput = self.state["cpu_best"]
+        if throughput > best_throughput * 1.1 and size < MAX_AUTO_BATCH_SIZE:
+            self.state["cpu_best"] = (size, throughput)
+            self.cpu_probe = size * 2
+        else:
+            if throughput > best_throughput:
+                best_size = size
+            self.state["cpu_size"] = best_size
+            print(f"   📦 CPUバッチサイズ決定: {best_size}")
+
+    def record_oom(self, size, longest_seconds) -> int:
+        """OOM を記録し、次に試すバッチサイズを返す"""
+        batch_seconds = size * max(longest_seconds, 1e-3)
+        oom_seconds = self.state["oom_seconds"]
+        self.state["oom_seconds"] = batch_seconds if oom_seconds is None else min(oom_seconds, batch_seconds)
+        if self.on_cpu:
+            self.state["cpu_size"] = max(1, size // 2)
+        self.fixed = min(self.fixed, max(1, size // 2)) if self.fixed else None
+        return max(1, size // 2)
+
+
+class RepetitionStoppingCriteria(StoppingCriteria):
+    """
+    生成中のトークン列末尾で同じn-gramが繰り返されたら、その行の生成を停止
+
+    n = 1〜max_ngram の各長さについて、末尾 n×k トークンが同一n-gramの
+    k回繰り返しになっているかをバッチ全体でベクトル化して判定する。
+    行ごとの bool テンソルを返すため transformers >= 4.39 が必要。
+    triggered: ループで停止した行数（生成ごとに1行1回）
+    end_token_ids (eos / pad) を渡すと、末尾がそれらの行は終了済みとして判定・集計から除く
+    （長さの異なるバッチでは、EOS 後の行に pad が続き1-gramの繰り返しに見えるため）
+    """
+
+    def __init__(self, max_ngram=LOOP_MAX_NGRAM, min_repeats=LOOP_MIN_REPEATS,
+                 min_span=LOOP_MIN_SPAN_TOKENS, end_token_ids=()):
+        self.max_ngram = max_ngram
+        self.min_repeats = min_repeats
+        self.min_span = min_span
+        self.end_token_ids = sorted({int(t) for t in end_token_ids if t is not None})
+        self.prompt_length = None
+        self.last_length = None
+        self.stopped = None
+        self.triggered = 0
+
+    def __call__(self, input_ids, scores, **kwargs):
+        # model.transcribe 内部で generate が複数回呼ばれる場合に備え、
+        # 長さが連続していなければ新しい生成が始まったとみなす
+        batch = input_ids.shape[0]
+        if self.last_length is None or input_ids.shape[1] != self.last_length + 1:
+            self.prompt_length = input_ids.shape[1] - 1
+            self.stopped = torch.zeros(batch, dtype=torch.bool, device=input_ids.device)
+        self.last_length = input_ids.shape[1]
+        generated = input_ids.shape[1] - self.prompt_length
+        is_loop = torch.zeros(batch, dtype=torch.bool, device=input_ids.device)
+
+        for n in range(1, self.max_ngram + 1):
+            repeats = max(self.min_repeats, -(-self.min_span // n))
+            span = n * repeats
+            if span > generated:
+                continue
+            tail = input_ids[:, -span:].reshape(batch, repeats, n)
+            is_loop |= (tail == tail[:, -1:, :]).flatten(1).all(dim=1)
+
+        # EOS を出した行は以降 pad が続くため、終了済みとして扱う
+        if self.end_token_ids:
+            end_ids = torch.tensor(self.end_token_ids, device=input_ids.device)
+            self.stopped |= torch.isin(input_ids[:, -1], end_ids)
+
+        # 停止済みの行はパディングが続くため、新たに停止した行だけを数える
+        self.triggered += int((is_loop & ~self.stopped).sum())
+        self.stopped |= is_loop
+        return is_loop
+
+
+def _end_token_ids(model) -> list:
+    """生成設定の eos_token_id / pad_token_id（eos は複数の場合がある）"""
+    config = getattr(getattr(model, "model", None), "generation_config", None)
+    ids = []
+    for name in ("eos_token_id", "pad_token_id"):
+        value = getattr(config, name, None)
+        if isinstance(value, (list, tuple)):
+            ids.extend(value)
+        elif value is not None:
+            ids.append(value)
+    return ids
+
+
+def trim_repetition_loop(text: str, max_unit: int = 200, min_repeats: int = 3,
+                         min_span: int = 20):
+    """
+    テキスト末尾の繰り返しループを検出し、繰り返し単位を1回分だけ残して除去
+
+    戻り値: (処理後テキスト, ループ検出したか)
+    """
+    for unit_len in range(1, min(max_unit, len(text) // min_repeats) + 1):
+        repeats = max(min_repeats, -(-min_span // unit_len))
+        span = unit_len * repeats
+        if span > len(text):
+            continue
+        unit = text[-unit_len:]
+        if text[-span:] != unit * repeats:
+            continue
+        # 繰り返しの開始位置まで遡る
+        start = len(text) - span
+        while start >= unit_len and text[start - unit_len:start] == unit:
+            start -= unit_len
+        return text[:start + unit_len], True
+    return text, False
+
+
+def _trim_time_stamps(time_stamps, text_length):
+    """ループ除去後のテキスト長に収まるタイムスタンプだけを残す"""
+    kept = []
+    consumed = 0
+    for ts in time_stamps:
+        consumed += len(ts[2])
+        if consumed > text_length:
+            break
+        kept.append(ts)
+    return kept
+
+
+def transcribe_batch(model, audios, language=None, context="",
+                     return_timestamps=False, offsets=None, max_new_tokens=None,
+                     loop_guard=False, generate_kwargs=None, metrics=None):
+    """
+    (wav, sr) のリストを1回の model.transcribe でまとめて推論
+
+    戻り値: 入力順の dict のリスト {"text", "language", "time_stamps", "loop_detected"}
+    offsets（秒）を指定すると time_stamps をその分ずらして返す。
+    max_new_tokens を指定するとこのリクエストだけ生成上限を変更する。
+    loop_guard=True の場合、繰り返しループを検出した時点で生成を止め、
+    末尾の繰り返し部分を除去する。
+    metrics (ASRMetrics) を渡すとステージ別の処理時間を記録する。
+    """
+    n = len(audios)
+    if n == 0:
+        return []
+    if offsets is None:
+        offsets = [0.0] * n
+
+    if return_timestamps and ensure_forced_aligner(model):
+        load_model_to_device(model)
+
+    overrides = dict(generate_kwargs or {})
+    if max_new_tokens:
+        overrides["max_new_tokens"] = max_new_tokens
+    loop_criteria = None
+    if loop_guard:
+        loop_criteria = RepetitionStoppingCriteria(end_token_ids=_end_token_ids(model))
+        overrides["stopping_criteria"] = StoppingCriteriaList([loop_criteria])
+    if metrics is not None:
+        stages_before = metrics.stages.get("generation", 0.0) + metrics.stages.get("forced_alignment", 0.0)
+        call_start = time.perf_counter()
+
+    # ライブラリ内部で再分割されないよう、このリクエストのバッチサイズに合わせる
+    original_batch_size = getattr(model, "max_inference_batch_size", None)
+    if original_batch_size is not None:
+        model.max_inference_batch_size = max(n, 1)
+    try:
+        with generation_overrides(model, metrics=metrics, **overrides):
+            results = model.transcribe(
+                audio=[(as_float32(wav), sr) for wav, sr in audios],
+                language=[language] * n,
+                context=[context if context else None] * n,
+                return_time_stamps=return_timestamps,
+            )
+    finally:
+        if original_batch_size is not None:
+            model.max_inference_batch_size = original_batch_size
+
+    if metrics is not None and loop_criteria is not None and loop_criteria.triggered:
+        metrics.add("loop_stops", loop_criteria.triggered)
+
+    if metrics is not None:
+        # 生成・アライメント以外の model.transcribe 内の時間（直接は計測していない残り）
+        # = 特徴量抽出・プロンプト構築・トークナイズ・デバイス間転送・デコード後の整形など
+        stages_after = metrics.stages.get("generation", 0.0) + metrics.stages.get("forced_alignment", 0.0)
+        call_seconds = time.perf_counter() - call_start
+        metrics.add_time("preprocess_overhead", max(0.0, call_seconds - (stages_after - stages_before)))
+        postprocess_start = time.perf_counter()
+
+    outputs = []
+    for offset_s, result in zip(offsets, results):
+        text = result.text or ""
+        time_stamps = []
+        if return_timestamps and getattr(result, "time_stamps", None):
+            time_stamps = [
+                (ts.start_time + offset_s, ts.end_time + offset_s, ts.text)
+                for ts in result.time_stamps
+            ]
+
+        loop_detected = False
+        if loop_guard:
+            text, loop_detected = trim_repetition_loop(text)
+            if loop_detected and time_stamps:
+                time_stamps = _trim_time_stamps(time_stamps, len(text))
+
+        outputs.append({
+            "text": text,
+            "language": result.language or "",
+            "time_stamps": time_stamps,
+            "loop_detected": loop_detected,
+        })
+
+    if metrics is not None:
+        metrics.add_time("postprocess", time.perf_counter() - postprocess_start)
+    return outputs
+
+
+def align_batch(model, audios, texts, languages, offsets=None,
+                batch_size=None, metrics=None):
+    """
+    (wav, sr) とテキストの組をまとめて Forced Aligner でアライメント
+
+    文字起こしとは独立したステージとして、必要なファイル・チャンクだけに後から
+    タイムスタンプを付けるために使う。音声長順に並べて batch_size ごとに推論する。
+    戻り値: 入力順の time_stamps リスト [[(start, end, text), ...], ...]
+    空テキスト・MAX_ALIGN_SECONDS を超える音声は空リストを返す。
+    """
+    n = len(audios)
+    if n == 0:
+        return []
+    if offsets is None:
+        offsets = [0.0] * n
+    if metrics is None:
+        metrics = ASRMetrics()
+
+    ensure_forced_aligner(model)
+    load_model_to_device(model)
+    aligner = model.forced_aligner
+    batch_size = batch_size or getattr(model, "max_inference_batch_size", None) or 32
+
+    todo = []
+    for i, ((wav, sr), text) in enumerate(zip(audios, texts)):
+        if not text or not text.strip():
+            continue
+        if len(wav) / sr > MAX_ALIGN_SECONDS:
+            print(f"⚠️  アライメントをスキップ: チャンク {i} が {len(wav) / sr:.0f}秒 "
+                  f"(上限 {MAX_ALIGN_SECONDS:.0f}秒、vad モードで分割してください)")
+            continue
+        todo.append(i)
+
+    # 音声長順に並べてパディングを削減
+    todo.sort(key=lambda i: len(audios[i][0]) / audios[i][1])
+
+    results = [[] for _ in range(n)]
+    for batch_start in range(0, len(todo), batch_size):
+        batch = todo[batch_start:batch_start + batch_size]
+        with metrics.stage("forced_alignment"):
+            aligned = aligner.align(
+                audio=[(as_float32(audios[i][0]), audios[i][1]) for i in batch],
+                text=[texts[i] for i in batch],
+                language=[languages[i] for i in batch],
+            )
+        for i, result in zip(batch, aligned):
+            results[i] = [
+                (item.start_time + offsets[i], item.end_time + offsets[i], item.text)
+                for item in result
+            ]
+    return results
+
+
+def format_timestamps(time_stamps) -> str:
+    """(start, end, text) のリストを "start-end: text" 形式の文字列に変換"""
+    return "\n".join(
+        f"{start:.2f}-{end:.2f}: {ts_text}" for start, end, ts_text in time_stamps
+    )
+
+
+def iter_transcribe_chunks(model, wav_array, sr, spans, language=None, context="",
+                           return_timestamps=False, batch_size=None,
+                           first_batch_size=None, adaptive_tokens=False,
+                           loop_guard=False, loop_retry=False, metrics=None):
+    """
+    チャンク列をバッチにまとめて model.transcribe に渡し、完了順に結果を返すジェネレータ
+
+    batch_size を省略（None / 0）すると BatchSizer が空きメモリ・チャンク長から自動で決め、
+    メモリ不足（OOM）の場合はバッチを半分にして同じチャンクを再試行する。
+    first_batch_size を小さくすると最初のバッチだけ小さく処理し、以降は
+    倍々に増やす（最初のテキストが出るまでの待ち時間を短縮）。
+    adaptive_tokens=True の場合、バッチ内の最長チャンクから max_new_tokens を決める。
+    loop_retry=True の場合、ループを検出したチャンクを repetition_penalty を
+    上げて再推論し、ループが解消すればその結果を採用する。
+
+    yield: チャンクごとの dict
+        {"index", "start", "end", "text", "language", "time_stamps",
+         "loop_detected", "loop_retried"}
+    time_stamps は元音声の時間軸に補正済みの (start, end, text) タプル列。
+    """
+    sizer = BatchSizer(model, batch_size)
+    ramp = first_batch_size
+    retry_size = None
+
+    batch_start = 0
+    while batch_start < len(spans):
+        # 次のバッチ候補の最長チャンクからサイズを決める
+        upcoming = spans[batch_start:batch_start + MAX_AUTO_BATCH_SIZE]
+        longest = max(e - s for s, e in upcoming) / sr
+        current_batch = retry_size or sizer.suggest(
+            longest, calculate_recommended_tokens(longest, language or "auto")
+        )
+        if ramp:
+            current_batch = min(current_batch, ramp)
+        batch_spans = spans[batch_start:batch_start + current_batch]
+        n = len(batch_spans)
+        longest = max(e - s for s, e in batch_spans) / sr
+        max_new_tokens = None
+        if adaptive_tokens:
+            max_new_tokens = adaptive_max_tokens(model, longest, language)
+
+        batch_timer = time.perf_counter()
+        try:
+            results = transcribe_batch(
+                model,
+                [(wav_array[s:e], sr) for s, e in batch_spans],
+                language=language,
+                context=context,
+                return_timestamps=return_timestamps,
+                offsets=[s / sr for s, _ in batch_spans],
+                max_new_tokens=max_new_tokens,
+                loop_guard=loop_guard,
+                metrics=metrics,
+            )
+
+            looped = [i for i, r in enumerate(results) if r["loop_detected"]]
+            for i in looped:
+                results[i]["loop_retried"] = False
+            if looped:
+                print(f"   🔁 繰り返しループ検出: {len(looped)} チャンク")
+            if looped and loop_retry:
+                retry_results = transcribe_batch(
+                    model,
+                    [(wav_array[batch_spans[i][0]:batch_spans[i][1]], sr) for i in looped],
+                    language=language,
+                    context=context,
+                    return_timestamps=return_timestamps,
+                    offsets=[batch_spans[i][0] / sr for i in looped],
+                    max_new_tokens=max_new_tokens,
+                    loop_guard=True,
+                    generate_kwargs=LOOP_RETRY_KWARGS,
+                    metrics=metrics,
+                )
+                for i, retry in zip(looped, retry_results):
+                    if not retry["loop_detected"]:
+                        results[i] = {**retry, "loop_detected": True}
+                    results[i]["loop_retried"] = True
+        except RuntimeError as e:
+            if not is_oom_error(e) or n == 1:
+                raise
+            retry_size = sizer.record_oom(n, longest)
+            mm.soft_empty_cache()
+            if metrics is not None:
+                metrics.add("oom_retries", 1)
+            print(f"   💥 メモリ不足 (バッチ {n}) → バッチ {retry_size} で再試行")
+            continue
+
+        retry_size = None
+        sizer.record_success(
+            n, longest, sum(e - s for s, e in batch_spans) / sr,
+            time.perf_counter() - batch_timer,
+        )
+
+        for offset, ((s, e), result) in enumerate(zip(batch_spans, results)):
+            yield {
+                "index": batch_start + offset,
+                "start": s / sr,
+                "end": e / sr,
+                "loop_retried": False,
+                **result,
+            }
+
+        batch_start += n
+        print(f"   ⏳ チャンク {batch_start}/{len(spans)} 完了 (バッチ {n})")
+        if ramp:
+            ramp *= 2
+
+
+def probe_language(model, wav_array, sr, spans, probe_seconds: float = LANGUAGE_PROBE_SECONDS,
+                   context="", metrics=None, return_timestamps=False, loop_guard=True):
+    """
+    先頭チャンクの位置から短い区間だけを推論して言語を判定
+
+    戻り値: (language, chunk)
+        language: 判定できなければ None
+        chunk: 先頭チャンク spans[0] が probe_seconds 以内に収まる場合はそのチャンクを
+               ちょうど推論するので、その結果を iter_transcribe_chunks と同じ形式で返す
+               （本処理で同じ区間を推論し直さずに済む）。それ以外は None。
+    無音などで言語が得られない場合は続きの区間で再試行する（最大 LANGUAGE_PROBE_ATTEMPTS 回）。
+    判定した言語を以降のチャンクに指定すると、チャンクごとの言語識別が不要になり、
+    言語別のトークン予算も使えるうえ、途中で言語判定が揺れることもない。
+    """
+    probe = max(1, int(probe_seconds * sr))
+    if metrics is None:
+        metrics = ASRMetrics()
+
+    with metrics.stage("language_probe"):
+        start = spans[0][0]
+        for attempt in range(LANGUAGE_PROBE_ATTEMPTS):
+            if start >= len(wav_array):
+                break
+            whole = attempt == 0 and spans[0][1] - spans[0][0] <= probe
+            end = spans[0][1] if whole else min(len(wav_array), start + probe)
+            result = transcribe_batch(
+                model, [(wav_array[start:end], sr)],
+                context=context,
+                return_timestamps=return_timestamps and whole,
+                offsets=[start / sr],
+                max_new_tokens=adaptive_max_tokens(model, (end - start) / sr),
+                loop_guard=loop_guard or not whole,
+                metrics=metrics if whole else None,
+            )[0]
+            # 複数言語が返る場合（"Chinese,English"）は先頭を採用
+            detected = (result["language"] or "").split(",")[0].strip()
+            if detected in SUPPORTED_LANGUAGES and detected != "auto":
+                metrics.add("language_probes", attempt + 1)
+                chunk = None
+                if whole:
+                    chunk = {
+                        "index": 0,
+                        "start": start / sr,
+                        "end": end / sr,
+                        "loop_retried": False,
+                        **result,
+                        "language": detected,
+                    }
+                return detected, chunk
+            start = end
+
+    metrics.add("language_probes", LANGUAGE_PROBE_ATTEMPTS)
+    return None, None
+
+
+def transcript_cache_key(model, audio_hash: str, **params) -> str:
+    """
+    TranscriptCache のキー（音声ハッシュ + モデル設定 + 推論パラメータ params）
+
+    Transcribe / Transcribe File / Batch Transcribe で共通。
+    """
+    config = getattr(model, "rogoai_config", {})
+    return TranscriptCache.make_key(
+        audio_hash,
+        model_path=config.get("model_path", ""),
+        precision=config.get("precision", ""),
+        # 実装ごとに数値誤差が異なり、貪欲デコードの結果が変わりうる
+        attention=config.get("attention", ""),
+        forced_aligner=config.get("forced_aligner", ""),
+        # 上限が低いと途中で打ち切られた結果になるため、上限ごとに別キャッシュ
+        max_new_tokens=config.get("max_new_tokens"),
+        **params,
+    )
+
+
+def plan_chunks(wav_array, sr, chunk_mode="vad", max_chunk_seconds=30.0,
+                skip_non_speech=False, silence_threshold_db=SILENCE_THRESHOLD_DB,
+                metrics=None, window_overlap_seconds=WINDOW_OVERLAP_SECONDS):
+    """
+    推論するチャンク (start_sample, end_sample) のリストを決める
+
+    chunk_mode="window" では max_chunk_seconds 長・window_overlap_seconds 重なりの
+    固定ウィンドウに分割する（結果は merge_window_chunks で結合する）。
+    skip_non_speech=True の場合、無音・ノイズ区間を除いた音声区間だけを残す。
+    チャンクは元音声上のサンプル位置のままなので、タイムスタンプは元の時間軸で返る。
+    """
+    if metrics is None:
+        metrics = ASRMetrics()
+
+    regions = None
+    if skip_non_speech:
+        with metrics.stage("non_speech_skip"):
+            regions = speech_regions(wav_array, sr, threshold_db=silence_threshold_db)
+        kept = sum(e - s for s, e in regions) / sr
+        skipped = len(wav_array) / sr - kept
+        metrics.add("skipped_seconds", round(skipped, 3))
+        print(f"🔇 非音声スキップ: {skipped:.1f}秒 を除外 "
+              f"({len(regions)} 区間 / 残り {kept:.1f}秒)")
+
+    if chunk_mode == "vad":
+        with metrics.stage("vad"):
+            spans = split_on_silence(
+                wav_array, sr, max_chunk_seconds=max_chunk_seconds, regions=regions
+            )
+        print(f"✂️  VADチャンク分割: {len(spans)} チャンク (最大 {max_chunk_seconds:.0f}秒)")
+    elif chunk_mode == "window":
+        spans = fixed_windows(
+            len(wav_array), sr, max_chunk_seconds, window_overlap_seconds, regions=regions
+        )
+        print(f"🪟 ウィンドウ分割: {len(spans)} ウィンドウ "
+              f"({max_chunk_seconds:.0f}秒 / 重なり {window_overlap_seconds:.1f}秒)")
+    elif regions is not None:
+        spans = regions
+    else:
+        spans = [(0, len(wav_array))]
+    return spans
+
+
+def transcribe_chunks(model, wav_array, sr, spans, language=None, context="",
+                      return_timestamps=False, batch_size=None, adaptive_tokens=False,
+                      loop_guard=False, loop_retry=False, metrics=None):
+    """
+    チャンク列を全てバッチ推論し、チャンクごとの dict のリストを返す
+    """
+    return list(iter_transcribe_chunks(
+        model, wav_array, sr, spans,
+        language=language,
+        context=context,
+        return_timestamps=return_timestamps,
+        batch_size=batch_size,
+        adaptive_tokens=adaptive_tokens,
+        loop_guard=loop_guard,
+        loop_retry=loop_retry,
+        metrics=metrics,
+    ))
+
+
+def stream_transcribe(model, audio, language="auto", context="",
+                      return_timestamps=False, max_chunk_seconds=30.0,
+                      batch_size=None, language_probe_seconds=LANGUAGE_PROBE_SECONDS,
+                      skip_non_speech=False):
+    """
+    ストリーミング文字起こし（Pythonから直接使う用）
+
+    VADで分割したチャンクが完了するたびに
+    (chunk_index, start_s, end_s, text) を yield する。
+    最初のチャンクは単独で処理するため、長尺音声でもすぐに最初の結果が得られる。
+
+    使用例（SRTを逐次書き出し）:
+        for i, start, end, text in stream_transcribe(model, audio, "Japanese"):
+            srt.write(f"{i + 1}\n{fmt(start)} --> {fmt(end)}\n{text}\n\n")
+    """
+    audio_data = prepare_model_audio(audio)
+    if audio_data is None:
+        return
+
+    wav_array, sr = audio_data
+    spans = plan_chunks(
+        wav_array, sr, "vad", max_chunk_seconds, skip_non_speech=skip_non_speech
+    )
+    if not spans:
+        return
+    lang = None if language == "auto" else language
+    ctx = context if context and context.strip() else ""
+
+    load_model_to_device(model)
+    first = 0
+    if lang is None and language_probe_seconds > 0:
+        lang, probe_chunk = probe_language(
+            model, wav_array, sr, spans, language_probe_seconds, ctx,
+            return_timestamps=return_timestamps,
+        )
+        # 先頭チャンクを丸ごと判定に使った場合は、その結果を最初の出力にする
+        if probe_chunk is not None:
+            yield (0, probe_chunk["start"], probe_chunk["end"], probe_chunk["text"])
+            first = 1
+    for chunk in iter_transcribe_chunks(
+        model, wav_array, sr, spans[first:],
+        language=lang,
+        context=ctx,
+        return_timestamps=return_timestamps,
+        batch_size=batch_size,
+        first_batch_size=1,
+        adaptive_tokens=True,
+        loop_guard=True,
+    ):
+        yield (chunk["index"] + first, chunk["start"], chunk["end"], chunk["text"])
+
+
+def _majority_language(chunks) -> str:
+    """チャンク結果から最も多い検出言語を返す"""
+    counts = {}
+    for chunk in chunks:
+        if chunk["language"]:
+            counts[chunk["language"]] = counts.get(chunk["language"], 0) + 1
+    return max(counts, key=counts.get) if counts else ""
+
+
 class RogoAI_Qwen3ASRLoader:
     """
     RogoAI Qwen3-ASR Model Loader (Long Audio Edition)
@@ -175,6 +1346,13 @@ class RogoAI_Qwen3ASRLoader:
             "optional": {
                 "forced_aligner": (list(QWEN3_FORCED_ALIGNERS.keys()), {"default": "None"}),
                 "local_model_path": ("STRING", {"default": "", "multiline": False}),
+                "model_cache_gb": ("FLOAT", {
+                    "default": DEFAULT_MODEL_CACHE_GB,
+                    "min": 0.0,
+                    "max": 256.0,
+                    "step": 0.5,
+                    "tooltip": "読み込み済みモデルを保持するキャッシュ容量（GB）。0でキャッシュ無効\n容量を超えると最も古く使われたモデルから破棄"
+                }),
             }
         }
 
@@ -184,8 +1362,11 @@ class RogoAI_Qwen3ASRLoader:
     CATEGORY = "RogoAI/ASR"
 
     def load_model(self, repo_id, source, precision, attention, max_new_tokens=8192, 
-                   forced_aligner="None", local_model_path=""):
+                   forced_aligner="None", local_model_path="",
+                   model_cache_gb=DEFAULT_MODEL_CACHE_GB):
         device = mm.get_torch_device()
+        # 重みはオフロードデバイスに読み込み、推論時に model_management 経由でGPUへ移す
+        offload_device = mm.unet_offload_device()
         
         dtype = torch.float32
         if precision == "bf16":
@@ -208,10 +1389,17 @@ class RogoAI_Qwen3ASRLoader:
             else:
                 model_path = download_model_to_comfyui(repo_id, source)
         
+        # キャッシュ確認
+        cache_key = (model_path, str(dtype), attention, forced_aligner or "None", max_new_tokens)
+        cached = get_cached_model(cache_key)
+        if cached is not None:
+            print(f"[RogoAI Qwen3-ASR] ♻️  キャッシュ済みモデルを使用: {model_path}")
+            return (cached,)
+        
         # RogoAI改良: max_new_tokens を大幅に拡張
         model_kwargs = dict(
             dtype=dtype,
-            device_map=str(device),
+            device_map=str(offload_device),
             max_inference_batch_size=32,
             max_new_tokens=max_new_tokens,  # 256 → ユーザー指定値 (デフォルト8192)
         )
@@ -221,24 +1409,83 @@ class RogoAI_Qwen3ASRLoader:
         if attention != "auto":
             model_kwargs["attn_implementation"] = attention
             
+        # Forced Aligner は設定だけ保持し、最初のタイムスタンプ要求時に読み込む
+        aligner_spec = None
         if forced_aligner and forced_aligner != "None":
-            aligner_local = get_local_model_path(forced_aligner)
-            if not (os.path.exists(aligner_local) and os.listdir(aligner_local)):
-                aligner_local = download_model_to_comfyui(forced_aligner, source)
-            model_kwargs["forced_aligner"] = aligner_local
-            model_kwargs["forced_aligner_kwargs"] = dict(
-                dtype=dtype,
-                device_map=str(device),
-            )
+            aligner_spec = {
+                "repo_id": forced_aligner,
+                "source": source,
+                "kwargs": dict(dtype=dtype, device_map=str(offload_device)),
+            }
             if attention != "auto":
-                model_kwargs["forced_aligner_kwargs"]["attn_implementation"] = attention
+                aligner_spec["kwargs"]["attn_implementation"] = attention
+            print(f"[RogoAI Qwen3-ASR] Forced Aligner: {forced_aligner} (タイムスタンプ要求時に読み込み)")
         
         print(f"[RogoAI Qwen3-ASR] Loading model from {model_path}...")
         model = Qwen3ASRModel.from_pretrained(model_path, **model_kwargs)
+        model.rogoai_aligner_spec = aligner_spec
+        model.rogoai_config = {
+            "model_path": model_path,
+            "precision": precision,
+            "attention": attention,
+            "forced_aligner": forced_aligner or "None",
+            "max_new_tokens": max_new_tokens,
+        }
+        register_model_management(model)
+        
+        cache_model(cache_key, model, int(model_cache_gb * 1024**3))
         
         return (model,)
 
 
+class RogoAI_Qwen3ASRUnload:
+    """
+    RogoAI Qwen3-ASR Unload
+    
+    モデルキャッシュを明示的に解放するノード
+    （共有ComfyUIインスタンスでVRAMを空けたい時に使用）
+    aligner_only=True の場合は Forced Aligner だけを解放し、ASR本体は残す
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "unload_all": ("BOOLEAN", {"default": True}),
+            },
+            "optional": {
+                "model": ("QWEN3_ASR_MODEL",),
+                "aligner_only": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Forced Aligner だけを解放（次のタイムスタンプ要求時に再読み込み）"
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("summary",)
+    FUNCTION = "unload"
+    CATEGORY = "RogoAI/ASR"
+    OUTPUT_NODE = True
+
+    def unload(self, unload_all=True, model=None, aligner_only=False):
+        if aligner_only:
+            targets = [cached for cached, _ in _MODEL_CACHE.values()] if unload_all else [model]
+            count = sum(1 for target in targets if target is not None and unload_forced_aligner(target))
+            summary = f"🧹 {count} 件の Forced Aligner を解放しました"
+        elif unload_all:
+            count = clear_model_cache()
+            summary = f"🧹 {count} 件のモデルをキャッシュから破棄しました"
+        else:
+            keys = [key for key, (cached, _) in _MODEL_CACHE.items() if cached is model]
+            for key in keys:
+                unload_cached_model(key)
+            summary = f"🧹 {len(keys)} 件のモデルをキャッシュから破棄しました"
+        
+        print(f"[RogoAI Qwen3-ASR] {summary}")
+        return (summary,)
+
+
 class RogoAI_Qwen3ASRTranscribe:
     """
     RogoAI Qwen3-ASR Transcribe (Long Audio Edition)
@@ -248,6 +1495,16 @@ class RogoAI_Qwen3ASRTranscribe:
     - デバッグモード (詳細情報出力)
     - 推奨トークン数の自動計算
     - エラーハンドリング強化
+    - VADチャンク分割 + バッチ推論 (chunk_mode="vad")
+    - 文字起こし結果のディスクキャッシュ (use_cache)
+    - チャンクごとの max_new_tokens 自動調整 (adaptive_tokens)
+    - 繰り返しループ検出・早期停止・再試行 (loop_guard / loop_retry)
+    - ステージ別メトリクス出力 (metrics_json / metrics_file)
+    - 言語の先頭判定・固定 (language_probe_seconds)
+    - 無音・ノイズ区間の除外 (skip_non_speech / silence_threshold_db)
+    - 重なり付き固定長ウィンドウ分割 (chunk_mode="window" / window_overlap_seconds)
+    - 中断ジョブの再開 (resume)
+    - バッチサイズの自動決定・OOM時の自動縮小 (batch_size=0)
     """
     
     @classmethod
@@ -269,25 +1526,137 @@ class RogoAI_Qwen3ASRTranscribe:
                     "default": False,
                     "tooltip": "デバッグ情報を表示（トークン消費量、処理時間など）"
                 }),
+                "chunk_mode": (CHUNK_MODES, {
+                    "default": "none",
+                    "tooltip": "none: 音声全体を1リクエストで処理\nvad: 無音位置で分割してバッチ推論（長尺音声向け）\nwindow: 固定長ウィンドウを重ねて分割（無音の少ない音声向け、重なり部分は自動で重複除去）"
+                }),
+                "max_chunk_seconds": ("FLOAT", {
+                    "default": 30.0,
+                    "min": 5.0,
+                    "max": 1200.0,
+                    "step": 5.0,
+                    "tooltip": "vadモードでの1チャンクの最大長、windowモードでのウィンドウ長（秒）。タイムスタンプ使用時は180秒以下推奨"
+                }),
+                "offload_after": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "文字起こし後にモデルをCPUへ退避してVRAMを解放（次回実行時に自動で再読み込み）"
+                }),
+                "use_cache": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "同じ音声・同じ設定の結果をディスクキャッシュから再利用（ComfyUI/output/rogoai_cache）"
+                }),
+                "adaptive_tokens": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "音声長と言語からチャンクごとに max_new_tokens を自動設定（Loaderの値が上限）\n短い音声の無駄な確保や暴走生成を防止"
+                }),
+                "loop_guard": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "同じフレーズの繰り返し（ハルシネーションループ）を検出したら生成を停止し、繰り返し部分を除去"
+                }),
+                "loop_retry": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "ループを検出したチャンクを repetition_penalty を上げて再推論"
+                }),
+                "metrics_file": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "tooltip": "指定するとメトリクスをJSON Lines形式で追記（空欄で無効）"
+                }),
+                "language_probe_seconds": ("FLOAT", {
+                    "default": LANGUAGE_PROBE_SECONDS,
+                    "min": 0.0,
+                    "max": 120.0,
+                    "step": 5.0,
+                    "tooltip": "language=auto の時、先頭のこの秒数だけで言語を判定し全体をその言語で処理\n0でチャンクごとに判定（多言語混在の音声向け）"
+                }),
+                "skip_non_speech": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "推論前に無音・ノイズ区間（1秒以上）を除外\nタイムスタンプは元の音声の時間のまま"
+                }),
+                "silence_threshold_db": ("FLOAT", {
+                    "default": SILENCE_THRESHOLD_DB,
+                    "min": -90.0,
+                    "max": -10.0,
+                    "step": 1.0,
+                    "tooltip": "これより小さいエネルギー(dBFS)のフレームを無音とみなす"
+                }),
+                "window_overlap_seconds": ("FLOAT", {
+                    "default": WINDOW_OVERLAP_SECONDS,
+                    "min": 0.0,
+                    "max": 30.0,
+                    "step": 0.5,
+                    "tooltip": "windowモードでの隣接ウィンドウの重なり（秒）。境界で切れた単語を重なり部分で補完"
+                }),
+                "batch_size": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 256,
+                    "tooltip": "1回の推論でまとめるチャンク数\n0: 空きメモリとチャンク長から自動決定（OOM時は半減して再試行、CPUはスループットで調整）"
+                }),
+                "resume": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "チャンクの結果を完了ごとにジョブファイルへ保存（ComfyUI/output/rogoai_cache/jobs）\n中断後に同じ音声・同じ設定で再実行すると、完了済みチャンクをスキップして再開"
+                }),
             }
         }
 
-    RETURN_TYPES = ("STRING", "STRING", "STRING")
-    RETURN_NAMES = ("text", "language", "timestamps")
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING", "WORD_TIMESTAMPS")
+    RETURN_NAMES = ("text", "language", "timestamps", "metrics_json", "chunks_json", "word_timestamps")
     FUNCTION = "transcribe"
     CATEGORY = "RogoAI/ASR"
 
     def transcribe(self, model, audio, language="auto", context="", 
-                   return_timestamps=False, debug_mode=False):
-        import time
+                   return_timestamps=False, debug_mode=False,
+                   chunk_mode="none", max_chunk_seconds=30.0, offload_after=False,
+                   use_cache=True, adaptive_tokens=True, loop_guard=True, loop_retry=True,
+                   metrics_file="", language_probe_seconds=LANGUAGE_PROBE_SECONDS,
+                   skip_non_speech=False, silence_threshold_db=SILENCE_THRESHOLD_DB,
+                   window_overlap_seconds=WINDOW_OVERLAP_SECONDS, resume=False, batch_size=0):
         start_time = time.time()
+        metrics = ASRMetrics(reset_peak=True)
         
-        # 音声データ読み込み
-        audio_data = load_audio_input(audio)
+        # 音声データ読み込み（16kHz 以外はリサンプリング）
+        audio_data = prepare_model_audio(audio, metrics)
         if audio_data is None:
-            return ("", "", "")
+            return ("", "", "", "{}", "[]", WordTimestamps())
         
         wav_array, sr = audio_data
+        return self._transcribe_audio(
+            model, wav_array, sr, lambda: hash_waveform(wav_array, sr), metrics, start_time,
+            language=language,
+            context=context,
+            return_timestamps=return_timestamps,
+            debug_mode=debug_mode,
+            chunk_mode=chunk_mode,
+            max_chunk_seconds=max_chunk_seconds,
+            offload_after=offload_after,
+            use_cache=use_cache,
+            adaptive_tokens=adaptive_tokens,
+            loop_guard=loop_guard,
+            loop_retry=loop_retry,
+            metrics_file=metrics_file,
+            language_probe_seconds=language_probe_seconds,
+            skip_non_speech=skip_non_speech,
+            silence_threshold_db=silence_threshold_db,
+            window_overlap_seconds=window_overlap_seconds,
+            resume=resume,
+            batch_size=batch_size,
+        )
+
+    def _transcribe_audio(self, model, wav_array, sr, audio_hash, metrics, start_time,
+                          language="auto", context="", return_timestamps=False,
+                          debug_mode=False, chunk_mode="none", max_chunk_seconds=30.0,
+                          offload_after=False, use_cache=True, adaptive_tokens=True,
+                          loop_guard=True, loop_retry=True, metrics_file="",
+                          language_probe_seconds=LANGUAGE_PROBE_SECONDS,
+                          skip_non_speech=False, silence_threshold_db=SILENCE_THRESHOLD_DB,
+                          window_overlap_seconds=WINDOW_OVERLAP_SECONDS, resume=False,
+                          batch_size=0):
+        """
+        16kHz モノラル波形の文字起こし本体（キャッシュ確認 → 推論 → 結合 → メトリクス）
+
+        audio_hash はキャッシュキー用のハッシュを返す関数（キャッシュ・再開とも無効時は呼ばれない）
+        """
         audio_duration = len(wav_array) / sr
         
         # 言語設定
@@ -309,7 +1678,7 @@ class RogoAI_Qwen3ASRTranscribe:
         
         # モデルの設定を取得
         try:
-            model_max_tokens = model.model.generation_config.max_new_tokens
+            model_max_tokens = get_model_max_tokens(model)
             print(f"⚙️  現在の max_new_tokens: {model_max_tokens:,}")
             
             if model_max_tokens < recommended_tokens:
@@ -325,73 +1694,111 @@ class RogoAI_Qwen3ASRTranscribe:
         # pbar = ProgressBar(1)
         # pbar.update_absolute(0, 1, ("文字起こし中...", f"{audio_duration:.1f}秒の音声を処理"))
         
-        print("⏳ 文字起こし処理中... (プログレスバーは一時的に無効化)")
-        
-        # 文字起こし実行
-        try:
-            results = model.transcribe(
-                audio=audio_data,
-                language=lang,
-                context=ctx if ctx else None,
-                return_time_stamps=return_timestamps,
+        # キャッシュ確認
+        cache = None
+        cache_key = None
+        cached = None
+        if use_cache or resume:
+            cache_start = time.perf_counter()
+            cache_key = transcript_cache_key(
+                model, audio_hash(),
+                language=language,
+                context=ctx,
+                return_timestamps=return_timestamps,
+                chunk_mode=chunk_mode,
+                max_chunk_seconds=max_chunk_seconds if chunk_mode != "none" else None,
+                adaptive_tokens=adaptive_tokens,
+                loop_guard=loop_guard,
+                loop_retry=loop_retry and loop_guard,
+                language_probe_seconds=language_probe_seconds if language == "auto" else None,
+                skip_non_speech=skip_non_speech,
+                silence_threshold_db=silence_threshold_db if skip_non_speech else None,
+                window_overlap_seconds=window_overlap_seconds if chunk_mode == "window" else None,
             )
-        except Exception as e:
-            print(f"❌ エラー: {str(e)}")
-            raise
+            if use_cache:
+                cache = TranscriptCache()
+                cached = cache.get(cache_key)
+            metrics.add_time("cache_lookup", time.perf_counter() - cache_start)
         
-        # 処理完了
-        # pbar.update_absolute(1, 1, ("完了", f"{audio_duration:.1f}秒処理完了"))
-        print("✅ 文字起こし処理完了")
-        
-        # デバッグモード
-        if debug_mode:
-            print("=" * 80)
-            print("🔍 RogoAI デバッグ情報")
-            print("=" * 80)
-            print(f"📊 Results:")
-            print(f"   - type: {type(results)}")
-            print(f"   - 件数: {len(results)}")
+        if cached is not None:
+            print("♻️  キャッシュヒット: 保存済みの文字起こし結果を使用")
+            text = cached["text"]
+            detected_lang = cached["language"]
+            time_stamps = [tuple(ts) for ts in cached["time_stamps"]]
+            num_chunks = cached.get("num_chunks", 1)
+            num_loops = cached.get("num_loops", 0)
+            chunk_list = cached.get("chunks") or [{
+                "index": 0, "start": 0.0, "end": audio_duration,
+                "text": text, "language": detected_lang,
+            }]
+        else:
+            # 同じキーのジョブファイルがあれば完了済みチャンクを再利用
+            checkpoint = JobCheckpoint(cache_key) if resume else None
+            chunks = self._run_transcription(
+                model, wav_array, sr, lang, ctx, return_timestamps,
+                chunk_mode, max_chunk_seconds, offload_after, debug_mode,
+                adaptive_tokens=adaptive_tokens,
+                loop_guard=loop_guard,
+                loop_retry=loop_retry,
+                metrics=metrics,
+                language_probe_seconds=language_probe_seconds,
+                skip_non_speech=skip_non_speech,
+                silence_threshold_db=silence_threshold_db,
+                window_overlap_seconds=window_overlap_seconds,
+                checkpoint=checkpoint,
+                batch_size=batch_size,
+            )
             
-            for i, result in enumerate(results):
-                print(f"\n🔍 Result [{i}]:")
-                if hasattr(result, 'text'):
-                    text_len = len(result.text)
-                    # トークン数の推定（日本語: 1トークン ≈ 1.5文字）
-                    estimated_tokens = int(text_len / 1.5)
-                    print(f"   - 文字数: {text_len:,} chars")
-                    print(f"   - 推定トークン数: {estimated_tokens:,}")
-                    print(f"   - プレビュー: '{result.text[:100]}...'")
-                    if text_len > 100:
-                        print(f"   - 末尾: '...{result.text[-100:]}'")
-                
-                if hasattr(result, 'language'):
-                    print(f"   - 検出言語: {result.language}")
-                
-                if hasattr(result, 'time_stamps') and result.time_stamps:
-                    print(f"   - タイムスタンプ: {len(result.time_stamps)} セグメント")
-                    if len(result.time_stamps) > 0:
-                        first_ts = result.time_stamps[0]
-                        last_ts = result.time_stamps[-1]
-                        print(f"   - 開始: {first_ts.start_time:.2f}秒")
-                        print(f"   - 終了: {last_ts.end_time:.2f}秒")
+            # 結果の結合
+            with metrics.stage("postprocess"):
+                detected_lang = _majority_language(chunks) or (lang or "")
+                text = join_chunk_texts([c["text"] for c in chunks], detected_lang)
+                time_stamps = [ts for c in chunks for ts in c["time_stamps"]]
+            num_chunks = len(chunks)
+            num_loops = sum(1 for c in chunks if c["loop_detected"])
+            # Align ノードで後からタイムスタンプを付けられるよう、チャンク単位の結果も返す
+            chunk_list = [
+                {
+                    "index": c["index"],
+                    "start": c["start"],
+                    "end": c["end"],
+                    "text": c["text"],
+                    "language": c["language"] or detected_lang,
+                }
+                for c in chunks
+            ]
             
-            print("=" * 80)
-        
-        # 結果取得
-        result = results[0]
-        text = result.text
-        detected_lang = result.language or ""
+            if cache is not None:
+                cache.put(cache_key, {
+                    "text": text,
+                    "language": detected_lang,
+                    "time_stamps": time_stamps,
+                    "num_chunks": num_chunks,
+                    "num_loops": num_loops,
+                    "chunks": chunk_list,
+                })
+            if checkpoint is not None:
+                checkpoint.discard()
         
         timestamps_str = ""
-        if return_timestamps and result.time_stamps:
-            ts_lines = []
-            for ts in result.time_stamps:
-                ts_lines.append(f"{ts.start_time:.2f}-{ts.end_time:.2f}: {ts.text}")
-            timestamps_str = "\n".join(ts_lines)
+        if return_timestamps and time_stamps:
+            timestamps_str = format_timestamps(time_stamps)
         
         # 処理時間
         elapsed_time = time.time() - start_time
         
+        # メトリクス
+        metrics_dict = metrics.to_dict(
+            audio_duration,
+            cache="hit" if cached is not None else ("miss" if use_cache else "disabled"),
+            chunks=num_chunks,
+            language=detected_lang,
+            chunk_mode=chunk_mode,
+        )
+        metrics_json = json.dumps(metrics_dict, ensure_ascii=False, indent=2)
+        if metrics_file and metrics_file.strip():
+            ASRMetrics.append_to_file(metrics_file.strip(), metrics_dict)
+        
         # 結果サマリー
         print("=" * 80)
         print("✅ RogoAI Qwen3-ASR 処理完了")
@@ -400,24 +1807,213 @@ class RogoAI_Qwen3ASRTranscribe:
         print(f"   - 音声長: {audio_duration:.1f}秒 ({audio_duration/60:.1f}分)")
         print(f"   - 文字数: {len(text):,} chars")
         print(f"   - 検出言語: {detected_lang}")
+        print(f"   - チャンク数: {num_chunks}")
+        if loop_guard:
+            print(f"   - ループ検出: {num_loops} チャンク")
+        if use_cache:
+            print(f"   - キャッシュ: {'HIT' if cached is not None else 'MISS'}")
         print(f"   - 処理時間: {elapsed_time:.1f}秒")
         print(f"   - 処理速度: {audio_duration/elapsed_time:.1f}x リアルタイム")
         
         if return_timestamps:
-            print(f"   - タイムスタンプ: {len(result.time_stamps) if result.time_stamps else 0} セグメント")
+            print(f"   - タイムスタンプ: {len(time_stamps)} セグメント")
+        
+        tokens = metrics.counters.get("generated_tokens", 0)
+        if tokens:
+            print(f"   - 生成トークン数: {tokens:,} ({metrics_dict['tokens_per_second']} tokens/秒)")
+        print(f"⏱️  ステージ別処理時間:")
+        for name, seconds in metrics_dict["stages"].items():
+            print(f"   - {name}: {seconds:.2f}秒")
+        if metrics_dict["peak_rss_mb"] is not None:
+            print(f"   - ピークRSS: {metrics_dict['peak_rss_mb']:,.0f} MB "
+                  f"(開始時 {metrics_dict['start_rss_mb']:,.0f} MB)")
+        if metrics_dict["peak_device_mb"] is not None:
+            print(f"   - ピークVRAM: {metrics_dict['peak_device_mb']:,.0f} MB")
         
         print("=" * 80)
         
-        return (text, detected_lang, timestamps_str)
+        chunks_json = json.dumps(chunk_list, ensure_ascii=False)
+        
+        return (
+            text, detected_lang, timestamps_str, metrics_json, chunks_json,
+            WordTimestamps.from_tuples(time_stamps if return_timestamps else []),
+        )
+
+    def _run_transcription(self, model, wav_array, sr, lang, ctx, return_timestamps,
+                           chunk_mode, max_chunk_seconds, offload_after, debug_mode,
+                           adaptive_tokens=False, loop_guard=False, loop_retry=False,
+                           metrics=None, language_probe_seconds=0.0,
+                           skip_non_speech=False, silence_threshold_db=SILENCE_THRESHOLD_DB,
+                           window_overlap_seconds=WINDOW_OVERLAP_SECONDS, checkpoint=None,
+                           batch_size=0):
+        """
+        チャンク分割 → バッチ推論を行い、チャンクごとの結果リストを返す
+
+        checkpoint (JobCheckpoint) を渡すと、判定言語と完了したチャンクを逐次保存し、
+        保存済みのチャンクは推論せずに再利用する。
+        """
+        if metrics is None:
+            metrics = ASRMetrics()
+        
+        # モデルを推論デバイスへ読み込み（ComfyUIのメモリ管理経由）
+        load_model_to_device(model)
+        
+        # チャンク分割（非音声区間の除外を含む）
+        spans = plan_chunks(
+            wav_array, sr, chunk_mode, max_chunk_seconds,
+            skip_non_speech=skip_non_speech,
+            silence_threshold_db=silence_threshold_db,
+            metrics=metrics,
+            window_overlap_seconds=window_overlap_seconds,
+        )
+        
+        # 1チャンクで終わるジョブは途中から再開する部分がないため、ジョブファイルを作らない
+        if checkpoint is not None and len(spans) <= 1:
+            checkpoint = None
+        
+        # 中断ジョブの再開: 保存済みの言語・チャンクを読み込み
+        done = {}
+        if checkpoint is not None:
+            saved_lang, done = checkpoint.load()
+            planned = set(spans)
+            done = {span: chunk for span, chunk in done.items() if span in planned}
+            if done:
+                print(f"♻️  ジョブ再開: {len(done)}/{len(spans)} チャンク完了済み")
+                metrics.add("resumed_chunks", len(done))
+            if lang is None and language_probe_seconds > 0 and saved_lang:
+                lang = saved_lang
+                print(f"🌐 言語判定 (保存済み): {lang}")
+        
+        # 言語自動判定: 先頭の短い区間だけで判定し、以降は固定
+        # chunk_mode="none" は1リクエストで全体を処理する（途中で言語が揺れない）ため判定しない
+        if lang is None and language_probe_seconds > 0 and spans and chunk_mode != "none":
+            lang, probe_chunk = probe_language(
+                model, wav_array, sr, spans, language_probe_seconds, ctx, metrics,
+                return_timestamps=return_timestamps,
+                loop_guard=loop_guard,
+            )
+            if lang:
+                print(f"🌐 言語判定 (先頭 {language_probe_seconds:.0f}秒): {lang} → 全チャンクをこの言語で処理")
+                print(f"💡 推奨 max_new_tokens ({lang}): "
+                      f"{calculate_recommended_tokens(len(wav_array) / sr, lang):,}")
+            else:
+                print("🌐 言語判定できませんでした → チャンクごとに自動判定")
+            if lang and checkpoint is not None:
+                checkpoint.save_language(lang)
+            
+            # 先頭チャンクを丸ごと判定に使った場合は、その結果をそのまま採用
+            # （ループ検出時に再試行する設定なら、通常の処理に任せる）
+            if (probe_chunk is not None and spans[0] not in done
+                    and not (probe_chunk["loop_detected"] and loop_retry and loop_guard)):
+                done[spans[0]] = probe_chunk
+                metrics.add("probe_reused_chunks", 1)
+                print("♻️  言語判定の結果を先頭チャンクの文字起こしとして再利用")
+                if checkpoint is not None:
+                    checkpoint.save_chunk(spans[0], probe_chunk)
+        
+        if adaptive_tokens:
+            longest = max(e - s for s, e in spans) / sr if spans else 0.0
+            print(f"📏 max_new_tokens 自動調整: 最長チャンク {longest:.1f}秒 → {adaptive_max_tokens(model, longest, lang):,}")
+        
+        print("⏳ 文字起こし処理中... (プログレスバーは一時的に無効化)")
+        
+        # 文字起こし実行（未完了のチャンクのみ）
+        todo = [i for i, span in enumerate(spans) if span not in done]
+        chunks = [{**done[span], "index": i} for i, span in enumerate(spans) if span in done]
+        try:
+            for chunk in iter_transcribe_chunks(
+                model, wav_array, sr, [spans[i] for i in todo],
+                language=lang,
+                context=ctx,
+                return_timestamps=return_timestamps,
+                batch_size=batch_size or None,
+                adaptive_tokens=adaptive_tokens,
+                loop_guard=loop_guard,
+                loop_retry=loop_retry and loop_guard,
+                metrics=metrics,
+            ):
+                chunk["index"] = todo[chunk["index"]]
+                if checkpoint is not None:
+                    checkpoint.save_chunk(spans[chunk["index"]], chunk)
+                chunks.append(chunk)
+            chunks.sort(key=lambda c: c["index"])
+        except Exception as e:
+            print(f"❌ エラー: {str(e)}")
+            raise
+        
+        # window モード: 隣接ウィンドウの重なり部分の重複を除去
+        if chunk_mode == "window":
+            with metrics.stage("overlap_merge"):
+                merged = merge_window_chunks(chunks, lang or "")
+            print(f"🧩 ウィンドウ境界の重複除去: {merged} 箇所")
+        
+        # 処理完了
+        # pbar.update_absolute(1, 1, ("完了", f"{audio_duration:.1f}秒処理完了"))
+        print("✅ 文字起こし処理完了")
+        
+        if offload_after:
+            offload_model(model)
+            print("💤 モデルをオフロードデバイスへ退避しました")
+        
+        # デバッグモード
+        if debug_mode:
+            print("=" * 80)
+            print("🔍 RogoAI デバッグ情報")
+            print("=" * 80)
+            print(f"📊 Results:")
+            print(f"   - 件数: {len(chunks)}")
+            
+            for chunk in chunks:
+                print(f"\n🔍 Result [{chunk['index']}] ({chunk['start']:.1f}秒 - {chunk['end']:.1f}秒):")
+                text_len = len(chunk["text"])
+                # トークン数の推定（日本語: 1トークン ≈ 1.5文字）
+                estimated_tokens = int(text_len / 1.5)
+                print(f"   - 文字数: {text_len:,} chars")
+                print(f"   - 推定トークン数: {estimated_tokens:,}")
+                print(f"   - プレビュー: '{chunk['text'][:100]}...'")
+                if text_len > 100:
+                    print(f"   - 末尾: '...{chunk['text'][-100:]}'")
+                
+                if chunk["language"]:
+                    print(f"   - 検出言語: {chunk['language']}")
+                
+                if chunk["loop_detected"]:
+                    status = "再試行済み" if chunk["loop_retried"] else "繰り返し部分を除去"
+                    print(f"   - 🔁 繰り返しループ検出 ({status})")
+                
+                if chunk["time_stamps"]:
+                    print(f"   - タイムスタンプ: {len(chunk['time_stamps'])} セグメント")
+                    print(f"   - 開始: {chunk['time_stamps'][0][0]:.2f}秒")
+                    print(f"   - 終了: {chunk['time_stamps'][-1][1]:.2f}秒")
+            
+            print("=" * 80)
+        
+        return chunks
+
+    def transcribe_stream(self, model, audio, language="auto", context="",
+                          return_timestamps=False, max_chunk_seconds=30.0):
+        """
+        transcribe のストリーミング版
+        チャンク完了ごとに (chunk_index, start_s, end_s, text) を yield する
+        """
+        yield from stream_transcribe(
+            model, audio,
+            language=language,
+            context=context,
+            return_timestamps=return_timestamps,
+            max_chunk_seconds=max_chunk_seconds,
+        )
 
 
 # ノード登録
 NODE_CLASS_MAPPINGS = {
     "RogoAI_Qwen3ASRLoader": RogoAI_Qwen3ASRLoader,
     "RogoAI_Qwen3ASRTranscribe": RogoAI_Qwen3ASRTranscribe,
+    "RogoAI_Qwen3ASRUnload": RogoAI_Qwen3ASRUnload,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "RogoAI_Qwen3ASRLoader": "RogoAI Qwen3-ASR Loader (Long Audio)",
     "RogoAI_Qwen3ASRTranscribe": "RogoAI Qwen3-ASR Transcribe (Long Audio)",
+    "RogoAI_Qwen3ASRUnload": "RogoAI Qwen3-ASR Unload 🧹",
 }
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""
+RogoAI Qwen3-ASR Align
+文字起こし済みのチャンクに後からタイムスタンプを付けるノード
+
+機能:
+- Transcribe ノードの chunks_json と音声を受け取り、Forced Aligner でまとめてアライメント
+- 文字起こしは return_timestamps=False で高速に行い、字幕が必要な音声だけ後から整列
+- Forced Aligner は最初の実行時に読み込み（Loader で forced_aligner の選択が必要）
+- 音声は AUDIO / ファイルパスのどちらでも入力可能
+"""
+
+import json
+import os
+import time
+
+from .asr_metrics import ASRMetrics
+from .qwen3_asr import SUPPORTED_LANGUAGES, align_batch, format_timestamps, prepare_model_audio
+from .qwen3_asr_file import open_audio_file
+from .word_timestamps import WordTimestamps
+
+
+class RogoAI_Qwen3ASRAlign:
+    """
+    チャンク単位のバッチ Forced Alignment
+
+    【特徴】
+    ・(音声チャンク, テキスト) の組を音声長順に並べてバッチ推論
+    ・各チャンクの開始時刻を加算し、元音声のタイムラインでタイムスタンプを出力
+    ・chunks_json に time_stamps を追加して返す
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "model": ("QWEN3_ASR_MODEL",),
+                "chunks_json": ("STRING", {"forceInput": True}),
+            },
+            "optional": {
+                "audio": ("AUDIO",),
+                "audio_file_path": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "tooltip": "AUDIO を接続しない場合に使用する音声ファイルのパス"
+                }),
+                "language": (SUPPORTED_LANGUAGES, {
+                    "default": "auto",
+                    "tooltip": "auto: 各チャンクの検出言語を使用"
+                }),
+                "batch_size": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 256,
+                    "tooltip": "1回のアライメントでまとめるチャンク数（0でモデルの max_inference_batch_size）"
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "WORD_TIMESTAMPS")
+    RETURN_NAMES = ("timestamps", "chunks_json", "word_timestamps")
+    FUNCTION = "align"
+    CATEGORY = "RogoAI/ASR"
+
+    def align(self, model, chunks_json, audio=None, audio_file_path="",
+              language="auto", batch_size=0):
+        print("\n" + "="*80)
+        print("🎯 RogoAI Qwen3-ASR Align")
+        print("="*80)
+        start_time = time.time()
+        metrics = ASRMetrics(reset_peak=True)
+
+        chunks = json.loads(chunks_json) if chunks_json and chunks_json.strip() else []
+        if not chunks:
+            print("⚠️  chunks_json が空です")
+            return ("", "[]", WordTimestamps())
+
+        reader = None
+        if audio is not None:
+            wav_array, sr = prepare_model_audio(audio, metrics)
+        else:
+            path = audio_file_path.strip().strip('"').strip("'").strip()
+            if not path or not os.path.isfile(path):
+                raise ValueError("❌ audio または audio_file_path を指定してください")
+            wav_array, sr, reader = open_audio_file(path, metrics)
+
+        try:
+            audios = []
+            offsets = []
+            for chunk in chunks:
+                s = int(round(chunk["start"] * sr))
+                e = int(round(chunk["end"] * sr))
+                audios.append((wav_array[s:e], sr))
+                offsets.append(s / sr)
+
+            time_stamps = align_batch(
+                model, audios,
+                texts=[chunk.get("text", "") for chunk in chunks],
+                languages=[
+                    language if language != "auto" else (chunk.get("language") or "English")
+                    for chunk in chunks
+                ],
+                offsets=offsets,
+                batch_size=batch_size or None,
+                metrics=metrics,
+            )
+        finally:
+            if reader is not None:
+                reader.close()
+
+        for chunk, chunk_ts in zip(chunks, time_stamps):
+            chunk["time_stamps"] = chunk_ts
+
+        all_ts = [ts for chunk_ts in time_stamps for ts in chunk_ts]
+        aligned = sum(1 for chunk_ts in time_stamps if chunk_ts)
+        elapsed = time.time() - start_time
+
+        print(f"📊 チャンク数: {len(chunks)} (アライメント済み: {aligned})")
+        print(f"📝 タイムスタンプ: {len(all_ts)} セグメント")
+        print(f"⏱️  処理時間: {elapsed:.1f}秒 "
+              f"(forced_alignment: {metrics.stages.get('forced_alignment', 0.0):.2f}秒)")
+        print("="*80 + "\n")
+
+        return (
+            format_timestamps(all_ts),
+            json.dumps(chunks, ensure_ascii=False),
+            WordTimestamps.from_tuples(all_ts),
+        )
+
+
+# ノード登録
+NODE_CLASS_MAPPINGS = {
+    "RogoAI_Qwen3ASRAlign": RogoAI_Qwen3ASRAlign,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "RogoAI_Qwen3ASRAlign": "RogoAI Qwen3-ASR Align 🎯",
+}
@@ -0,0 +1,441 @@
+"""
+RogoAI Qwen3-ASR Batch Transcribe
+フォルダ / globパターン内の複数音声ファイルをまとめて文字起こしするノード
+
+機能:
+- フォルダ・globパターン・単一ファイルを入力として受付
+- 短い音声をまとめてバッチ推論（Transcribe ノードと同じ iter_transcribe_chunks 経由:
+  バッチサイズ自動決定・OOM 時の半減再試行・ループガード・トークン上限の自動調整）
+- 長いファイルはVADで分割し、他のファイルのチャンクと一緒にバッチ化
+- 文字起こし結果は TranscriptCache に保存（同じファイル・同じ設定なら推論しない）
+- ファイルごとにテキストを書き出し + manifest.json を生成
+"""
+
+import glob
+import json
+import os
+import time
+
+import folder_paths
+import numpy as np
+import torchaudio
+
+from .asr_cache import TranscriptCache, hash_file_identity
+from .audio_utils import (
+    MODEL_SAMPLE_RATE,
+    WavMemmapReader,
+    as_float32,
+    resample_audio,
+    split_on_silence,
+)
+from .ffmpeg_utils import find_ffmpeg, probe_media
+from .qwen3_asr import (
+    MAX_AUTO_BATCH_SIZE,
+    SUPPORTED_LANGUAGES,
+    format_timestamps,
+    iter_transcribe_chunks,
+    join_chunk_texts,
+    load_audio_input,
+    load_model_to_device,
+    transcript_cache_key,
+)
+
+
+def collect_audio_files(input_path: str, extensions, recursive: bool = False) -> list:
+    """
+    フォルダ / globパターン / 単一ファイルから音声ファイル一覧を取得
+    """
+    input_path = input_path.strip().strip('"').strip("'").strip()
+    exts = {"." + e.strip().lower().lstrip(".") for e in extensions if e.strip()}
+
+    if os.path.isfile(input_path):
+        return [input_path]
+
+    if os.path.isdir(input_path):
+        pattern = os.path.join(input_path, "**", "*") if recursive else os.path.join(input_path, "*")
+    else:
+        pattern = input_path
+
+    files = [
+        path for path in glob.glob(pattern, recursive=recursive)
+        if os.path.isfile(path) and os.path.splitext(path)[1].lower() in exts
+    ]
+    return sorted(files)
+
+
+def _audio_duration(path: str) -> float:
+    """
+    音声長を取得（取得できない場合は0）
+
+    WAV はヘッダから、それ以外は probe_media（ffprobe、結果はインデックスに保存）で取得する。
+    （torchaudio.info は新しい torchaudio では削除されている）
+    """
+    try:
+        reader = WavMemmapReader(path)
+        duration = reader.num_frames / reader.sample_rate
+        reader.close()
+        return duration
+    except (OSError, ValueError, ZeroDivisionError):
+        pass
+
+    try:
+        info = probe_media(path, find_ffmpeg())
+    except FileNotFoundError:
+        return 0.0
+    return float(info.get("duration") or 0.0) if info else 0.0
+
+
+class RogoAI_Qwen3ASRBatchTranscribe:
+    """
+    複数音声ファイルの一括文字起こし
+
+    【特徴】
+    ・1回のプロンプトで数百ファイルを処理（プロンプトごとのオーバーヘッドを削減）
+    ・音声長順に並べてバッチを詰めるため、パディングの無駄が少ない
+    ・ファイルごとの .txt と manifest.json を出力
+    ・読み込み・推論エラーのファイルはスキップして manifest に記録
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "model": ("QWEN3_ASR_MODEL",),
+                "input_path": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "placeholder": "フォルダ or globパターン (例: D:/calls/*.wav)"
+                }),
+            },
+            "optional": {
+                "extensions": ("STRING", {
+                    "default": "wav,mp3,flac,m4a,ogg",
+                    "multiline": False
+                }),
+                "recursive": ("BOOLEAN", {"default": False}),
+                "output_dir": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "tooltip": "空欄の場合は ComfyUI/output/asr_batch に保存"
+                }),
+                "language": (SUPPORTED_LANGUAGES, {"default": "auto"}),
+                "context": ("STRING", {
+                    "default": "",
+                    "multiline": True
+                }),
+                "return_timestamps": ("BOOLEAN", {"default": False}),
+                "max_chunk_seconds": ("FLOAT", {
+                    "default": 30.0,
+                    "min": 5.0,
+                    "max": 1200.0,
+                    "step": 5.0,
+                    "tooltip": "これより長いファイルはVADで分割してバッチに詰める"
+                }),
+                "skip_existing": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "出力テキストが既にあるファイルはスキップ"
+                }),
+                "use_cache": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "同じファイル・同じ設定の文字起こし結果を再利用（Transcribe File とキャッシュを共有）"
+                }),
+                "loop_guard": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "同じフレーズの繰り返しループを検出したら生成を止め、繰り返し部分を除去"
+                }),
+                "loop_retry": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "ループを検出したチャンクを repetition_penalty を上げて再推論（loop_guard 有効時）"
+                }),
+                "batch_size": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 256,
+                    "tooltip": "1回の推論でまとめるチャンク数\n0: 空きメモリとチャンク長から自動決定（OOM時は半減して再試行）"
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "INT")
+    RETURN_NAMES = ("manifest_path", "summary", "file_count")
+    FUNCTION = "batch_transcribe"
+    CATEGORY = "RogoAI/ASR"
+
+    def _load_file(self, path):
+        """音声ファイルを読み込み、ComfyUI AUDIO形式経由で 16kHz の (wav, sr) に変換"""
+        waveform, sr = torchaudio.load(path)
+        wav, sr = load_audio_input({"waveform": waveform.unsqueeze(0), "sample_rate": sr})
+        return resample_audio(wav, sr, MODEL_SAMPLE_RATE), MODEL_SAMPLE_RATE
+
+    def _write_outputs(self, output_dir, entry, stem, text, time_stamps):
+        text_path = os.path.join(output_dir, f"{stem}.txt")
+        with open(text_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        entry["output"] = text_path
+
+        if time_stamps:
+            ts_path = os.path.join(output_dir, f"{stem}.timestamps.txt")
+            with open(ts_path, "w", encoding="utf-8") as f:
+                f.write(format_timestamps(time_stamps))
+            entry["timestamps_output"] = ts_path
+
+    def _cache_key(self, model, path, lang_setting, ctx, return_timestamps, max_chunk_seconds,
+                   loop_guard, loop_retry):
+        """Transcribe File（chunk_mode=vad）と同じ形式のキャッシュキー"""
+        return transcript_cache_key(
+            model, hash_file_identity(path),
+            language=lang_setting,
+            context=ctx,
+            return_timestamps=return_timestamps,
+            chunk_mode="vad",
+            max_chunk_seconds=max_chunk_seconds,
+            adaptive_tokens=True,
+            loop_guard=loop_guard,
+            loop_retry=loop_retry and loop_guard,
+            # バッチでは先頭区間での言語判定を行わない（チャンクごとに自動判定）
+            language_probe_seconds=None,
+            skip_non_speech=False,
+            silence_threshold_db=None,
+            window_overlap_seconds=None,
+        )
+
+    def batch_transcribe(self, model, input_path, extensions="wav,mp3,flac,m4a,ogg",
+                         recursive=False, output_dir="", language="auto", context="",
+                         return_timestamps=False, max_chunk_seconds=30.0, skip_existing=True,
+                         use_cache=True, loop_guard=True, loop_retry=True, batch_size=0):
+        print("\n" + "="*80)
+        print("📚 RogoAI Qwen3-ASR Batch Transcribe")
+        print("="*80)
+        start_time = time.time()
+
+        files = collect_audio_files(input_path, extensions.split(","), recursive)
+        if not files:
+            raise FileNotFoundError(f"❌ No audio files found: {input_path}")
+
+        if not output_dir.strip():
+            output_dir = os.path.join(folder_paths.get_output_directory(), "asr_batch")
+        os.makedirs(output_dir, exist_ok=True)
+
+        lang = None if language == "auto" else language
+        ctx = context if context.strip() else ""
+        cache = TranscriptCache() if use_cache else None
+        # このチャンク数が溜まったら推論（バッチサイズは iter_transcribe_chunks 側で決める）
+        queue_chunks = batch_size or MAX_AUTO_BATCH_SIZE
+
+        print(f"📂 Input: {input_path}")
+        print(f"🎵 Files: {len(files)}")
+        print(f"💾 Output: {output_dir}")
+        print(f"📦 Batch size: {batch_size or 'auto'}")
+
+        # 出力ファイル名を先に決める（recursive で同名のファイルは連番で区別）
+        entries = []
+        stems = {}
+        used_names = set()
+        for path in files:
+            base = os.path.splitext(os.path.basename(path))[0]
+            stem = base
+            counter = 1
+            while stem.lower() in used_names:
+                stem = f"{base}_{counter:03d}"
+                counter += 1
+            used_names.add(stem.lower())
+            entry = {"file": path, "status": "pending"}
+            stems[id(entry)] = stem
+            if skip_existing and os.path.exists(os.path.join(output_dir, f"{stem}.txt")):
+                entry["status"] = "skipped"
+                entry["output"] = os.path.join(output_dir, f"{stem}.txt")
+            else:
+                entry["duration"] = _audio_duration(path)
+            entries.append(entry)
+
+        # 音声長順に並べてバッチの長さを揃える
+        pending = sorted(
+            (e for e in entries if e["status"] == "pending"),
+            key=lambda e: e["duration"]
+        )
+
+        def finish(entry, text, detected, time_stamps, num_loops):
+            self._write_outputs(output_dir, entry, stems[id(entry)], text, time_stamps)
+            entry["status"] = "done"
+            entry["language"] = detected
+            entry["chars"] = len(text)
+            if num_loops:
+                entry["loops"] = num_loops
+
+        # ファイルを順に読み込み、チャンクが queue_chunks 以上溜まったら推論
+        done = 0
+        queue = []  # (entry, wav, spans, cache_key)
+
+        def flush(queue):
+            # キューのファイルを1本の波形に連結し、チャンク位置をずらして
+            # Transcribe ノードと同じ iter_transcribe_chunks に渡す（ファイルをまたいでバッチ化）
+            bases = []
+            spans = []
+            owners = []
+            base = 0
+            for qi, (_, wav, file_spans, _) in enumerate(queue):
+                bases.append(base)
+                spans.extend((base + s, base + e) for s, e in file_spans)
+                owners.extend([qi] * len(file_spans))
+                base += len(wav)
+            combined = np.concatenate([as_float32(wav) for _, wav, _, _ in queue])
+
+            def run(indices):
+                for chunk in iter_transcribe_chunks(
+                    model, combined, MODEL_SAMPLE_RATE, [spans[i] for i in indices],
+                    language=lang,
+                    context=ctx,
+                    return_timestamps=return_timestamps,
+                    batch_size=batch_size or None,
+                    adaptive_tokens=True,
+                    loop_guard=loop_guard,
+                    loop_retry=loop_retry and loop_guard,
+                ):
+                    results[indices[chunk["index"]]] = chunk
+
+            results = {}
+            failed = set()
+            try:
+                run(list(range(len(spans))))
+            except Exception as e:
+                # OOM はバッチを半減して iter_transcribe_chunks 内で再試行済み。
+                # それ以外の失敗はどのファイルが原因か分からないため、残りをファイルごとに推論し直す
+                print(f"⚠️  Batch failed ({e}) → 残りのファイルを1つずつ処理")
+                for qi in sorted({owners[i] for i in range(len(spans)) if i not in results}):
+                    try:
+                        run([i for i in range(len(spans)) if owners[i] == qi and i not in results])
+                    except Exception as file_error:
+                        entry = queue[qi][0]
+                        entry["status"] = "error"
+                        entry["error"] = str(file_error)
+                        failed.add(qi)
+                        print(f"⚠️  Transcription failed: {entry['file']} ({file_error})")
+
+            for qi, (entry, wav, file_spans, cache_key) in enumerate(queue):
+                if qi in failed:
+                    continue
+                offset = bases[qi] / MODEL_SAMPLE_RATE
+                chunks = [results[i] for i in range(len(spans)) if owners[i] == qi]
+                languages = [c["language"] for c in chunks if c["language"]]
+                detected = max(set(languages), key=languages.count) if languages else (lang or "")
+                text = join_chunk_texts([c["text"] for c in chunks], detected)
+                time_stamps = [
+                    (start - offset, end - offset, word)
+                    for c in chunks for start, end, word in c["time_stamps"]
+                ]
+                chunk_list = [
+                    {
+                        "index": index,
+                        "start": c["start"] - offset,
+                        "end": c["end"] - offset,
+                        "text": c["text"],
+                        "language": c["language"] or detected,
+                    }
+                    for index, c in enumerate(chunks)
+                ]
+                num_loops = sum(1 for c in chunks if c["loop_detected"])
+                finish(entry, text, detected, time_stamps, num_loops)
+                entry["duration"] = len(wav) / MODEL_SAMPLE_RATE
+                if cache is not None:
+                    cache.put(cache_key, {
+                        "text": text,
+                        "language": detected,
+                        "time_stamps": time_stamps,
+                        "num_chunks": len(chunks),
+                        "num_loops": num_loops,
+                        "chunks": chunk_list,
+                    })
+
+        loaded = False
+        for entry in pending:
+            cache_key = None
+            if cache is not None:
+                cache_key = self._cache_key(
+                    model, entry["file"], language, ctx, return_timestamps,
+                    max_chunk_seconds, loop_guard, loop_retry,
+                )
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    finish(
+                        entry, cached["text"], cached["language"],
+                        [tuple(ts) for ts in cached["time_stamps"]],
+                        cached.get("num_loops", 0),
+                    )
+                    entry["cache_hit"] = True
+                    done += 1
+                    continue
+
+            try:
+                wav, sr = self._load_file(entry["file"])
+            except Exception as e:
+                entry["status"] = "error"
+                entry["error"] = str(e)
+                print(f"⚠️  Load failed: {entry['file']} ({e})")
+                continue
+
+            spans = split_on_silence(wav, sr, max_chunk_seconds=max_chunk_seconds)
+            if not spans:
+                entry["status"] = "empty"
+                continue
+            if not loaded:
+                load_model_to_device(model)
+                loaded = True
+            queue.append((entry, wav, spans, cache_key))
+
+            if sum(len(q[2]) for q in queue) >= queue_chunks:
+                flush(queue)
+                done += len(queue)
+                queue = []
+                print(f"   ⏳ {done}/{len(pending)} files")
+
+        if queue:
+            flush(queue)
+            done += len(queue)
+            print(f"   ⏳ {done}/{len(pending)} files")
+
+        elapsed = time.time() - start_time
+        total_audio = sum(e.get("duration", 0.0) for e in entries if e["status"] == "done")
+
+        manifest = {
+            "input_path": input_path,
+            "output_dir": output_dir,
+            "language": language,
+            "return_timestamps": return_timestamps,
+            "elapsed_seconds": elapsed,
+            "files": entries,
+        }
+        manifest_path = os.path.join(output_dir, "manifest.json")
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        counts = {}
+        for e in entries:
+            counts[e["status"]] = counts.get(e["status"], 0) + 1
+        hits = sum(1 for e in entries if e.get("cache_hit"))
+
+        summary = (
+            f"📚 Files: {len(entries)}\n"
+            f"✅ Done: {counts.get('done', 0)} (cache hit: {hits})\n"
+            f"⏭️  Skipped: {counts.get('skipped', 0)}\n"
+            f"❌ Errors: {counts.get('error', 0)}\n"
+            f"🎵 Audio: {total_audio:.1f}s\n"
+            f"⏱️  Elapsed: {elapsed:.1f}s"
+        )
+        if elapsed > 0 and total_audio > 0:
+            summary += f" ({total_audio / elapsed:.1f}x realtime)"
+        summary += f"\n📄 Manifest: {manifest_path}"
+
+        print("\n" + summary)
+        print("="*80 + "\n")
+
+        return (manifest_path, summary, counts.get("done", 0))
+
+
+# ノード登録
+NODE_CLASS_MAPPINGS = {
+    "RogoAI_Qwen3ASRBatchTranscribe": RogoAI_Qwen3ASRBatchTranscribe,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "RogoAI_Qwen3ASRBatchTranscribe": "RogoAI Qwen3-ASR Batch Transcribe 📚",
+}
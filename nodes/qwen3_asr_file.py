@@ -0,0 +1,168 @@
+"""
+RogoAI Qwen3-ASR Transcribe File
+音声ファイルのパスを直接受け取って文字起こしするノード
+
+機能:
+- Extract Audio ノードの audio_file_path をそのまま入力可能（AUDIO テンソルを経由しない）
+- PCM / float WAV はメモリマップで読み、チャンクごとに 16kHz モノラルへ遅延変換
+  → メモリ使用量は録音長ではなくチャンク長で決まる
+- WAV 以外の形式（動画を含む）は ffmpeg で 16kHz モノラル float32 として直接デコード
+  （ffmpeg がない場合は torchaudio で読み込んでから変換）
+- キャッシュキーはファイルのパス・サイズ・更新日時から作成（ファイル全体を読まない）
+"""
+
+import os
+import time
+
+import torchaudio
+
+from .asr_cache import hash_file_identity
+from .asr_metrics import ASRMetrics
+from .audio_utils import (
+    MODEL_SAMPLE_RATE,
+    LazyResampledAudio,
+    WavMemmapReader,
+    resample_audio,
+)
+from .ffmpeg_utils import find_ffmpeg, probe_media, read_pcm
+from .qwen3_asr import (
+    CHUNK_MODES,
+    LANGUAGE_PROBE_SECONDS,
+    SILENCE_THRESHOLD_DB,
+    WINDOW_OVERLAP_SECONDS,
+    RogoAI_Qwen3ASRTranscribe,
+    load_audio_input,
+)
+
+
+def open_audio_file(path: str, metrics=None):
+    """
+    音声ファイルを 16kHz モノラルの (wav, sr, reader) として開く
+
+    WAV の場合は LazyResampledAudio（スライス時に読み込み・変換）を返す。
+    それ以外は ffmpeg で 16kHz モノラルとして直接デコードし（リサンプリング不要）、reader は None。
+    ffmpeg が見つからない場合は torchaudio でデコードして一括変換する。
+    """
+    metrics = metrics or ASRMetrics()
+    try:
+        with metrics.stage("audio_conversion"):
+            reader = WavMemmapReader(path)
+        print(f"🗺️  WAVメモリマップ: {reader.sample_rate} Hz / {reader.channels}ch / "
+              f"{reader.bits_per_sample}bit")
+        return LazyResampledAudio(reader, MODEL_SAMPLE_RATE), MODEL_SAMPLE_RATE, reader
+    except ValueError as e:
+        print(f"ℹ️  メモリマップ非対応 ({e})")
+
+    try:
+        ffmpeg_path = find_ffmpeg()
+    except FileNotFoundError:
+        ffmpeg_path = None
+    if ffmpeg_path is not None:
+        print("🎞️  ffmpeg で直接デコード → 16kHz モノラル")
+        with metrics.stage("audio_conversion"):
+            info = probe_media(path, ffmpeg_path)
+            wav = read_pcm(
+                path, MODEL_SAMPLE_RATE, ffmpeg_path=ffmpeg_path,
+                expected_seconds=info.get("duration") if info else None,
+            )
+        return wav, MODEL_SAMPLE_RATE, None
+
+    print("ℹ️  ffmpeg が見つかりません → torchaudio で読み込み")
+    with metrics.stage("audio_conversion"):
+        waveform, sr = torchaudio.load(path)
+        wav, sr = load_audio_input({"waveform": waveform.unsqueeze(0), "sample_rate": sr})
+        del waveform
+    with metrics.stage("resampling"):
+        wav = resample_audio(wav, sr, MODEL_SAMPLE_RATE)
+    return wav, MODEL_SAMPLE_RATE, None
+
+
+class RogoAI_Qwen3ASRTranscribeFile(RogoAI_Qwen3ASRTranscribe):
+    """
+    ファイルパス入力版の Qwen3-ASR 文字起こし
+
+    【特徴】
+    ・Extract Audio → (外部ローダー) → AUDIO の二重デコードを省略
+    ・WAV はメモリマップ + チャンク単位のリサンプリングで、数時間の録音でも省メモリ
+    ・出力・オプションは Transcribe ノードと同じ
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        inputs = super().INPUT_TYPES()
+        required = dict(inputs["required"])
+        del required["audio"]
+        required["audio_file_path"] = ("STRING", {
+            "default": "",
+            "multiline": False,
+            "forceInput": True,
+        })
+
+        optional = dict(inputs["optional"])
+        optional["chunk_mode"] = (CHUNK_MODES, {
+            "default": "vad",
+            "tooltip": "vad: 無音位置で分割し、チャンク単位で読み込み（推奨）\n"
+                       "none: ファイル全体を一度に読み込んで処理\n"
+                       "window: 固定長ウィンドウを重ねて分割（重なり部分は自動で重複除去）"
+        })
+        return {"required": required, "optional": optional}
+
+    FUNCTION = "transcribe_file"
+
+    def transcribe_file(self, model, audio_file_path, language="auto", context="",
+                        return_timestamps=False, debug_mode=False,
+                        chunk_mode="vad", max_chunk_seconds=30.0, offload_after=False,
+                        use_cache=True, adaptive_tokens=True, loop_guard=True, loop_retry=True,
+                        metrics_file="", language_probe_seconds=LANGUAGE_PROBE_SECONDS,
+                        skip_non_speech=False, silence_threshold_db=SILENCE_THRESHOLD_DB,
+                        window_overlap_seconds=WINDOW_OVERLAP_SECONDS, resume=False,
+                        batch_size=0):
+        start_time = time.time()
+        metrics = ASRMetrics(reset_peak=True)
+
+        path = audio_file_path.strip().strip('"').strip("'").strip()
+        if not path or not os.path.isfile(path):
+            raise FileNotFoundError(f"❌ Audio file not found: {audio_file_path}")
+
+        print(f"📂 Audio file: {path}")
+        wav_array, sr, reader = open_audio_file(path, metrics)
+        try:
+            if chunk_mode == "none" and reader is not None:
+                # 全体を1リクエストで処理するため、ここで一括変換
+                with metrics.stage("resampling"):
+                    wav_array = wav_array[0:len(wav_array)]
+
+            return self._transcribe_audio(
+                model, wav_array, sr, lambda: hash_file_identity(path), metrics, start_time,
+                language=language,
+                context=context,
+                return_timestamps=return_timestamps,
+                debug_mode=debug_mode,
+                chunk_mode=chunk_mode,
+                max_chunk_seconds=max_chunk_seconds,
+                offload_after=offload_after,
+                use_cache=use_cache,
+                adaptive_tokens=adaptive_tokens,
+                loop_guard=loop_guard,
+                loop_retry=loop_retry,
+                metrics_file=metrics_file,
+                language_probe_seconds=language_probe_seconds,
+                skip_non_speech=skip_non_speech,
+                silence_threshold_db=silence_threshold_db,
+                window_overlap_seconds=window_overlap_seconds,
+                resume=resume,
+                batch_size=batch_size,
+            )
+        finally:
+            if reader is not None:
+                reader.close()
+
+
+# ノード登録
+NODE_CLASS_MAPPINGS = {
+    "RogoAI_Qwen3ASRTranscribeFile": RogoAI_Qwen3ASRTranscribeFile,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "RogoAI_Qwen3ASRTranscribeFile": "RogoAI Qwen3-ASR Transcribe File 📂",
+}
@@ -0,0 +1,67 @@
+"""
+RogoAI Word Timestamps
+ノード間で単語タイムスタンプを受け渡すための型 (WORD_TIMESTAMPS)
+
+"start-end: text" 形式の文字列に整形して再パースする代わりに、
+開始・終了時刻と単語テキストを並列配列のまま渡す。
+- starts / ends: array('d')（float64）
+- text: 全単語を連結した1つの文字列
+- offsets: array('q')、単語 i は text[offsets[i]:offsets[i + 1]]
+"""
+
+from array import array
+
+
+class WordTimestamps:
+    """
+    単語タイムスタンプの並列配列コンテナ（ComfyUI型: WORD_TIMESTAMPS）
+
+    使用例:
+        words = WordTimestamps.from_tuples([(0.0, 0.4, "おは"), (0.4, 0.8, "よう")])
+        for start, end, word in words:
+            ...
+    """
+
+    __slots__ = ("starts", "ends", "text", "offsets")
+
+    def __init__(self, starts=None, ends=None, text="", offsets=None):
+        self.starts = starts if starts is not None else array("d")
+        self.ends = ends if ends is not None else array("d")
+        self.text = text
+        self.offsets = offsets if offsets is not None else array("q", [0])
+
+    @classmethod
+    def from_tuples(cls, time_stamps):
+        """(start, end, text) のリストから作成"""
+        starts = array("d")
+        ends = array("d")
+        offsets = array("q", [0])
+        pieces = []
+        position = 0
+        for start, end, word in time_stamps:
+            starts.append(start)
+            ends.append(end)
+            pieces.append(word)
+            position += len(word)
+            offsets.append(position)
+        return cls(starts, ends, "".join(pieces), offsets)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def word(self, index: int) -> str:
+        return self.text[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self):
+        """(start, end, word) を順に返す"""
+        text = self.text
+        offsets = self.offsets
+        for i, (start, end) in enumerate(zip(self.starts, self.ends)):
+            yield start, end, text[offsets[i]:offsets[i + 1]]
+
+    def to_string(self) -> str:
+        """従来の "start-end: text" 形式の文字列に変換（後方互換用）"""
+        return "\n".join(f"{start:.2f}-{end:.2f}: {word}" for start, end, word in self)
+
+    def __repr__(self):
+        return f"WordTimestamps({len(self)} words)"
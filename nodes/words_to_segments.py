@@ -7,6 +7,7 @@ RogoAI Words To Segments
 - 句点・疑問符での自動区切り
 - 時間・文字数制限での強制区切り
 - SRT字幕直接出力
+- WORD_TIMESTAMPS 型（並列配列）の直接入力（文字列の再パース不要）
 """
 
 import json
@@ -52,6 +53,9 @@ class RogoAI_WordsToSegments:
                     "default": "。?!？！…",
                     "multiline": False
                 }),
+                "word_timestamps": ("WORD_TIMESTAMPS", {
+                    "tooltip": "Transcribe / Align ノードの word_timestamps 出力（接続時は文字列入力より優先）"
+                }),
             }
         }
     
@@ -69,7 +73,8 @@ class RogoAI_WordsToSegments:
 ・precise: 精密な区切り（句読点厳密）
 
 【入力フォーマット】
-Qwen3-ASR/Whisperのタイムスタンプ:
+word_timestamps (WORD_TIMESTAMPS) を接続した場合はそちらを直接使用。
+文字列の場合はQwen3-ASR/Whisperのタイムスタンプ:
 [
   {"word": "こんにちは", "start": 0.5, "end": 1.2},
   {"word": "老後AI", "start": 1.3, "end": 2.0},
@@ -194,11 +199,17 @@ Qwen3-ASR/Whisperのタイムスタンプ:
     
     def _create_segments(self, words, max_duration, max_chars, sentence_end_marks):
         """
-        単語リストからセグメントを生成
+        単語列からセグメントを生成
+        
+        words: (start, end, word) の反復可能オブジェクト（WordTimestamps も可）
         """
         if not words:
             return []
         
+        # 文末記号は1文字ずつの集合として1回の正規表現検索で判定
+        end_mark_pattern = re.compile("[" + re.escape(sentence_end_marks) + "]") \
+            if sentence_end_marks else None
+        
         segments = []
         current_segment = {
             "text": "",
@@ -208,16 +219,14 @@ Qwen3-ASR/Whisperのタイムスタンプ:
         }
         
         for word in words:
-            word_text = word["word"]
-            word_start = float(word["start"])
-            word_end = float(word["end"])
+            word_start, word_end, word_text = word
             
             # 最初の単語
             if current_segment["start"] is None:
                 current_segment["start"] = word_start
             
             # 文末記号チェック
-            is_sentence_end = any(mark in word_text for mark in sentence_end_marks)
+            is_sentence_end = end_mark_pattern is not None and end_mark_pattern.search(word_text) is not None
             
             # 現在のセグメントに追加した場合の長さをチェック
             new_text = current_segment["text"] + word_text
@@ -322,7 +331,8 @@ Qwen3-ASR/Whisperのタイムスタンプ:
         return "\n".join(srt_lines)
     
     def generate_segments(self, words_timestamps_json, mode="youtube",
-                         max_duration=7.0, max_chars=80, sentence_end_marks="。?!？！…"):
+                         max_duration=7.0, max_chars=80, sentence_end_marks="。?!？！…",
+                         word_timestamps=None):
         """
         単語タイムスタンプから文節セグメントを生成
         """
@@ -344,13 +354,19 @@ Qwen3-ASR/Whisperのタイムスタンプ:
             max_chars = 200
             print("🎯 Mode: Precise (精密区切り)")
         
-        # タイムスタンプJSONをパース
-        try:
-            words = self._parse_words_timestamps(words_timestamps_json)
-            print(f"✅ Parsed {len(words)} words")
-        except ValueError as e:
-            print(f"❌ Error parsing timestamps: {e}")
-            return ("", "[]", "", 0)
+        # 並列配列で受け取った場合はパース不要
+        if word_timestamps is not None and len(word_timestamps) > 0:
+            words = word_timestamps
+            print(f"✅ Received {len(words)} words (WORD_TIMESTAMPS)")
+        else:
+            # タイムスタンプJSONをパース
+            try:
+                parsed = self._parse_words_timestamps(words_timestamps_json)
+                print(f"✅ Parsed {len(parsed)} words")
+            except ValueError as e:
+                print(f"❌ Error parsing timestamps: {e}")
+                return ("", "[]", "", 0)
+            words = [(w["start"], w["end"], w["word"]) for w in parsed]
         
         # セグメント生成
         segments = self._create_segments(words, max_duration, max_chars, sentence_end_marks)
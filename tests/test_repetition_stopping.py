@@ -0,0 +1,64 @@
+"""
+RepetitionStoppingCriteria のテスト（ComfyUI / qwen_asr はベンチマークのスタブを使用）
+
+実行: python -m pytest tests
+"""
+
+import os
+import sys
+
+import torch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+sys.path.insert(0, ROOT)
+
+import bench_rogoai_asr  # noqa: E402
+
+bench_rogoai_asr._install_stubs()
+
+from nodes.qwen3_asr import RepetitionStoppingCriteria  # noqa: E402
+
+EOS = 0
+PAD = 1
+PROMPT = [5, 6, 7]
+
+
+def _run(criteria, rows):
+    """rows（生成トークン列）を1トークンずつ与え、各ステップの戻り値を返す"""
+    steps = []
+    for i in range(1, len(rows[0]) + 1):
+        input_ids = torch.tensor([PROMPT + row[:i] for row in rows])
+        steps.append(criteria(input_ids, None))
+    return steps
+
+
+def test_padded_finished_row_is_not_counted_as_loop():
+    finished = [10, 11, 12, EOS] + [PAD] * 40
+    looping = [20 + (i % 2) for i in range(44)]
+    criteria = RepetitionStoppingCriteria(end_token_ids=[EOS, PAD])
+
+    steps = _run(criteria, [finished, looping])
+
+    assert criteria.triggered == 1
+    assert any(bool(step[1]) for step in steps)
+
+
+def test_pad_tail_counts_without_end_token_ids():
+    # end_token_ids を渡さない場合は pad の連続をループとみなす（従来の挙動）
+    finished = [10, 11, 12, EOS] + [PAD] * 40
+    criteria = RepetitionStoppingCriteria()
+
+    _run(criteria, [finished])
+
+    assert criteria.triggered == 1
+
+
+def test_new_generation_resets_state():
+    looping = [30] * 40
+    criteria = RepetitionStoppingCriteria(end_token_ids=[EOS, PAD])
+
+    _run(criteria, [looping])
+    _run(criteria, [looping])
+
+    assert criteria.triggered == 2